@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   parse_benchmark.py
+@Time    :   2024/11/08 16:05:12
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   各联储已保存页面的HTML解析耗时对比
+
+用法: python -m benchmarks.parse_benchmark data/pages
+页面目录按联储分子目录存放, 如 data/pages/cleveland/*.html
+"""
+
+import argparse
+import os
+import time
+
+from data_scraper.orchestrator import discover_scrapers
+from utils.html_parser import parse_html, selector_strainer
+
+
+def bank_strainers() -> dict:
+    """由各联储爬虫的LISTING_SELECTOR构建SoupStrainer，与列表页解析时使用的保持一致
+
+    Returns:
+        dict: 联储 -> SoupStrainer，无法用SoupStrainer表示的选择器不参与对比
+    """
+    strainers = {}
+    for bank, scraper_class in discover_scrapers().items():
+        if scraper_class.LISTING_SELECTOR:
+            parse_only = selector_strainer(scraper_class.LISTING_SELECTOR)
+            if parse_only is not None:
+                strainers[bank] = parse_only
+    return strainers
+
+
+def time_parse(pages: list[str], parser: str, parse_only=None, repeat: int = 3) -> float:
+    """多次解析取最短耗时，返回平均每页毫秒数"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for html in pages:
+            parse_html(html, parse_only, parser=parser)
+        best = min(best, time.perf_counter() - start)
+    return best / len(pages) * 1000
+
+
+def load_pages(bank_dir: str) -> list[str]:
+    pages = []
+    for filename in sorted(os.listdir(bank_dir)):
+        if filename.endswith((".html", ".htm")):
+            with open(os.path.join(bank_dir, filename), "r", encoding="utf-8") as f:
+                pages.append(f.read())
+    return pages
+
+
+def benchmark(pages_dir: str, repeat: int = 3) -> dict:
+    """对每个联储的页面分别用html.parser、lxml以及lxml+SoupStrainer解析
+
+    Args:
+        pages_dir (str): 按联储分子目录存放的页面目录
+        repeat (int, optional): 重复次数. Defaults to 3.
+
+    Returns:
+        dict: 联储 -> {方案: 每页毫秒数}
+    """
+    results = {}
+    strainers = bank_strainers()
+    for bank in sorted(os.listdir(pages_dir)):
+        bank_dir = os.path.join(pages_dir, bank)
+        if not os.path.isdir(bank_dir):
+            continue
+        pages = load_pages(bank_dir)
+        if not pages:
+            continue
+        result = {
+            "pages": len(pages),
+            "html.parser": time_parse(pages, "html.parser", repeat=repeat),
+        }
+        try:
+            result["lxml"] = time_parse(pages, "lxml", repeat=repeat)
+            if bank in strainers:
+                result["lxml+strainer"] = time_parse(
+                    pages, "lxml", strainers[bank], repeat=repeat
+                )
+        except Exception as e:
+            print(f"lxml is unavailable. {repr(e)}")
+        results[bank] = result
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="HTML parse benchmark per bank.")
+    arg_parser.add_argument("pages_dir", nargs="?", default="data/pages")
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    results = benchmark(args.pages_dir, args.repeat)
+    columns = ["html.parser", "lxml", "lxml+strainer"]
+    print("{:<14}{:>7}".format("bank", "pages") + "".join(f"{c:>16}" for c in columns))
+    for bank, result in results.items():
+        row = "{:<14}{:>7}".format(bank, result["pages"])
+        for column in columns:
+            row += f"{result[column]:>13.2f} ms" if column in result else f"{'-':>16}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   pdf_benchmark.py
+@Time    :   2024/11/22 15:20:47
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   各PDF文本提取后端在已下载演讲PDF上的每页耗时及峰值内存对比
+
+用法: python -m benchmarks.pdf_benchmark data/fed_speeches/kansascity_fed_speeches/pdfs
+每个后端在单独的子进程中运行，峰值RSS互不影响
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+from utils.pdf_extractor import available_backends, iter_pdf_pages
+
+
+def peak_rss_mb() -> float:
+    """当前进程的峰值RSS(MB)，无法获取时为None"""
+    try:
+        import resource
+
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS以字节为单位，Linux以KB为单位
+        return maxrss / 1024 / 1024 if sys.platform == "darwin" else maxrss / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+
+        memory_info = psutil.Process().memory_info()
+        return getattr(memory_info, "peak_wset", memory_info.rss) / 1024 / 1024
+    except ImportError:
+        return None
+
+
+def run_backend(backend: str, pdf_files: list[str], queue):
+    """子进程中逐页提取全部PDF，把(页数, 秒数, 峰值RSS, 失败数)放入queue"""
+    pages = failed = 0
+    start = time.perf_counter()
+    for pdf_file in pdf_files:
+        try:
+            for _ in iter_pdf_pages(pdf_file, backend):
+                pages += 1
+        except Exception as e:
+            failed += 1
+            print(f"{backend} failed on {pdf_file}. {repr(e)}")
+    queue.put((pages, time.perf_counter() - start, peak_rss_mb(), failed))
+
+
+def load_pdfs(pdf_dir: str) -> list[str]:
+    return [
+        os.path.join(pdf_dir, filename)
+        for filename in sorted(os.listdir(pdf_dir))
+        if filename.lower().endswith(".pdf")
+    ]
+
+
+def benchmark(pdf_dir: str, backends: list[str] = None) -> dict:
+    """对每个已安装的后端分别提取全部PDF
+
+    Args:
+        pdf_dir (str): PDF目录
+        backends (list[str], optional): 参与对比的后端，默认为全部已安装的后端. Defaults to None.
+
+    Returns:
+        dict: 后端 -> {pages, seconds, sec_per_page, peak_rss_mb, failed}
+    """
+    pdf_files = load_pdfs(pdf_dir)
+    if not pdf_files:
+        return {}
+    # spawn的子进程不继承父进程的内存，峰值RSS只反映该后端本身
+    context = multiprocessing.get_context("spawn")
+    available = available_backends()
+    results = {}
+    for backend in backends or available:
+        # 未安装的后端会退回PyPDF2，不参与对比
+        if backend not in available:
+            print(f"PDF backend {backend} is not installed, skipped.")
+            continue
+        queue = context.Queue()
+        process = context.Process(target=run_backend, args=(backend, pdf_files, queue))
+        process.start()
+        pages, seconds, peak_rss, failed = queue.get()
+        process.join()
+        results[backend] = {
+            "files": len(pdf_files),
+            "pages": pages,
+            "seconds": seconds,
+            "sec_per_page": seconds / pages if pages else None,
+            "peak_rss_mb": peak_rss,
+            "failed": failed,
+        }
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="PDF text backend benchmark.")
+    arg_parser.add_argument(
+        "pdf_dir", nargs="?", default="data/fed_speeches/kansascity_fed_speeches/pdfs"
+    )
+    arg_parser.add_argument("--backends", nargs="*", default=None)
+    args = arg_parser.parse_args()
+
+    results = benchmark(args.pdf_dir, args.backends)
+    print(
+        "{:<12}{:>7}{:>8}{:>12}{:>12}{:>14}{:>8}".format(
+            "backend", "files", "pages", "seconds", "s/page", "peak RSS", "failed"
+        )
+    )
+    for backend, result in results.items():
+        sec_per_page = result["sec_per_page"]
+        peak_rss = result["peak_rss_mb"]
+        print(
+            "{:<12}{:>7}{:>8}{:>12.2f}{:>12}{:>14}{:>8}".format(
+                backend,
+                result["files"],
+                result["pages"],
+                result["seconds"],
+                f"{sec_per_page:.4f}" if sec_per_page is not None else "-",
+                f"{peak_rss:.1f} MB" if peak_rss is not None else "-",
+                result["failed"],
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
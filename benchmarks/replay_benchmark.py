@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   replay_benchmark.py
+@Time    :   2024/11/13 18:20:36
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   录制各联储爬虫访问的页面，并在本地回放以离线测量collect()的吞吐
+
+用法:
+    录制: python -m benchmarks.replay_benchmark record cleveland fixtures/cleveland
+    回放: python -m benchmarks.replay_benchmark replay cleveland fixtures/cleveland
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from data_scraper.orchestrator import count_speeches, discover_scrapers
+from utils.replay import start_recording, start_replay, stop_recording, stop_replay
+
+
+def run_collect(bank: str) -> tuple:
+    """在临时目录中运行一次collect，避免读到或覆盖已有数据
+
+    Returns:
+        tuple: (演讲篇数, 耗时秒数)
+    """
+    scraper_class = discover_scrapers()[bank]
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # SAVE_PATH为相对data_scraper/scrapers的路径
+        os.makedirs(os.path.join(workdir, "a", "b"))
+        os.chdir(os.path.join(workdir, "a", "b"))
+        try:
+            start = time.perf_counter()
+            with scraper_class() as scraper:
+                speeches = scraper.collect() or {}
+            elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+    return count_speeches(speeches), elapsed
+
+
+def record(bank: str, bundle_dir: str):
+    bundle_dir = os.path.abspath(bundle_dir)
+    recorder = start_recording(bundle_dir)
+    try:
+        counts, elapsed = run_collect(bank)
+    finally:
+        stop_recording()
+    print(
+        f"Recorded {len(recorder.manifest)} responses of {bank} "
+        f"({counts} speeches) in {elapsed:.2f}s into {bundle_dir}."
+    )
+
+
+def replay(bank: str, bundle_dir: str, port: int = 0):
+    bundle_dir = os.path.abspath(bundle_dir)
+    server = start_replay(bundle_dir, port)
+    try:
+        counts, elapsed = run_collect(bank)
+    finally:
+        stop_replay()
+    stats = server.stats
+    print(f"{'bank':<14}{'speeches':>10}{'seconds':>10}{'speeches/s':>12}{'served':>9}{'missed':>8}")
+    print(
+        f"{bank:<14}{counts:>10}{elapsed:>10.2f}"
+        f"{(counts / elapsed if elapsed else 0.0):>12.2f}"
+        f"{stats['served']:>9}{stats['missed']:>8}"
+    )
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("bank", choices=list(discover_scrapers()))
+    parser.add_argument("bundle_dir", help="fixture包目录")
+    parser.add_argument("--port", type=int, default=0, help="回放服务端口，默认随机")
+    args = parser.parse_args()
+    if args.mode == "record":
+        record(args.bank, args.bundle_dir)
+    else:
+        replay(args.bank, args.bundle_dir, args.port)
+
+
+if __name__ == "__main__":
+    main()
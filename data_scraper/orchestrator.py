@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   orchestrator.py
+@Time    :   2024/11/14 10:26:51
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   在多个进程中并发运行各联储爬虫，并汇总结果
+
+用法: python -m data_scraper.orchestrator [boston cleveland ...] --processes 4 --max-browsers 8
+发现列表接口: python -m data_scraper.orchestrator [atlanta ...] --discover-xhr
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import importlib
+import inspect
+import os
+import pkgutil
+import time
+
+from data_scraper.scrapers.scraper import SpeechScraper
+from utils.logger import logger
+from utils.rate_limiter import get_rate_limiter
+from utils.xhr_discovery import DEFAULT_ENDPOINTS_DIR, start_discovery, stop_discovery
+
+SCRAPERS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scrapers")
+
+
+def discover_scrapers() -> dict:
+    """扫描data_scraper/scrapers下的模块，找出所有SpeechScraper子类
+
+    Returns:
+        dict: 联储名 -> 爬虫类
+    """
+    scrapers = {}
+    for module_info in pkgutil.iter_modules([SCRAPERS_PATH]):
+        if module_info.name == "scraper":
+            continue
+        module_name = f"data_scraper.scrapers.{module_info.name}"
+        try:
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            logger.warning(f"Import {module_name} failed. {repr(e)}")
+            continue
+        for _, cls in inspect.getmembers(module, inspect.isclass):
+            if (
+                issubclass(cls, SpeechScraper)
+                and cls.__module__ == module_name
+                and not inspect.isabstract(cls)
+            ):
+                # 波士顿、里士满的__fed_name__带有_fed后缀
+                scrapers[cls.__fed_name__.removesuffix("_fed")] = cls
+    return dict(sorted(scrapers.items()))
+
+
+def count_speeches(speeches) -> int:
+    """统计collect返回的按年份分组的演讲篇数"""
+    if isinstance(speeches, dict):
+        return sum(len(v) for v in speeches.values() if isinstance(v, list))
+    if isinstance(speeches, list):
+        return len(speeches)
+    return 0
+
+
+def run_bank(
+    fed_name: str, max_browsers: int = 1, max_in_flight: int = None, reparse: bool = False
+) -> dict:
+    """在子进程中运行单个联储的爬虫，异常只记入结果，不影响其他联储
+
+    Args:
+        fed_name (str): 联储名
+        max_browsers (int, optional): 本进程可启动的Chrome实例数. Defaults to 1.
+        max_in_flight (int, optional): 本联储同一host的最大并发请求数. Defaults to None.
+        reparse (bool, optional): 只从原始存档重新解析. Defaults to False.
+
+    Returns:
+        dict: 运行结果
+    """
+    result = {
+        "bank": fed_name,
+        "status": "ok",
+        "speeches": 0,
+        "seconds": 0.0,
+        "token_wait": 0.0,
+        "error": "",
+    }
+    start = time.perf_counter()
+    try:
+        scraper_class = discover_scrapers()[fed_name]
+        # 主driver之外剩余的名额分给浏览器池
+        scraper_class.DRIVER_POOL_SIZE = min(
+            scraper_class.DRIVER_POOL_SIZE, max(0, max_browsers - 1)
+        )
+        if max_in_flight is not None:
+            scraper_class.MAX_IN_FLIGHT = max(1, min(scraper_class.MAX_IN_FLIGHT, max_in_flight))
+        # 各联储的SAVE_PATH是相对data_scraper/scrapers的路径
+        os.chdir(SCRAPERS_PATH)
+        with scraper_class() as scraper:
+            speeches = scraper.reparse() if reparse else scraper.collect()
+            result["fetch_stats"] = dict(scraper.fetch_stats)
+        result["speeches"] = count_speeches(speeches)
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = repr(e)
+        logger.exception(f"{fed_name} scraper failed.")
+    result["seconds"] = time.perf_counter() - start
+    # 本进程内等待限速令牌的总时间
+    result["token_wait"] = sum(s["waited"] for s in get_rate_limiter().stats.values())
+    return result
+
+
+def print_summary(results: list[dict], elapsed: float):
+    print(f"{'bank':<14}{'status':<8}{'speeches':>10}{'seconds':>10}{'token wait':>12}  error")
+    for result in sorted(results, key=lambda x: x["bank"]):
+        print(
+            f"{result['bank']:<14}{result['status']:<8}{result['speeches']:>10}"
+            f"{result['seconds']:>10.1f}{result.get('token_wait', 0.0):>12.1f}  {result['error']}"
+        )
+    total = sum(result["speeches"] for result in results)
+    failed = [result["bank"] for result in results if result["status"] != "ok"]
+    print(
+        f"{len(results)} banks, {total} speeches in {elapsed:.1f}s, "
+        f"{len(failed)} failed{': ' + ', '.join(failed) if failed else '.'}"
+    )
+
+
+def run_all(
+    banks: list[str] = None,
+    processes: int = 4,
+    max_browsers: int = 8,
+    max_in_flight: int = 16,
+    reparse: bool = False,
+) -> list[dict]:
+    """并发运行多个联储的爬虫
+
+    Args:
+        banks (list[str], optional): 联储名，默认全部. Defaults to None.
+        processes (int, optional): 进程数. Defaults to 4.
+        max_browsers (int, optional): 所有进程合计的Chrome实例上限. Defaults to 8.
+        max_in_flight (int, optional): 每个联储同一host的并发请求上限，各联储的host互不相同，
+            因此不按进程数分摊. Defaults to 16.
+        reparse (bool, optional): 只从原始存档重新解析. Defaults to False.
+
+    Returns:
+        list[dict]: 各联储的运行结果
+    """
+    available = discover_scrapers()
+    banks = banks or list(available)
+    unknown = [bank for bank in banks if bank not in available]
+    if unknown:
+        raise ValueError(f"Unknown banks: {unknown}. Available: {list(available)}")
+    # 每个联储至少需要一个Chrome，进程数不超过浏览器总数
+    processes = max(1, min(processes, len(banks), max_browsers))
+    browsers_per_process = max(1, max_browsers // processes)
+    print(
+        f"Running {len(banks)} banks in {processes} processes, "
+        f"{browsers_per_process} browsers each and up to {max_in_flight} requests in flight per host."
+    )
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {
+            executor.submit(
+                run_bank, bank, browsers_per_process, max_in_flight, reparse
+            ): bank
+            for bank in banks
+        }
+        for future in as_completed(futures):
+            bank = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # 子进程意外退出
+                result = {
+                    "bank": bank,
+                    "status": "crashed",
+                    "speeches": 0,
+                    "seconds": 0.0,
+                    "error": repr(e),
+                }
+            print(f"{bank} {result['status']} in {result['seconds']:.1f}s.")
+            results.append(result)
+    print_summary(results, time.perf_counter() - start)
+    return results
+
+
+def discover_endpoints(banks: list[str] = None, endpoints_dir: str = DEFAULT_ENDPOINTS_DIR) -> dict:
+    """发现模式：逐个操作各联储的列表页，把浏览器发出的XHR/fetch请求保存为接口清单
+
+    清单保存为endpoints_dir/{__fed_name__}.json，之后爬虫的listing_api()从中读取接口.
+
+    Args:
+        banks (list[str], optional): 联储名，默认全部. Defaults to None.
+        endpoints_dir (str, optional): 清单目录. Defaults to DEFAULT_ENDPOINTS_DIR.
+
+    Returns:
+        dict: 联储名 -> 记录到的接口数
+    """
+    scrapers = discover_scrapers()
+    os.chdir(SCRAPERS_PATH)
+    counts = {}
+    for bank in banks or sorted(scrapers):
+        scraper_class = scrapers[bank]
+        xhr_log = start_discovery(
+            os.path.join(endpoints_dir, f"{scraper_class.__fed_name__}.json")
+        )
+        try:
+            with scraper_class() as scraper:
+                scraper.extract_speech_infos()
+                scraper.record_traffic(scraper.driver)
+        except Exception as e:
+            logger.error(f"Discover XHR endpoints of {bank} failed. {repr(e)}")
+        finally:
+            counts[bank] = len(xhr_log.endpoints)
+            stop_discovery()
+        print(f"{bank}: {counts[bank]} XHR endpoints recorded.")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="并发运行各联储的演讲爬虫")
+    parser.add_argument("banks", nargs="*", help="联储名，默认全部")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--max-browsers", type=int, default=8)
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--reparse", action="store_true", help="只从原始存档重新解析")
+    parser.add_argument("--list", action="store_true", help="列出可用的联储")
+    parser.add_argument(
+        "--discover-xhr", action="store_true", help="记录列表页发出的XHR/fetch接口"
+    )
+    args = parser.parse_args()
+    if args.list:
+        print("\n".join(discover_scrapers()))
+        return
+    if args.discover_xhr:
+        discover_endpoints(args.banks)
+        return
+    run_all(args.banks, args.processes, args.max_browsers, args.max_in_flight, args.reparse)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,16 +9,15 @@
 """
 
 import os
+from concurrent.futures import ThreadPoolExecutor
+
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
-from bs4 import BeautifulSoup
-import time
 
 from data_scraper.scrapers.scraper import SpeechScraper
-from utils.common import parse_datestring
-from utils.file_saver import json_dump, json_load
+from utils.file_saver import json_dump, json_update
+from utils.html_parser import parse_html, selector_strainer
+from utils.logger import logger
 
 
 class AtlantaSpeechScraper(SpeechScraper):
@@ -26,6 +25,19 @@ class AtlantaSpeechScraper(SpeechScraper):
     __fed_name__ = "atlanta"
     __name__ = f"{__fed_name__.title()}SpeechScraper"
     SAVE_PATH = f"../../data/fed_speeches/{__fed_name__}_fed_speeches/"
+    FETCH_BACKEND = "requests"
+    MAX_IN_FLIGHT = 4
+    DRIVER_POOL_SIZE = 4
+    LISTING_SELECTOR = "div.row.frba-content_router-date-linked-headline-Teaser-grouped"
+    # 增量更新时只重新列出水位线所在年份及之后的年份
+    INCREMENTAL_YEARS_ONLY = True
+    # knockout列表背后的接口，先用发现模式记录
+    LISTING_API_PATTERN = r"atlantafed\.org/.*speech"
+    # 演讲人从详情页解析，接口条目不提供
+    API_FIELDS = {
+        k: v for k, v in SpeechScraper.API_FIELDS.items() if k != "speaker"
+    }
+    CONTENT_SELECTOR = "body > div.container > article:nth-child(2) > section > div.row > div.col-lg-11 > div.card.card-default.content-object-control.border-0 > div.card-block > div.main-content"
 
     def __init__(self, url: str = None, auto_save: bool = True):
         super().__init__(url)
@@ -83,19 +95,7 @@ class AtlantaSpeechScraper(SpeechScraper):
     def extract_single_speech(self, speech_info: dict):
         speech = {"speaker": "", "position": "", "highlights": "", "content": ""}
         try:
-            self.driver.get(speech_info["href"])
-            # 等待加载完
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located(
-                    (
-                        By.CSS_SELECTOR,
-                        "body > div.container > article:nth-child(2) > section > div.row > div.col-lg-11 > div.card.card-default.content-object-control.border-0 > div.card-block > div.main-content",
-                    )
-                )
-            )
-
-            page_source = self.driver.page_source
-            soup = BeautifulSoup(page_source, "html.parser")
+            soup = self.fetch_page(speech_info["href"], self.CONTENT_SELECTOR)
             # 演讲内容元素
             speech_content = soup.find("div", class_="main-content")
             speaker, speaker_position = self.parse_speaker(speech_content)
@@ -112,44 +112,23 @@ class AtlantaSpeechScraper(SpeechScraper):
                     href=speech_info["href"], error=repr(e)
                 )
             )
-            speech = {"speaker": "", "position": "", "highlights": "", "content": ""}
+            speech = {
+                "speaker": "",
+                "position": "",
+                "highlights": "",
+                "content": "",
+                "error": type(e).__name__,
+            }
         speech.update(speech_info)
         return speech
 
-    def extract_single_year_speech_infos(self, year):
-        # 选择年份
-        select_element = Select(self.driver.find_element(By.ID, "YearList"))
-        select_element.select_by_value(str(year))
-
-        # 点击筛选按钮
-        filter_button = self.driver.find_element(
-            By.XPATH,
-            "/html/body/div[1]/article[2]/section/div[2]/div[2]/div[2]/div/div/div[1]/form/div/div[2]/input[1]",
-        )
-        filter_button.click()
-
-        self.driver.implicitly_wait(2)
-        time.sleep(2)
-        # 等待加载完
-        WebDriverWait(self.driver, 3).until(
-            EC.presence_of_all_elements_located(
-                (
-                    By.CLASS_NAME,
-                    "row.frba-content_router-date-linked-headline-Teaser-grouped",
-                )
-            )
-        )
-
-        # 获取页面源码
-        page_source = self.driver.page_source
-
-        soup = BeautifulSoup(page_source, "html.parser")
+    def parse_year_page(self, page_source: str) -> list[dict]:
+        """解析筛选出某一年后的列表页"""
+        soup = parse_html(page_source, selector_strainer(self.LISTING_SELECTOR))
         speech_infos = []
 
         # 查找包含演讲信息的 div 元素
-        speech_container = soup.find(
-            "div", class_="row frba-content_router-date-linked-headline-Teaser-grouped"
-        )
+        speech_container = soup.select_one(self.LISTING_SELECTOR)
 
         # 包含这一年所有文章的元素
         foreach_item = speech_container.find(
@@ -164,33 +143,128 @@ class AtlantaSpeechScraper(SpeechScraper):
             speech_info = {
                 "date": dates[i].text.strip(),
                 "title": title_links[i].text.strip(),
-                "href": title_links[i]["href"],
+                "href": self.absolute_url(title_links[i]["href"]),
                 "highlights": highlights[i].text.strip(),
             }
             speech_infos.append(speech_info)
 
         return speech_infos
 
+    def extract_single_year_speech_infos(self, year, driver=None):
+        """在浏览器中筛选出某一年的演讲并解析
+
+        Args:
+            year (int): 年份
+            driver (WebDriver, optional): 浏览器池中的driver，默认为self.driver. Defaults to None.
+        """
+        driver = self.driver if driver is None else driver
+        # 浏览器池中的driver需先打开列表页
+        if not driver.current_url.startswith(self.url):
+            self.navigate(self.url, driver)
+            self.wait_for_element((By.ID, "YearList"), driver=driver)
+        # 选择年份
+        select_element = Select(driver.find_element(By.ID, "YearList"))
+        select_element.select_by_value(str(year))
+
+        # 点击筛选按钮
+        filter_button = driver.find_element(
+            By.XPATH,
+            "/html/body/div[1]/article[2]/section/div[2]/div[2]/div[2]/div/div/div[1]/form/div/div[2]/input[1]",
+        )
+        old_items = driver.find_elements(
+            By.CSS_SELECTOR, "div[data-bind='foreach: items'] > *"
+        )[:1]
+        filter_button.click()
+
+        # 等待knockout重新渲染列表
+        self.wait_for_page_change(
+            old_items, selector="div[data-bind='foreach: items']", driver=driver
+        )
+        # 等待加载完
+        self.wait_for_element((By.CSS_SELECTOR, self.LISTING_SELECTOR), timeout=3, driver=driver)
+        self.record_traffic(driver)
+        return self.parse_year_page(driver.page_source)
+
+    def listing_years(self) -> list[int]:
+        """需要列出的年份，从新到旧排列
+
+        增量更新且INCREMENTAL_YEARS_ONLY时，只列出水位线所在年份及之后的年份，通常就是当年.
+        """
+        try:
+            soup = parse_html(self.fetcher.fetch(self.url).text)
+        except Exception as e:
+            logger.warning(f"Static fetch of {self.url} failed. {repr(e)}")
+            soup = self.snapshot()
+        years = sorted(
+            {
+                int(option.get_text().strip())
+                for option in soup.select("#YearList option")
+                if option.get_text().strip().isdigit()
+            },
+            reverse=True,
+        )
+        if (
+            self.INCREMENTAL_YEARS_ONLY
+            and self.watermark is not None
+            and self.watermark.latest_date is not None
+        ):
+            years = [year for year in years if year >= self.watermark.latest_date.year]
+            print(f"Refresh speech infos of {years} only.")
+        return years
+
+    def extract_speech_infos_from_api(self) -> list[dict]:
+        """按年份重放发现到的列表接口"""
+        endpoint = self.listing_api()
+        if endpoint is None:
+            return None
+        years = self.listing_years()
+
+        def fetch_year(year):
+            params = {"year": year} if year else None
+            return self.api_speech_infos(self.call_api(endpoint, params))
+
+        with ThreadPoolExecutor(max_workers=max(1, self.MAX_IN_FLIGHT)) as executor:
+            pages = list(executor.map(fetch_year, years or [None]))
+        # 接口不按年份筛选时各年返回相同的条目
+        speech_infos = {}
+        for page_infos in pages:
+            for speech_info in page_infos:
+                speech_infos.setdefault(speech_info["href"], speech_info)
+        return list(speech_infos.values())
+
     def extract_speech_infos(self):
         """Extract speech infos from the website."""
-        # 获取下拉框控件的所有选项
-        years = [
-            int(option.text)
-            for option in Select(self.driver.find_element(By.ID, "YearList")).options
-            if option.text.isdigit()
-        ]
-
+        # 优先请求列表接口，不可用时再逐年操作页面
+        speech_infos_by_year = self.listing_from_api()
+        if speech_infos_by_year is not None:
+            return speech_infos_by_year
+
+        years = self.listing_years()
+        print(f"Start scraping speeches of {len(years)} years...")
+        if self.DRIVER_POOL_SIZE > 0 and len(years) > 1:
+
+            def extract_year(driver, year):
+                try:
+                    return self.extract_single_year_speech_infos(year, driver)
+                except Exception as e:
+                    logger.warning(f"Extract speech infos of {year} failed. {repr(e)}")
+                    return None
+
+            # 每个driver独立打开列表页，并发筛选各年份
+            results = self.get_driver_pool().map(extract_year, years)
+            # 失败的年份在主浏览器中重试
+            results = [
+                self.extract_single_year_speech_infos(year) if infos is None else infos
+                for year, infos in zip(years, results)
+            ]
+        else:
+            results = [self.extract_single_year_speech_infos(year) for year in years]
+        # 按listing_years的顺序合并，与列表页一致从新到旧
         speech_infos_by_year = {}
-        for year in years:
-            print(f"Start scraping speeches of {year}...")
-            single_year_speech_infos = self.extract_single_year_speech_infos(year)
+        for year, single_year_speech_infos in zip(years, results):
             speech_infos_by_year[year] = single_year_speech_infos
-            print(f"Fetched speeches for {year}")
-        json_dump(
-            speech_infos_by_year,
-            self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
-        )
-        print(f"All speech infos of {self.__fed_name__} fetched and saved.")
+            print(f"Fetched {len(single_year_speech_infos)} speeches for {year}")
+        print(f"All speech infos of {self.__fed_name__} fetched.")
         return speech_infos_by_year
 
     def extract_speeches(self, speech_infos_by_year: dict):
@@ -199,72 +273,52 @@ class AtlantaSpeechScraper(SpeechScraper):
         failed = []
         for year, single_year_infos in speech_infos_by_year.items():
             singe_year_speeches = []
+            # 并发预取本年度的详情页
+            self.prefetch_pages(single_year_infos)
             for speech_info in single_year_infos:
-                single_speech = self.extract_single_speech(speech_info)
+                single_speech = self.run_job(speech_info)
                 if single_speech["content"] == "":
                     # 记录提取失败的报告
                     failed.append(single_speech)
                 singe_year_speeches.append(single_speech)
             speeches_by_year[year] = singe_year_speeches
             if self.save:
-                json_dump(
-                    singe_year_speeches,
+                json_update(
                     self.SAVE_PATH + f"{self.__fed_name__}_speeches_{year}.json",
+                    singe_year_speeches,
                 )
         if self.save:
             json_dump(
                 failed, self.SAVE_PATH + f"{self.__fed_name__}_failed_speech_infos.json"
             )
-            json_dump(
-                speeches_by_year, self.SAVE_PATH + f"{self.__fed_name__}_speeches.json"
+            # 更新已存储的演讲内容
+            json_update(
+                self.SAVE_PATH + f"{self.__fed_name__}_speeches.json", speeches_by_year
             )
         return speeches_by_year
 
-    def update(self, year):
-        """如何拉取更新的数据呢？
-
-        记载最新的讲话数据，然后从网站获取最新讲话的时间，做判断.
-
-        Args:
-            year (_type_): _description_
-        """
-        # 已存储的最新报告日期
-        if os.path.exists(self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"):
-            speech_infos = json_load(
-                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
-            )
-            latest_year = int(max(speech_infos.keys()))
-            dates = [parse_datestring(sp["date"]) for sp in speech_infos[latest_year]]
-            latest_speech_date = max(dates)
-        else:
-            latest_speech_date = None
-        # 网页上最新的演讲日期（默认不点控件的第一个讲话）
-        return latest_speech_date
-
     def collect(self):
         """收集每篇演讲的信息
 
         Returns:
             _type_: _description_
         """
-        # 提取每年演讲的信息，若存在则不再更新？.做更新机制.
+        # 已有演讲信息时只刷新列表页，增量抓取新的演讲
         if os.path.exists(self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"):
-            speech_infos = json_load(
-                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
+            print("Speech Infos Data already exists, update incrementally.")
+            return self.update()
+
+        # 提取每年演讲的基本信息（不含正文和highlights等）
+        speech_infos = self.extract_speech_infos()
+        if self.save:
+            json_dump(
+                speech_infos,
+                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
             )
-            print("Speech Infos Data already exists, skip collecting.")
-        else:
-            speech_infos = self.extract_speech_infos()
-            if self.save:
-                json_dump(
-                    speech_infos,
-                    self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
-                )
 
-        # 提取演讲内容
+        # 提取演讲正文内容
         speeches = self.extract_speeches(speech_infos)
-        if self.save:
-            json_dump(speeches, self.SAVE_PATH + f"{self.__fed_name__}_speeches.json")
+        self.save_watermark(speeches)
         return speeches
 
 
@@ -290,8 +344,8 @@ def test_extract_speech_infos():
 
 
 def test():
-    scraper = AtlantaSpeechScraper()
-    scraper.collect()
+    with AtlantaSpeechScraper() as scraper:
+        scraper.collect()
 
 
 if __name__ == "__main__":
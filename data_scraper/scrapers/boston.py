@@ -12,20 +12,15 @@
 from datetime import datetime
 import os
 import re
-import sys
-import time
 
 from utils.logger import get_logger
 from utils.common import parse_datestring
 
-sys.path.append("../../")
-from scraper import SpeechScraper
+from data_scraper.scrapers.scraper import SpeechScraper
 
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.remote.webelement import WebElement
-from utils.file_saver import json_dump, json_load, json_update
+from bs4.element import Tag
+from utils.file_saver import json_dump, json_update
 
 logger = get_logger('boston_speech_scraper')
 
@@ -34,6 +29,11 @@ class BostonSpeechScraper(SpeechScraper):
     __fed_name__ = "boston_fed"
     __name__ = f"{__fed_name__.title()}SpeechScraper"
     SAVE_PATH = f"../../data/fed_speeches/{__fed_name__}_fed_speeches/"
+    FETCH_BACKEND = "requests"
+    MAX_IN_FLIGHT = 16
+    RATE_LIMIT = 8.0
+    RATE_BURST = 16
+    CONTENT_SELECTOR = "#main-content > div.bodytextlist > div.container > div.row > div.col-sm-10.col-md-8.center-block > div.tag-box-container"
 
     def __init__(self, url: str = None, auto_save: bool = True):
         super().__init__(url)
@@ -69,41 +69,38 @@ class BostonSpeechScraper(SpeechScraper):
         return date
         
 
-    def parse_single_row(self, data_row: WebElement):
+    def parse_single_row(self, data_row: Tag):
         """解析Boston中的单个文章
 
         Args:
-            data_row (_type_): _description_
+            data_row (Tag): 页面快照中的数据行
 
         Returns:
-            _type_: _description_
+            dict: 演讲信息
         """
         try:
             # 日期
-            date_and_location = data_row.find_elements(
-                By.CSS_SELECTOR,
-                "p.date-and-location",
-            )
+            date_and_location = data_row.select("p.date-and-location")
             if date_and_location:
-                date = date_and_location[0].text.split("|")[0].strip()
+                date = date_and_location[0].get_text().split("|")[0].strip()
             else:
-                date = self.extract_speech_date(data_row.text)
+                date = self.extract_speech_date(data_row.get_text("\n", strip=True))
             # 标题
-            title_element = data_row.find_elements(By.CSS_SELECTOR, "h1.card-title > a[href]")
+            title_element = data_row.select("h1.card-title > a[href]")
             if title_element:
-                title = title_element[0].text
-                href = title_element[0].get_attribute("href")
+                title = title_element[0].get_text().strip()
+                href = self.absolute_url(title_element[0]["href"])
             else:
                 title = ""
                 href = ""
             # 总结
-            summaries = data_row.find_elements(By.CSS_SELECTOR, "p.event-text")
-            summary = "\n\n".join(
-                [p.text for p in summaries]  # .find_elements(By.TAG_NAME, "p")
-            )
+            summaries = data_row.select("p.event-text")
+            summary = "\n\n".join([p.get_text().strip() for p in summaries])
             # 作者
-            speaker_paragraphs = data_row.find_elements(By.CSS_SELECTOR, "ul.speaker")
-            speaker = "\n\n".join([p.text for p in speaker_paragraphs])
+            speaker_paragraphs = data_row.select("ul.speaker")
+            speaker = "\n\n".join(
+                [p.get_text("\n", strip=True) for p in speaker_paragraphs]
+            )
 
             speech_info = {
                 "date": date,
@@ -138,37 +135,30 @@ class BostonSpeechScraper(SpeechScraper):
         )
         expand_all.click()
         # Wait for the content to load
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located(
-                (By.XPATH, "/html/body/main/div[1]/div[2]/div/div[2]")
-            )
-        )
+        self.wait_for_element((By.XPATH, "/html/body/main/div[1]/div[2]/div/div[2]"))
 
-        panel_group = self.driver.find_element(
-            By.XPATH, "/html/body/main/div[1]/div[2]/div/div[2]"
+        # 展开后对整页做一次快照再解析
+        soup = self.snapshot()
+        panel_group = soup.select_one(
+            "body > main > div:nth-of-type(1) > div:nth-of-type(2) > div > div:nth-of-type(2)"
         )
-        speeches_by_year = panel_group.find_elements(By.CLASS_NAME, "panel")
+        speeches_by_year = panel_group.select(".panel")
         speech_infos_by_year = {}
         counts = 0
         # 获取每一年的演讲
         for single_year_speeches in speeches_by_year:
             # 标题
-            year = single_year_speeches.find_element(
-                By.CSS_SELECTOR,
+            year = single_year_speeches.select_one(
                 "div.panel-heading > h4.panel-title > span.heading-title-text",
-            ).text
+            ).get_text().strip()
             # 按数据行进行处理
-            data_rows = single_year_speeches.find_elements(
-                By.CSS_SELECTOR,
+            data_rows = single_year_speeches.select(
                 "div.panel-collapse > div.panel-body > div.article-list-container > div.row",
             )
-            data_rows
             speech_infos_single_year = []
             for data_row in data_rows:
                 speech_info = self.parse_single_row(data_row)
-                if speech_info and speech_info["href"].startswith(
-                    "https://www.bostonfed.org/"
-                ):
+                if speech_info and self.is_site_url(speech_info["href"]):
                     print(
                         "{date}. {title}. {speaker}\n".format(
                             date=speech_info["date"],
@@ -193,51 +183,39 @@ class BostonSpeechScraper(SpeechScraper):
     def extract_single_speech(self, speech_info: dict):
         try:
             href = speech_info["href"]
-            self.driver.get(href)
-
-            # Wait for the content to load
-            WebDriverWait(self.driver, 10).until(
-                EC.visibility_of_all_elements_located((By.ID, "main-content"))
-            )
-            time.sleep(1.2)
+            soup = self.fetch_page(href, self.CONTENT_SELECTOR)
 
             # 演讲标题
             # speech_title = self.driver.find_element(
             #     By.CSS_SELECTOR,
             #     "#main-content > div.container.title-container > div > div > div > div > h1",
             # ).text
-            speech_title = self.driver.find_element(
-                By.XPATH,
-                "//h1[contains(@class, 'title')]"
-            ).text
+            speech_title = soup.select_one("h1[class*='title']").get_text().strip()
             # 重点
-            highlights_elements = self.driver.find_elements(
-                By.CSS_SELECTOR,
-                "#main-content > div:nth-child(9) > div > div > p",
+            highlights_elements = soup.select(
+                "#main-content > div:nth-child(9) > div > div > p"
             )
             if highlights_elements:
                 highlights = "\n\n".join(
-                    [highlight.text for highlight in highlights_elements]
+                    [highlight.get_text().strip() for highlight in highlights_elements]
                 )
             else:
                 highlights = ""
             # 内容
-            content_elements = self.driver.find_element(
-                By.CSS_SELECTOR,
-                "#main-content > div.bodytextlist > div.container > div.row > div.col-sm-10.col-md-8.center-block > div.tag-box-container",
-            )
-            contents = content_elements.text
+            content_elements = soup.select_one(self.CONTENT_SELECTOR)
+            contents = content_elements.get_text("\n", strip=True)
             speech = {
                 "speech_title": speech_title,
                 "highlights": highlights,
                 "content": contents,
             }
-        except:
+        except Exception as e:
             print(f"Error when extracting speech content from {href}")
             speech = {
                 "speech_title": "",
                 "highlights": "",
                 "content": "",
+                "error": type(e).__name__,
             }
         speech.update(speech_info)
         return speech
@@ -260,6 +238,8 @@ class BostonSpeechScraper(SpeechScraper):
             if int(year) < start_year:
                 continue
             single_year_speeches = []
+            # 并发预取本年度的详情页
+            self.prefetch_pages(single_year_infos, start_date)
             for speech_info in single_year_infos:
                 if not speech_info["date"] or speech_info["date"] == "":
                     continue
@@ -274,7 +254,7 @@ class BostonSpeechScraper(SpeechScraper):
                     )
                     continue
                 # 提取演讲正文
-                single_speech = self.extract_single_speech(speech_info)
+                single_speech = self.run_job(speech_info)
                 if single_speech["content"] == "":
                     # 记录提取失败的报告
                     failed.append(single_speech)
@@ -311,33 +291,22 @@ class BostonSpeechScraper(SpeechScraper):
         Returns:
             _type_: _description_
         """
-        # 提取每年演讲的基本信息（不含正文和highlights等）
+        # 已有演讲信息时只刷新列表页，增量抓取新的演讲
         if os.path.exists(self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"):
-            speech_infos = json_load(
-                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
+            logger.info("Speech Infos Data already exists, update incrementally.")
+            return self.update()
+
+        # 提取每年演讲的基本信息（不含正文和highlights等）
+        speech_infos = self.extract_speech_infos()
+        if self.save:
+            json_dump(
+                speech_infos,
+                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
             )
-            # 查看已有的最新的演讲日期
-            latest_year = max([k for k, _ in speech_infos.items()])
-            dates = []
-            for speech_info in speech_infos[latest_year]:
-                speech_date = parse_datestring(speech_info["date"])
-                if isinstance(speech_date, datetime):
-                    dates.append(speech_date)
-            existed_lastest = max(dates).strftime("%b %d, %Y")
-            # existed_lastest = "Jan 01, 2006"
-            existed_lastest = "Jan 01, 2006"
-            logger.info("Speech Infos Data already exists, skip collecting infos.")
-        else:
-            speech_infos = self.extract_speech_infos()
-            if self.save:
-                json_dump(
-                    speech_infos,
-                    self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
-                )
-            existed_lastest = "Jan 01, 2006"
 
         # 提取演讲正文内容
-        speeches = self.extract_speeches(speech_infos, existed_lastest)
+        speeches = self.extract_speeches(speech_infos)
+        self.save_watermark(speeches)
         return speeches
 
 
@@ -373,8 +342,8 @@ def test_extract_single_speech():
 
 
 def test():
-    scraper = BostonSpeechScraper()
-    scraper.collect()
+    with BostonSpeechScraper() as scraper:
+        scraper.collect()
 
 
 if __name__ == "__main__":
@@ -12,23 +12,14 @@ from collections import OrderedDict
 import os
 import re
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support.ui import Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.remote.webelement import WebElement
-from selenium.common.exceptions import (
-    TimeoutException,
-    WebDriverException,
-    NoSuchElementException,
-)
 
 from bs4 import BeautifulSoup
-import time
 from datetime import datetime
 
 from data_scraper.scrapers.scraper import SpeechScraper
 from utils.common import parse_datestring
-from utils.file_saver import json_dump, json_load, json_update, records_update
+from utils.file_saver import json_dump, json_update, records_update
+from utils.html_parser import parse_html
 from utils.logger import logger
 
 today = datetime.today()
@@ -39,6 +30,17 @@ class ChicagoSpeechScraper(SpeechScraper):
     __fed_name__ = "chicago"
     __name__ = f"{__fed_name__.title()}SpeechScraper"
     SAVE_PATH = f"../../data/fed_speeches/{__fed_name__}_fed_speeches/"
+    CONTENT_SELECTOR = "div.cfedContent p, div.event__intro > p, div.cfedCotent__text p"
+    FETCH_BACKEND = "requests"
+    MAX_IN_FLIGHT = 4
+    DRIVER_POOL_SIZE = 4
+    # 历任行长列表
+    PRESIDENTS_SELECTOR = "table.focus-people tr > td[style*='!important;']"
+    # Goolsbee页面 Speaking Engagements 中的演讲
+    GOOLSBEE_SELECTOR = "div.cyan-publication"
+    # 其他行长页面 Speeches 标签页中的演讲
+    SPEECHES_SELECTOR = "section#speeches > div.peoplePublication__container"
+    LISTING_SELECTOR = f"{GOOLSBEE_SELECTOR}, {SPEECHES_SELECTOR}"
 
     def __init__(self, url: str = None, auto_save: bool = True):
         super().__init__(url)
@@ -58,118 +60,131 @@ class ChicagoSpeechScraper(SpeechScraper):
         else:
             return "Unknown"
 
-    def extract_president_speech_infos(self, president_info: dict):
-        """提取芝加哥联储某位行长的演讲信息
+    def parse_president_page(self, soup: BeautifulSoup, president_info: dict) -> dict:
+        """解析某位行长页面中的演讲列表，按年份组织
 
         Args:
-            president_info (dict): _description_
+            soup (BeautifulSoup): 行长页面
+            president_info (dict): 行长信息
+
+        Returns:
+            dict: 年份 -> 演讲信息
         """
-        href = president_info["href"]
-        self.driver.get(href)
-        time.sleep(1.0)
-        WebDriverWait(self.driver, 10).until(
-            EC.visibility_of_all_elements_located((By.TAG_NAME, "body"))
-        )
         speech_infos = {}
         # 如果是Goolsbee，分流
         if president_info["name"].endswith("Goolsbee"):
-            # 点击 Speaking Engagements
-            click_speaking_engagement = self.driver.find_element(
-                By.XPATH, "//a[@href and text()='Speaking Engagements']"
-            )
-            click_speaking_engagement.click()
-            time.sleep(1.2)
-            # 找到所有的演讲元素
-            speech_items = self.driver.find_elements(
-                By.XPATH, "//div[@class='cyan-publication']"
-            )
-            # 搜集所有资料
-            for item in speech_items:
-                title = item.find_element(By.XPATH, "./a[@href]").text.strip()
-                href = item.find_element(By.XPATH, "./a[@href]").get_attribute("href")
-                date = item.find_element(
-                    By.XPATH, "./p[@class='cyan-publication-date']"
-                ).text.strip()
-                summary = item.text.split("\n")[-1].strip()
+            # Speaking Engagements 中的演讲
+            for item in soup.select(self.GOOLSBEE_SELECTOR):
+                link = item.select_one(":scope > a[href]")
+                date = item.select_one(":scope > p.cyan-publication-date").get_text().strip()
+                summary = item.get_text("\n", strip=True).split("\n")[-1].strip()
                 # 按年收纳
                 year = str(parse_datestring(date).year)
                 speech_infos.setdefault(year, []).append(
                     {
                         "speaker": president_info["name"],
-                        "title": title,
-                        "href": href,
+                        "title": link.get_text().strip(),
+                        "href": self.absolute_url(link["href"]),
                         "date": date,
                         "summary": summary,
                     }
                 )
         else:
-            # 点击 Speeches
-            click_speeches = self.driver.find_element(By.XPATH, "//label[@for='tab7']")
-            click_speeches.click()
-            time.sleep(1.2)
-            speech_items = self.driver.find_elements(
-                By.XPATH,
-                "//section[@id='speeches']/div[@class='peoplePublication__container']",
-            )
-            for item in speech_items:
-                title = item.find_element(By.XPATH, "./div/a[@href]").text.strip()
-                href = item.find_element(By.XPATH, "./div/a[@href]").get_attribute(
-                    "href"
-                )
-                p_items = item.find_elements(By.TAG_NAME, "p")
-                summary = "\n\n".join([p.text for p in p_items]).strip()
+            # Speeches 标签页中的演讲
+            for item in soup.select(self.SPEECHES_SELECTOR):
+                link = item.select_one(":scope > div > a[href]")
+                summary = "\n\n".join(
+                    [p.get_text().strip() for p in item.find_all("p")]
+                ).strip()
                 # 查找上一个h3元素
-                year = item.find_element(By.XPATH, "./preceding-sibling::h3[1]").text
+                year = item.find_previous_sibling("h3").get_text().strip()
                 speech_infos.setdefault(year, []).append(
                     {
                         "speaker": president_info["name"],
-                        "title": title,
-                        "href": href,
+                        "title": link.get_text().strip(),
+                        "href": self.absolute_url(link["href"]),
                         "summary": summary,
                     }
                 )
-
         return speech_infos
 
-    def extract_speech_infos(self):
-        """抽取演讲的信息"""
-        # 搜寻历任每一任主席的资料
-        president_elements = self.driver.find_elements(
-            By.XPATH,
-            "//table[@class='focus-people']/tbody/tr/td[contains(@style, '!important;')]",
+    def extract_president_speech_infos(self, president_info: dict):
+        """在浏览器中打开某位行长的页面，点击演讲标签后提取演讲信息
+
+        仅在并发获取的页面中找不到演讲列表时使用.
+
+        Args:
+            president_info (dict): _description_
+        """
+        self.navigate(president_info["href"])
+        self.wait_for_element((By.TAG_NAME, "body"), visible=True)
+        if president_info["name"].endswith("Goolsbee"):
+            # 点击 Speaking Engagements
+            tab, selector = "//a[@href and text()='Speaking Engagements']", self.GOOLSBEE_SELECTOR
+        else:
+            # 点击 Speeches
+            tab, selector = "//label[@for='tab7']", self.SPEECHES_SELECTOR
+        self.wait_for_element((By.XPATH, tab)).click()
+        self.wait_for_element(
+            (By.CSS_SELECTOR, selector), visible=True, raise_on_timeout=False
         )
+        return self.parse_president_page(self.snapshot(), president_info)
+
+    def parse_president_infos(self, soup: BeautifulSoup) -> list[dict]:
+        """解析历任行长的姓名、页面链接及任期"""
         president_infos = []
-        for element in president_elements:
-            # 名字
-            name = element.find_element(By.XPATH, "./a[@title]").text
-            # 链接
-            href = element.find_element(By.XPATH, "./a[@title]").get_attribute("href")
-            paras = element.text.split("\n")
+        for element in soup.select(self.PRESIDENTS_SELECTOR):
+            link = element.select_one(":scope > a[title]")
+            paras = element.get_text("\n", strip=True).split("\n")
             # 任期
             start_year = paras[-1].split(" – ")[0].strip()
             last_year = paras[-1].split(" – ")[-1].strip()
             last_year = str(today.year) if last_year == "present" else last_year
-            # 名讳
-            order = paras[-2]
             president_infos.append(
                 {
-                    "name": name,
-                    "href": href,
-                    "order": order,
+                    # 名字
+                    "name": link.get_text().strip(),
+                    # 链接
+                    "href": self.absolute_url(link["href"]),
+                    # 名讳
+                    "order": paras[-2],
                     "start_year": start_year,
                     "last_year": last_year,
                 }
             )
+        return president_infos
 
-        # 主循环获取所有演讲信息
+    def extract_speech_infos(self):
+        """抽取演讲的信息"""
+        # 搜寻历任每一任主席的资料
+        index_page = self.fetch_listing_pages(
+            [self.url], selector=self.PRESIDENTS_SELECTOR, paged=False
+        ).get(self.url, "")
+        # 太早的不要
+        president_infos = [
+            president_info
+            for president_info in self.parse_president_infos(parse_html(index_page))
+            if president_info["start_year"] >= "1994"
+        ]
+
+        # 并发获取各位行长的页面，演讲列表不在静态HTML中的页面由浏览器池渲染
+        pages = self.fetch_listing_pages(
+            [president_info["href"] for president_info in president_infos],
+            selector=self.LISTING_SELECTOR,
+            paged=False,
+        )
         speech_infos_by_year = {}
         for president_info in president_infos:
-            # 太早的不要
-            if president_info["start_year"] < "1994":
-                continue
-            # 主席名称
-            # speaker = president_info['name']
-            infos = self.extract_president_speech_infos(president_info)
+            infos = self.parse_president_page(
+                parse_html(pages.get(president_info["href"], "")), president_info
+            )
+            if not infos:
+                # 演讲列表需点击标签页才加载时，退回浏览器逐个点击
+                logger.warning(
+                    f"No speeches found on {president_info['href']}, click the tab in browser."
+                )
+                infos = self.extract_president_speech_infos(president_info)
+            # 按年份合并
             for year, new_speech_infos in infos.items():
                 if year in speech_infos_by_year:
                     speech_infos_by_year[year] = records_update(
@@ -187,40 +202,22 @@ class ChicagoSpeechScraper(SpeechScraper):
     def extract_single_speech(self, speech_info: dict):
         speech = {"speaker": "", "position": "", "highlights": "", "content": ""}
         try:
-            self.driver.get(speech_info["href"])
-            # 等待加载完
-            WebDriverWait(self.driver, 10).until(
-                EC.visibility_of_all_elements_located((By.TAG_NAME, "body"))
-            )
-            time.sleep(1.2)
+            soup = self.fetch_page(speech_info["href"], self.CONTENT_SELECTOR)
 
             # last updated date
-            last_updated_elements = self.driver.find_elements(
-                By.CLASS_NAME, "cfedDetail__lastUpdated"
-            )
-            if last_updated_elements:
-                last_updated = last_updated_elements[0].text.split(":")[1].strip()
+            last_updated_element = soup.select_one(".cfedDetail__lastUpdated")
+            if last_updated_element is not None:
+                last_updated = last_updated_element.get_text().split(":")[1].strip()
                 last_updated = parse_datestring(last_updated).strftime("%B %d, %Y")
                 speech_info["date"] = last_updated
             else:
                 speech_info.setdefault("date", "")
 
-
-            # 查找所有元素
-            options = [
-                "//div[@class='cfedContent']//p",
-                "//div[@class='event__intro']/p",
-                "//div[@class='cfedCotent__text']//p",
-                "//div[@class='cfedCotent__text']/p",
-                "//div[@class='cfedCotent__text']/div/p",
-            ]
-            paragraph_elements = self.driver.find_elements(
-                By.XPATH,
-                "|".join(options),
-            )
+            # 查找所有段落
+            paragraph_elements = soup.select(self.CONTENT_SELECTOR)
 
             if paragraph_elements:
-                content = "\n\n".join([p.text.strip() for p in paragraph_elements]).strip()
+                content = "\n\n".join([p.get_text().strip() for p in paragraph_elements]).strip()
                 print(
                     "{} {} {} content extracted.".format(
                         speech_info["speaker"],
@@ -245,10 +242,12 @@ class ChicagoSpeechScraper(SpeechScraper):
                     href=speech_info["href"], error=repr(e)
                 )
             )
-            speech = {"content": ""}
+            speech = {"content": "", "error": type(e).__name__}
             print(
                 "{} {} {} content failed.".format(
-                    speech_info["speaker"], speech_info["date"], speech_info["title"]
+                    speech_info.get("speaker", ""),
+                    speech_info.get("date", ""),
+                    speech_info["title"],
                 )
             )
         speech.update(speech_info)
@@ -272,6 +271,8 @@ class ChicagoSpeechScraper(SpeechScraper):
             if int(year) < start_year:
                 continue
             single_year_speeches = []
+            # 并发预取本年度的详情页
+            self.prefetch_pages(single_year_infos, start_date)
             for speech_info in single_year_infos:
                 if (
                     speech_info.get("date")
@@ -279,21 +280,21 @@ class ChicagoSpeechScraper(SpeechScraper):
                 ):
                     logger.info(
                         "Skip speech {speaker} {date} {title} cause' it's earlier than start_date.".format(
-                            speaker=speech_info["speaker"],
-                            date=speech_info["date"],
+                            speaker=speech_info.get("speaker", ""),
+                            date=speech_info.get("date", ""),
                             title=speech_info["title"],
                         )
                     )
                     continue
                 # 提取演讲正文
-                single_speech = self.extract_single_speech(speech_info)
+                single_speech = self.run_job(speech_info)
                 if single_speech["content"] == "":
                     # 记录提取失败的报告
                     failed.append(single_speech)
                     logger.warning(
                         "Extract {speaker} {date} {title}".format(
-                            speaker=speech_info["speaker"],
-                            date=speech_info["date"],
+                            speaker=speech_info.get("speaker", ""),
+                            date=speech_info.get("date", ""),
                             title=speech_info["title"],
                         )
                     )
@@ -323,32 +324,22 @@ class ChicagoSpeechScraper(SpeechScraper):
         Returns:
             _type_: _description_
         """
-        # 提取每年演讲的基本信息（不含正文和highlights等）
+        # 已有演讲信息时只刷新列表页，增量抓取新的演讲
         if os.path.exists(self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"):
-            speech_infos = json_load(
-                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
+            logger.info("Speech Infos Data already exists, update incrementally.")
+            return self.update()
+
+        # 提取每年演讲的基本信息（不含正文和highlights等）
+        speech_infos = self.extract_speech_infos()
+        if self.save:
+            json_dump(
+                speech_infos,
+                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
             )
-            # 查看已有的最新的演讲日期
-            latest_year = max([k for k, _ in speech_infos.items()])
-            existed_lastest = max(
-                [
-                    parse_datestring(speech_info["date"])
-                    for speech_info in speech_infos[latest_year]
-                ]
-            ).strftime("%b %d, %Y")
-            logger.info("Speech Infos Data already exists, skip collecting infos.")
-            existed_lastest = "Jan 01, 2024"
-        else:
-            speech_infos = self.extract_speech_infos()
-            if self.save:
-                json_dump(
-                    speech_infos,
-                    self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
-                )
-            existed_lastest = "Jan 01, 2006"
 
         # 提取演讲正文内容
-        speeches = self.extract_speeches(speech_infos, existed_lastest)
+        speeches = self.extract_speeches(speech_infos)
+        self.save_watermark(speeches)
         return speeches
 
 
@@ -374,8 +365,8 @@ def test_extract_single_speech():
 
 
 def test():
-    scraper = ChicagoSpeechScraper()
-    scraper.collect()
+    with ChicagoSpeechScraper() as scraper:
+        scraper.collect()
 
 
 if __name__ == "__main__":
@@ -10,22 +10,15 @@
 
 from datetime import datetime
 import os
+from urllib.parse import parse_qsl, urlsplit
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support.ui import Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import (
-    TimeoutException,
-    WebDriverException,
-    NoSuchElementException,
-)
 
-from bs4 import BeautifulSoup
-import time
 
 from data_scraper.scrapers.scraper import SpeechScraper
 from utils.common import parse_datestring
-from utils.file_saver import json_dump, json_load, json_update
+from utils.file_saver import json_dump, json_update
+from utils.html_parser import selector_strainer
 from utils.logger import logger
 
 
@@ -34,6 +27,14 @@ class ClevelandSpeechScraper(SpeechScraper):
     __fed_name__ = "cleveland"
     __name__ = f"{__fed_name__.title()}SpeechScraper"
     SAVE_PATH = f"../../data/fed_speeches/{__fed_name__}_fed_speeches/"
+    FETCH_BACKEND = "requests"
+    MAX_IN_FLIGHT = 4
+    DRIVER_POOL_SIZE = 4
+    PAGE_PARAM = "page"
+    LISTING_SELECTOR = "li.result-item"
+    PAGINATION_SELECTOR = "li[class*='page-selector-item'] a"
+    NEXT_PAGE_SELECTOR = "li.page-selector-item-next:not(.disabled) a"
+    CONTENT_SELECTOR = "#content div.row.component.column-splitter > div.col-12.col-lg-8.cf-indent--left.cf-indent--right.cf-section__main > div > div:nth-child(1) > div > div.component.rich-text > div"
 
     def __init__(self, url: str = None, auto_save: bool = True):
         super().__init__(url)
@@ -43,8 +44,55 @@ class ClevelandSpeechScraper(SpeechScraper):
         print(f"{self.SAVE_PATH} has been created.")
         self.save = auto_save
 
+    def parse_listing_page(self, soup) -> list[dict]:
+        """解析一页演讲列表"""
+        speech_infos = []
+        for item in soup.select(self.LISTING_SELECTOR):
+            # 提取日期
+            date = item.find("div", class_="date-reference").text.split(" | ")[0].strip()
+            date = datetime.strptime(date, "%m.%d.%Y").strftime("%B %d, %Y")
+            # 提取演讲者
+            speaker = item.find("span", class_="author-name").text.strip()
+
+            # 提取标题和链接
+            title_link = item.find("a", href=True)
+            title = title_link.text.strip()
+            href = title_link["href"]
+
+            # 提取描述
+            description = (
+                item.find("div", class_="page-description").find("p").text.strip()
+                if item.find("div", class_="page-description")
+                else ""
+            )
+
+            speech_infos.append(
+                {
+                    "date": date,
+                    "speaker": speaker,
+                    "title": title,
+                    "href": self.absolute_url(href),
+                    "highlights": description,
+                }
+            )
+        return speech_infos
+
+    def listing_base_url(self, from_year: int, to_year: int) -> str:
+        """设置年份范围后的列表页网址
+
+        筛选参数名未公开，只有当前网址的查询参数中带有所选的起止年份时才按网址翻页，
+        否则返回None，由crawl_listing_pages逐页点击.
+        """
+        url = self.driver.current_url
+        values = {value for _, value in parse_qsl(urlsplit(url).query)}
+        if {str(from_year), str(to_year)} <= values:
+            return url
+        logger.warning(f"Year range is not in {url}, page through the browser.")
+        return None
+
     def extract_speech_infos(self):
         """抽取演讲的信息"""
+        base_url = None
         try:
             # 设置时间范围为最早和最晚
             from_years_element = self.driver.find_element(By.ID, "fromYears")
@@ -66,107 +114,35 @@ class ClevelandSpeechScraper(SpeechScraper):
             search_button = self.driver.find_element(
                 By.CSS_SELECTOR, "button.btn.btn-link[aria-label='Submit Filters']"
             )
+            old_items = self.driver.find_elements(By.CSS_SELECTOR, "li.result-item")[:1]
             search_button.click()
             # 等待页面
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located(
-                    (By.XPATH, "//*[@id='content']/div[3]/div[1]/search-results/div")
-                )
+            self.wait_for_element(
+                (By.XPATH, "//*[@id='content']/div[3]/div[1]/search-results/div")
             )
-            time.sleep(2.0)
+            self.wait_for_page_change(old_items)
+            base_url = self.listing_base_url(min(from_years_options), max(to_years_options))
         except Exception as e:
             print(f"Error setting date range: {e}")
 
-        # 主循环获取所有演讲信息
-        speech_infos_by_year = {}
-        while True:
-            soup = BeautifulSoup(self.driver.page_source, "html.parser")
-            speech_items = soup.find_all("li", class_="result-item")
-
-            for item in speech_items:
-                # 提取日期
-                date = (
-                    item.find("div", class_="date-reference")
-                    .text.split(" | ")[0]
-                    .strip()
-                )
-                year = int(date.split(".")[2])
-                if year not in speech_infos_by_year:
-                    speech_infos_by_year[year] = []
-                date = datetime.strptime(date, "%m.%d.%Y").strftime("%B %d, %Y")
-                # 提取演讲者
-                speaker = item.find("span", class_="author-name").text.strip()
-
-                # 提取标题和链接
-                title_link = item.find("a", href=True)
-                title = title_link.text.strip()
-                href = title_link["href"]
-
-                # 提取描述
-                description = (
-                    item.find("div", class_="page-description").find("p").text.strip()
-                    if item.find("div", class_="page-description")
-                    else ""
-                )
-
-                speech_infos_by_year[year].append(
-                    {
-                        "date": date,
-                        "speaker": speaker,
-                        "title": title,
-                        "href": f"https://www.clevelandfed.org{href}",
-                        "highlights": description,
-                    }
-                )
-
-            # # Try to find and click the "Next" button
-            try:
-                next_button = self.driver.find_element(
-                    By.CSS_SELECTOR, "li.page-selector-item-next:not(.disabled) a"
-                )
-                self.driver.execute_script("arguments[0].click();", next_button)
-                # 等待页面加载
-                time.sleep(2.0)
-            except NoSuchElementException as e:
-                print(
-                    f"Next button not found or disabled. Reached last page. {repr(e)}"
-                )
-                break
-            except TimeoutException as e:
-                print(
-                    f"Next button not found or disabled. Reached last page. {repr(e)}"
-                )
-                break
-            except WebDriverException as e:
-                print(
-                    f"Next button not found or disabled. Reached last page. {repr(e)}"
-                )
-                break
-
+        # 第一页已在浏览器中打开，网址带有年份范围时其余列表页按网址并发抓取，否则逐页点击
+        speech_infos = self.crawl_listing_pages(
+            self.parse_listing_page, self.snapshot(), base_url
+        )
+        speech_infos_by_year = self.group_by_year(speech_infos)
         self.speech_infos_by_year = speech_infos_by_year
         return speech_infos_by_year
 
     def extract_single_speech(self, speech_info: dict):
         speech = {"speaker": "", "position": "", "highlights": "", "content": ""}
         try:
-            self.driver.get(speech_info["href"])
-            # 等待加载完
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, "content"))
-            )
+            soup = self.fetch_page(speech_info["href"], self.CONTENT_SELECTOR)
 
             # 主内容元素
-            main_content = self.driver.find_element(By.ID, "content")
-            rich_text = main_content.find_element(
-                By.CSS_SELECTOR,
-                "div.row.component.column-splitter > div.col-12.col-lg-8.cf-indent--left.cf-indent--right.cf-section__main > div > div:nth-child(1) > div > div.component.rich-text > div",
-            )
+            rich_text = soup.select_one(self.CONTENT_SELECTOR)
             if rich_text:
                 content = "\n\n".join(
-                    [
-                        p.text.strip()
-                        for p in rich_text.find_elements(By.CSS_SELECTOR, "p, h2")
-                    ]
+                    [p.get_text().strip() for p in rich_text.select("p, h2")]
                 )
                 print(
                     "{} {} {} content extracted.".format(
@@ -194,7 +170,7 @@ class ClevelandSpeechScraper(SpeechScraper):
                     href=speech_info["href"], error=repr(e)
                 )
             )
-            speech = {"content": ""}
+            speech = {"content": "", "error": type(e).__name__}
             print(
                 "{} {} {} content failed.".format(
                     speech_info["speaker"], speech_info["date"], speech_info["title"]
@@ -219,6 +195,8 @@ class ClevelandSpeechScraper(SpeechScraper):
             if int(year) < start_year:
                 continue
             single_year_speeches = []
+            # 并发预取本年度的详情页
+            self.prefetch_pages(single_year_infos, start_date)
             for speech_info in single_year_infos:
                 # 跳过start_date之前的演讲
                 if parse_datestring(speech_info["date"]) <= start_date:
@@ -231,7 +209,7 @@ class ClevelandSpeechScraper(SpeechScraper):
                     )
                     continue
                 # 提取演讲正文
-                single_speech = self.extract_single_speech(speech_info)
+                single_speech = self.run_job(speech_info)
                 if single_speech["content"] == "":
                     # 记录提取失败的报告
                     failed.append(single_speech)
@@ -269,31 +247,22 @@ class ClevelandSpeechScraper(SpeechScraper):
         Returns:
             _type_: _description_
         """
-        # 提取每年演讲的基本信息（不含正文和highlights等）
+        # 已有演讲信息时只刷新列表页，增量抓取新的演讲
         if os.path.exists(self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"):
-            speech_infos = json_load(
-                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
+            logger.info("Speech Infos Data already exists, update incrementally.")
+            return self.update()
+
+        # 提取每年演讲的基本信息（不含正文和highlights等）
+        speech_infos = self.extract_speech_infos()
+        if self.save:
+            json_dump(
+                speech_infos,
+                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
             )
-            # 查看已有的最新的演讲日期
-            latest_year = max([k for k, _ in speech_infos.items()])
-            existed_lastest = max(
-                [
-                    parse_datestring(speech_info["date"])
-                    for speech_info in speech_infos[latest_year]
-                ]
-            ).strftime("%b %d, %Y")
-            logger.info("Speech Infos Data already exists, skip collecting infos.")
-        else:
-            speech_infos = self.extract_speech_infos()
-            if self.save:
-                json_dump(
-                    speech_infos,
-                    self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
-                )
-            existed_lastest = "Jan 01, 2006"
 
         # 提取演讲正文内容
-        speeches = self.extract_speeches(speech_infos, existed_lastest)
+        speeches = self.extract_speeches(speech_infos)
+        self.save_watermark(speeches)
         return speeches
 
     def extract_lastest_speech_date(self):
@@ -319,19 +288,18 @@ class ClevelandSpeechScraper(SpeechScraper):
             search_button = self.driver.find_element(
                 By.CSS_SELECTOR, "button.btn.btn-link[aria-label='Submit Filters']"
             )
+            old_items = self.driver.find_elements(By.CSS_SELECTOR, "li.result-item")[:1]
             search_button.click()
             # 等待页面
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located(
-                    (By.XPATH, "//*[@id='content']/div[3]/div[1]/search-results/div")
-                )
+            self.wait_for_element(
+                (By.XPATH, "//*[@id='content']/div[3]/div[1]/search-results/div")
             )
-            time.sleep(2.0)
+            self.wait_for_page_change(old_items)
         except Exception as e:
             print(f"Error setting date range: {e}")
 
-        soup = BeautifulSoup(self.driver.page_source, "html.parser")
-        speech_items = soup.find_all("li", class_="result-item")
+        soup = self.snapshot(parse_only=selector_strainer(self.LISTING_SELECTOR))
+        speech_items = soup.select(self.LISTING_SELECTOR)
         # 提取最早的演讲的日期，锁定第一个演讲元素
         latest_date = (
             speech_items[0]
@@ -341,27 +309,9 @@ class ClevelandSpeechScraper(SpeechScraper):
         )
         return parse_datestring(latest_date)
 
-    def update(self):
-        """更新报告
-
-        Returns:
-            _type_: _description_
-        """
-        # 读取本地演讲信息
-        speech_infos = json_load(
-            self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
-        )
-        # 查看最新的演讲日期
-        latest_year = max([k for k, _ in speech_infos.items()])
-        existed_lastest = max(
-            [
-                parse_datestring(speech_info["date"])
-                for speech_info in speech_infos[latest_year]
-            ]
-        )
-        # 获取网页上最新的报告日期
-        latest_speech_date = self.extract_lastest_speech_date()
-        return latest_speech_date > existed_lastest
+    def latest_listed_date(self):
+        """列表页上最新演讲的日期，不晚于水位线时update跳过列表刷新"""
+        return self.extract_lastest_speech_date()
 
 
 def test_extract_single_speech():
@@ -387,8 +337,8 @@ def test_extract_speech_infos():
 
 
 def test():
-    scraper = ClevelandSpeechScraper()
-    scraper.collect()
+    with ClevelandSpeechScraper() as scraper:
+        scraper.collect()
 
 
 if __name__ == "__main__":
@@ -11,8 +11,6 @@
 import os
 import re
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.remote.webelement import WebElement
 # from selenium.common.exceptions import (
 #     TimeoutException,
@@ -20,12 +18,11 @@ from selenium.webdriver.remote.webelement import WebElement
 #     NoSuchElementException,
 # )
 
-import time
 from datetime import datetime
 
 from data_scraper.scrapers.scraper import SpeechScraper
 from utils.common import parse_datestring
-from utils.file_saver import json_dump, json_load, json_update
+from utils.file_saver import json_dump, json_update
 from utils.logger import logger
 
 SWORN_DATE_MAPPING = {"Lorie K. Logan": "August 22, 2022"}
@@ -36,6 +33,11 @@ class DallasSpeechScraper(SpeechScraper):
     __fed_name__ = "dallas"
     __name__ = f"{__fed_name__.title()}SpeechScraper"
     SAVE_PATH = f"../../data/fed_speeches/{__fed_name__}_fed_speeches/"
+    FETCH_BACKEND = "requests"
+    MAX_IN_FLIGHT = 8
+    RATE_LIMIT = 4.0
+    RATE_BURST = 8
+    CONTENT_SELECTOR = "#content div.dal-main-content"
 
     def __init__(self, url: str = None, auto_save: bool = True):
         super().__init__(url)
@@ -102,11 +104,9 @@ class DallasSpeechScraper(SpeechScraper):
             if "President" not in title:
                 continue
             # 打开网站
-            self.driver.get(link)
-            WebDriverWait(self.driver, 10).until(
-                EC.visibility_of_all_elements_located((By.ID, "dal-tabs"))
-            )
-            time.sleep(1.2)
+            self.navigate(link)
+            self.wait_for_element((By.ID, "dal-tabs"), visible=True)
+            self.wait_for_dom_stable(stable_ms=300, selector="#dal-tabs")
 
             # 搜集所有tab页
             tab_buttons = self.driver.find_elements(
@@ -134,7 +134,7 @@ class DallasSpeechScraper(SpeechScraper):
                     else:
                         true_year = year
                     # 仅保留在达拉斯任职时期的演讲
-                    if speech_info["href"].startswith("https://www.dallasfed.org/"):
+                    if self.is_site_url(speech_info["href"]):
                         speech_infos_by_year.setdefault(true_year, []).append(
                             speech_info
                         )
@@ -145,21 +145,16 @@ class DallasSpeechScraper(SpeechScraper):
     def extract_single_speech(self, speech_info: dict):
         speech = {"speaker": "", "position": "", "highlights": "", "content": ""}
         try:
-            self.driver.get(speech_info["href"])
-            # 等待加载完
-            WebDriverWait(self.driver, 10).until(
-                EC.visibility_of_all_elements_located((By.ID, "content"))
-            )
-            time.sleep(1.2)
+            soup = self.fetch_page(speech_info["href"], self.CONTENT_SELECTOR)
 
             # 主内容元素
-            main_content = self.driver.find_element(By.ID, "content")
-            paragraph_elements = main_content.find_elements(
-                By.XPATH,
-                ".//div[contains(@class, 'dal-main-content')]/h3|.//div[contains(@class, 'dal-main-content')]/p",
+            paragraph_elements = soup.select(
+                "#content div.dal-main-content > h3, #content div.dal-main-content > p"
             )
             if paragraph_elements:
-                content = "\n\n".join([p.text.strip() for p in paragraph_elements])
+                content = "\n\n".join(
+                    [p.get_text().strip() for p in paragraph_elements]
+                )
                 print(
                     "{} {} {} content extracted.".format(
                         speech_info["speaker"],
@@ -184,7 +179,7 @@ class DallasSpeechScraper(SpeechScraper):
                     href=speech_info["href"], error=repr(e)
                 )
             )
-            speech = {"content": ""}
+            speech = {"content": "", "error": type(e).__name__}
             print(
                 "{} {} {} content failed.".format(
                     speech_info["speaker"], speech_info["date"], speech_info["title"]
@@ -211,6 +206,8 @@ class DallasSpeechScraper(SpeechScraper):
             if int(year) < start_year:
                 continue
             single_year_speeches = []
+            # 并发预取本年度的详情页
+            self.prefetch_pages(single_year_infos, start_date)
             for speech_info in single_year_infos:
                 # 跳过start_date之前的演讲
                 if parse_datestring(speech_info["date"]) <= start_date:
@@ -223,7 +220,7 @@ class DallasSpeechScraper(SpeechScraper):
                     )
                     continue
                 # 提取演讲正文
-                single_speech = self.extract_single_speech(speech_info)
+                single_speech = self.run_job(speech_info)
                 if single_speech["content"] == "":
                     # 记录提取失败的报告
                     failed.append(single_speech)
@@ -260,35 +257,22 @@ class DallasSpeechScraper(SpeechScraper):
         Returns:
             _type_: _description_
         """
-        # 提取每年演讲的基本信息（不含正文和highlights等）
+        # 已有演讲信息时只刷新列表页，增量抓取新的演讲
         if os.path.exists(self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"):
-            speech_infos = json_load(
-                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
+            logger.info("Speech Infos Data already exists, update incrementally.")
+            return self.update()
+
+        # 提取每年演讲的基本信息（不含正文和highlights等）
+        speech_infos = self.extract_speech_infos()
+        if self.save:
+            json_dump(
+                speech_infos,
+                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
             )
-            # 查看已有的最新的演讲日期
-            latest_year = max([k for k, _ in speech_infos.items()])
-            existed_lastest = max(
-                [
-                    parse_datestring(speech_info["date"])
-                    for speech_info in speech_infos[latest_year]
-                ]
-            ).strftime("%b %d, %Y")
-            logger.info("Speech Infos Data already exists, skip collecting infos.")
-            existed_lastest = "Jan 01, 2024"
-        else:
-            speech_infos = self.extract_speech_infos()
-            if self.save:
-                json_dump(
-                    speech_infos,
-                    self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
-                )
-            existed_lastest = "Jan 01, 2006"
 
         # 提取演讲正文内容
-        print("-" * 100)
-        print("Extract speeches start from {}".format(existed_lastest))
-        print("-" * 100)
-        speeches = self.extract_speeches(speech_infos, existed_lastest)
+        speeches = self.extract_speeches(speech_infos)
+        self.save_watermark(speeches)
         return speeches
 
 
@@ -314,8 +298,8 @@ def test_extract_single_speech():
 
 
 def test():
-    scraper = DallasSpeechScraper()
-    scraper.collect()
+    with DallasSpeechScraper() as scraper:
+        scraper.collect()
 
 
 if __name__ == "__main__":
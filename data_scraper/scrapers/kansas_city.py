@@ -11,61 +11,18 @@
 from datetime import datetime
 import os
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import (
-    TimeoutException,
-    WebDriverException,
-    NoSuchElementException,
-)
 
 from bs4 import BeautifulSoup
-import time
-import requests
 
 from data_scraper.scrapers.scraper import SpeechScraper
 from utils.common import parse_datestring
-from utils.file_saver import json_dump, json_load, json_update
+from utils.file_saver import json_dump, json_update
 from utils.logger import logger
+from utils.pdf_downloader import PdfDownloader
+from utils.pdf_extractor import get_pdf_extractor, read_pdf_file
 from collections import OrderedDict
-from PyPDF2 import PdfReader
-
-
-def read_pdf_file(pdf_filename: str):
-    if os.path.exists(pdf_filename):
-        reader = PdfReader(pdf_filename)
-        print(">--|--<" * 20)
-        print("{} has been read.".format(pdf_filename))
-        return "\n\n".join([page.extract_text() for page in reader.pages]).strip("\n ")
-    else:
-        return ""
-
-
-def download_pdf(pdf_url: str, file_name: str, save_path: str):
-    response = requests.get(pdf_url)
-
-    if response.status_code == 200:
-        with open(f"{save_path}/{file_name}", "wb") as f:
-            f.write(response.content)
-        print("PDF {} downloaded successfully.".format(file_name))
-    else:
-        print("Failed to download PDF. Status code:", response.status_code)
-
-
-def is_download_complete(download_dir):
-    for file in os.listdir(download_dir):
-        if file.endswith(".crdownload"):
-            return False
-    return True
-
-
-def is_download_existed(filepath: str):
-    if os.path.exists(filepath):
-        return True
-    else:
-        return False
 
 
 class KansasCitySpeechScraper(SpeechScraper):
@@ -73,29 +30,78 @@ class KansasCitySpeechScraper(SpeechScraper):
     __fed_name__ = "kansascity"
     __name__ = f"{__fed_name__.title()}SpeechScraper"
     SAVE_PATH = f"../../data/fed_speeches/{__fed_name__}_fed_speeches/"
-    DOWNLOAD_PATH = "C:/Users/Administrator/Downloads/"
-
     # PDF文件下载目录
-    prefs = {
-        "download.default_directory": SAVE_PATH,
-        "download.prompt_for_download": False,
-        "download.directory_upgrade": True,
-        "plugins.always_open_pdf_externally": True,  # 在外部程序中打开PDF文件
-    }
+    DOWNLOAD_PATH = SAVE_PATH + "pdfs/"
+    # 并发下载PDF的线程数
+    PDF_WORKERS = 4
+    # PDF文本提取后端: None为PyPDF2，"auto"为已安装的最快后端
+    PDF_BACKEND = None
+    # 筛选下拉框的展开/收起依赖样式表
+    BLOCKED_RESOURCES = ("image", "font", "analytics")
+    DRIVER_POOL_SIZE = 4
+    PAGE_PARAM = "page"
+    LISTING_SELECTOR = "div.result-list > div.clear"
+    NEXT_PAGE_SELECTOR = "a[href][search-pagination-form-next-page-button]"
+    # 筛选表单的参数: 演讲者、话题及每页条数
+    LISTING_PARAMS = {"6-12": None, "6-13": None, "perpage": "100"}
+    # 筛选条件提交到的搜索接口，先用发现模式记录
+    LISTING_API_PATTERN = r"kansascityfed\.org/.*search"
 
     def __init__(self, url: str = None, auto_save: bool = True):
-        # 设置浏览器选项
-        chrome_options = Options()
-        chrome_options.add_experimental_option("prefs", self.prefs)
-        super().__init__(url, options=chrome_options)
+        super().__init__(url)
+        # PDF直接用HTTP连接池下载，不经过浏览器
+        self.pdf_downloader = PdfDownloader(
+            self.DOWNLOAD_PATH, self.PDF_WORKERS, fetcher=self.fetcher
+        )
         self.speech_infos_by_year = None
         self.speeches_by_year = None
         os.makedirs(self.SAVE_PATH, exist_ok=True)
         print(f"{self.SAVE_PATH} has been created.")
         self.save = auto_save
 
+    def parse_listing_page(self, soup) -> list[dict]:
+        """解析一页演讲列表"""
+        speech_infos = []
+        for item in soup.select(self.LISTING_SELECTOR):
+            # 提取日期
+            date = item.select_one("span[class*='date'] > time").get_text().strip()
+            # 提取演讲者
+            speaker = item.select_one(
+                "a.mnt-tag-group-staff-link[href]"
+            ).get_text().strip()
+
+            # 提取标题和链接
+            title_link = item.select_one("h3 > a[href]")
+            title = title_link.get_text().strip()
+            href = self.absolute_url(title_link["href"])
+
+            speech_infos.append(
+                {
+                    "date": date,
+                    "speaker": speaker,
+                    "title": title,
+                    "href": href,
+                }
+            )
+        return speech_infos
+
+    def extract_speech_infos_from_api(self) -> list[dict]:
+        """按页码重放发现到的搜索接口"""
+        endpoint = self.listing_api()
+        if endpoint is None:
+            return None
+        return self.crawl_api_pages(
+            lambda page: self.api_speech_infos(self.call_api(endpoint, {"page": page}))
+        )
+
     def extract_speech_infos(self):
         """抽取演讲的信息"""
+        # 优先请求搜索接口，不可用时再操作筛选控件
+        speech_infos_by_year = self.listing_from_api()
+        if speech_infos_by_year is not None:
+            self.speech_infos_by_year = speech_infos_by_year
+            return speech_infos_by_year
+
         try:
             # 设置speakers
             filter_buttons = self.driver.find_elements(
@@ -136,13 +142,14 @@ class KansasCitySpeechScraper(SpeechScraper):
                 By.XPATH,
                 "//button[(@type='button') and (contains(text(), 'Apply Filters'))]",
             )
+            old_items = self.driver.find_elements(
+                By.XPATH, "//div[@class='result-list']/div[@class='clear']"
+            )[:1]
             apply_filter_button.click()
 
             # 等待页面
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.XPATH, "//*[@id='mainContent']"))
-            )
-            time.sleep(1.2)
+            self.wait_for_element((By.XPATH, "//*[@id='mainContent']"))
+            self.wait_for_page_change(old_items)
 
             # 设置每页展示100个
             perpage_number_button = self.driver.find_element(
@@ -158,91 +165,106 @@ class KansasCitySpeechScraper(SpeechScraper):
             perpage_100 = self.driver.find_element(
                 By.XPATH, "//ul[@select-name='perpage']/li[@value='100']"
             )
+            old_items = self.driver.find_elements(
+                By.XPATH, "//div[@class='result-list']/div[@class='clear']"
+            )[:1]
             perpage_100.click()
             # 等待页面
-            WebDriverWait(self.driver, 10).until(
-                EC.visibility_of_all_elements_located((By.CLASS_NAME, "clear"))
+            self.wait_for(
+                "results_visible",
+                EC.visibility_of_all_elements_located((By.CLASS_NAME, "clear")),
             )
-            time.sleep(5.0)
+            self.wait_for_page_change(old_items, stable_ms=500, timeout=15)
         except Exception as e:
             print(f"Error setting date range: {e}")
 
-        # 主循环获取所有演讲信息
-        speech_infos_by_year = {}
-        while True:
-            speech_items = self.driver.find_elements(
-                By.XPATH, "//div[@class='result-list']/div[@class='clear']"
+        # 从"下一页"链接读取演讲者、话题和每页条数，显式构造各页网址并发抓取；
+        # 链接中缺少这些参数时逐页点击
+        soup = self.snapshot()
+        next_link = soup.select_one(self.NEXT_PAGE_SELECTOR)
+        if next_link is None:
+            speech_infos = self.parse_listing_page(soup)
+        else:
+            base_url = self.filtered_listing_url(
+                self.absolute_url(next_link["href"]), self.LISTING_PARAMS
             )
-            for item in speech_items:
-                # 提取日期
-                date = item.find_element(
-                    By.XPATH, ".//span[contains(@class, 'date')]/time"
-                ).text.strip()
-                year = int(date.split(",")[-1].strip())
-                if year not in speech_infos_by_year:
-                    speech_infos_by_year[year] = []
-                # 提取演讲者
-                speaker = item.find_element(
-                    By.XPATH, ".//a[@class='mnt-tag-group-staff-link' and @href]"
-                ).text.strip()
-
-                # 提取标题和链接
-                title_link = item.find_element(By.XPATH, ".//h3/a[@href]")
-                title = title_link.text.strip()
-                href = title_link.get_attribute("href")
-
-                speech_infos_by_year[year].append(
-                    {
-                        "date": date,
-                        "speaker": speaker,
-                        "title": title,
-                        "href": href,
-                    }
-                )
-
-            try:
-                next_page_button = self.driver.find_element(
-                    By.CSS_SELECTOR,
-                    "a[href][search-pagination-form-next-page-button][aria-label='Go to Next Page']",
-                )
-                next_page_button.click()
-                # 等待页面加载
-                time.sleep(1.2)
-            except NoSuchElementException as e:
-                print(
-                    f"Next button not found or disabled. Reached last page. {repr(e)}"
-                )
-                break
-            except TimeoutException as e:
-                print(
-                    f"Next button not found or disabled. Reached last page. {repr(e)}"
-                )
-                break
-            except WebDriverException as e:
-                print(
-                    f"Next button not found or disabled. Reached last page. {repr(e)}"
-                )
-                break
-
+            speech_infos = self.crawl_listing_pages(self.parse_listing_page, soup, base_url)
+        speech_infos_by_year = self.group_by_year(speech_infos)
         speech_infos_by_year = OrderedDict(speech_infos_by_year.items())
         self.speech_infos_by_year = speech_infos_by_year
         return speech_infos_by_year
 
+    def fetch_pdf(self, href: str) -> str:
+        """取得PDF的本地路径，缺失时下载；reparse模式下从原始存档恢复
+
+        Returns:
+            str: 本地文件路径，无法取得时为None
+        """
+        pdf_path = self.pdf_downloader.path(href)
+        if os.path.exists(pdf_path):
+            return pdf_path
+        if self.reparse_mode:
+            body = self.archive.get(href) if self.archive is not None else None
+            if not body:
+                return None
+            with open(pdf_path, "wb") as f:
+                f.write(body)
+            return pdf_path
+        try:
+            pdf_path = self.pdf_downloader.download(href)
+        except Exception as e:
+            logger.warning(f"Download PDF {href} failed. {repr(e)}")
+            return None
+        self.archive_pdf(href, pdf_path)
+        return pdf_path
+
+    def archive_pdf(self, href: str, pdf_path: str):
+        """把下载的PDF存入原始存档，供reparse离线重新解析"""
+        if self.archive is None or self.reparse_mode or href in self.archive:
+            return
+        with open(pdf_path, "rb") as f:
+            self.archive_page(href, f.read())
+
+    def download_pdfs(self, speech_infos: list[dict], start_date=None):
+        """并发下载一批演讲的PDF并用进程池提取文本，之后extract_single_speech直接读取缓存
+
+        Args:
+            speech_infos (list[dict]): 演讲信息
+            start_date (datetime, optional): 早于该日期的演讲不下载. Defaults to None.
+        """
+        if self.reparse_mode:
+            return
+        urls = []
+        for speech_info in speech_infos:
+            href = speech_info.get("href") or ""
+            if not href.endswith(".pdf") or href in urls:
+                continue
+            if start_date is not None and parse_datestring(speech_info["date"]) <= start_date:
+                continue
+            # 继续中断的轮次时，已完成的演讲无需再下载
+            if self.job_finished(href):
+                continue
+            urls.append(href)
+        if not urls:
+            return
+        pdf_paths = []
+        for href, pdf_path in self.pdf_downloader.download_many(urls).items():
+            if pdf_path is not None:
+                self.archive_pdf(href, pdf_path)
+                pdf_paths.append(pdf_path)
+        get_pdf_extractor(self.PDF_BACKEND).extract_many(pdf_paths)
+
     def extract_single_speech(self, speech_info: dict):
         speech = {"speaker": "", "content": ""}
         try:
             href = speech_info["href"]
             if href.endswith(".pdf"):
-                # 下载PDF文件
-                pdf_filename = href.split("/")[-1]
-                if not is_download_existed(self.DOWNLOAD_PATH + pdf_filename):
-                    self.driver.get(href)
-                    time.sleep(1.0)
-                if is_download_existed(self.DOWNLOAD_PATH + pdf_filename):
+                pdf_path = self.fetch_pdf(href)
+                if pdf_path is not None:
                     # 解析pdf
-                    content = read_pdf_file(self.DOWNLOAD_PATH + pdf_filename)
+                    content = read_pdf_file(pdf_path, self.PDF_BACKEND)
                 else:
-                    content = f"$PDF$: {pdf_filename}"
+                    content = f"$PDF$: {os.path.basename(self.pdf_downloader.path(href))}"
                 speech = {
                     "content": content,
                 }
@@ -261,7 +283,7 @@ class KansasCitySpeechScraper(SpeechScraper):
                     href=href, error=repr(e)
                 )
             )
-            speech = {"content": ""}
+            speech = {"content": "", "error": type(e).__name__}
             print(
                 "{} {} {} content failed.".format(
                     speech_info["speaker"], speech_info["date"], speech_info["title"]
@@ -285,6 +307,8 @@ class KansasCitySpeechScraper(SpeechScraper):
             # 跳过之前的年份
             if int(year) < start_year:
                 continue
+            # 先并发下载本年的PDF并提取文本
+            self.download_pdfs(single_year_infos, start_date)
             single_year_speeches = []
             for speech_info in single_year_infos:
                 # 跳过start_date之前的演讲
@@ -298,7 +322,7 @@ class KansasCitySpeechScraper(SpeechScraper):
                     )
                     continue
                 # 提取演讲正文
-                single_speech = self.extract_single_speech(speech_info)
+                single_speech = self.run_job(speech_info)
                 if single_speech["content"] == "":
                     # 记录提取失败的报告
                     failed.append(single_speech)
@@ -335,33 +359,23 @@ class KansasCitySpeechScraper(SpeechScraper):
         Returns:
             _type_: _description_
         """
-        # 提取每年演讲的基本信息（不含正文和highlights等）
+        # 已有演讲信息时只刷新列表页，增量抓取新的演讲
         if os.path.exists(self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"):
-            speech_infos = json_load(
-                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
+            logger.info("Speech Infos Data already exists, update incrementally.")
+            return self.update()
+
+        # 提取每年演讲的基本信息（不含正文和highlights等）
+        speech_infos = self.extract_speech_infos()
+        if self.save:
+            json_dump(
+                speech_infos,
+                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
             )
-            # 查看已有的最新的演讲日期
-            latest_year = max([k for k, _ in speech_infos.items()])
-            existed_lastest = max(
-                [
-                    parse_datestring(speech_info["date"])
-                    for speech_info in speech_infos[latest_year]
-                ]
-            ).strftime("%b %d, %Y")
-            logger.info("Speech Infos Data already exists, skip collecting infos.")
-            existed_lastest = "Jan 01, 2006"
-        else:
-            speech_infos = self.extract_speech_infos()
-            if self.save:
-                json_dump(
-                    speech_infos,
-                    self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
-                )
-            existed_lastest = "Jan 01, 2006"
 
         # 提取演讲正文内容
         speech_infos = OrderedDict(speech_infos.items())
-        speeches = self.extract_speeches(speech_infos, existed_lastest)
+        speeches = self.extract_speeches(speech_infos)
+        self.save_watermark(speeches)
         return speeches
 
 
@@ -388,8 +402,8 @@ def test_extract_speech_infos():
 
 
 def test():
-    scraper = KansasCitySpeechScraper()
-    scraper.collect()
+    with KansasCitySpeechScraper() as scraper:
+        scraper.collect()
 
 
 if __name__ == "__main__":
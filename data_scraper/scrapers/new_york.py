@@ -8,22 +8,21 @@
 @Desc    :   纽约联储讲话数据爬取
 """
 
+from datetime import datetime
 import os
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support.ui import Select
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import (
     TimeoutException,
     WebDriverException,
     NoSuchElementException,
 )
 from bs4 import BeautifulSoup
-import time
 
 from data_scraper.scrapers.scraper import SpeechScraper
 from utils.common import parse_datestring
-from utils.file_saver import json_dump, json_load, json_update
+from utils.file_saver import json_dump, json_update
+from utils.html_parser import parse_html, selector_strainer
 from utils.logger import logger
 
 
@@ -32,6 +31,10 @@ class NewYorkSpeechScraper(SpeechScraper):
     __fed_name__ = "newyork"
     __name__ = f"{__fed_name__.title()}SpeechScraper"
     SAVE_PATH = f"../../data/fed_speeches/{__fed_name__}_fed_speeches/"
+    FETCH_BACKEND = "requests"
+    MAX_IN_FLIGHT = 4
+    LISTING_SELECTOR = "table.newsTable"
+    CONTENT_SELECTOR = "div.ts-article-text"
 
     def __init__(self, url: str = None, auto_save: bool = True):
         super().__init__(url)
@@ -45,36 +48,41 @@ class NewYorkSpeechScraper(SpeechScraper):
         """抽取演讲的信息"""
         speech_infos = {}
         try:
-            self.driver.get(self.URL)
+            self.navigate(self.URL)
             # Wait for the table to be present
-            table = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "newsTable"))
-            )
+            self.wait_for_element((By.CSS_SELECTOR, self.LISTING_SELECTOR))
+            # 对整页做一次快照再解析
+            table = self.snapshot(
+                parse_only=selector_strainer(self.LISTING_SELECTOR)
+            ).select_one(self.LISTING_SELECTOR)
 
-            rows = table.find_elements(By.TAG_NAME, "tr")
+            rows = table.find_all("tr")
             current_year = ""
             for row in rows:
-                if row.text == "Speeches":
+                row_text = row.get_text().strip()
+                if row_text == "Speeches":
                     continue
-                if "yrHead" in row.get_attribute("class"):
-                    current_year = row.text.strip()
+                if "yrHead" in row.get("class", []):
+                    current_year = row_text
                     speech_infos[current_year] =  []
                     continue
                 try:
-                    columns = row.find_elements(By.TAG_NAME, "td")
+                    columns = row.find_all("td")
                     if len(columns) < 2:
                         continue
                     # 获取日期
-                    date_div = columns[0].find_element(By.TAG_NAME, "div")
+                    date_div = columns[0].find("div")
+                    link_elem = row.find("a")
+                    if date_div is None or link_elem is None:
+                        raise NoSuchElementException()
                     date = (
-                        date_div.text.strip().split("==")[0].strip()
+                        date_div.get_text().strip().split("==")[0].strip()
                     )  # Extract date and remove any extra text
                     # 获取链接
-                    link_elem = row.find_element(By.TAG_NAME, "a")
-                    href = link_elem.get_attribute("href")
+                    href = self.absolute_url(link_elem.get("href"))
                     # Check if the speech is by one of the specified speakers
                     # 获取标题
-                    title = link_elem.text.strip()
+                    title = link_elem.get_text().strip()
                     if last_names:
                         speaker_last_name = title.split(":")[0].strip()
                         if speaker_last_name in last_names:
@@ -86,7 +94,7 @@ class NewYorkSpeechScraper(SpeechScraper):
                             {"url": href, "date": date, "title": title}
                         )
                 except NoSuchElementException:
-                    print(f"No speech link found in row: {row.text}")
+                    print(f"No speech link found in row: {row_text}")
                     continue
 
             print(f"Collected {len(speech_infos)} speech links.")
@@ -95,17 +103,18 @@ class NewYorkSpeechScraper(SpeechScraper):
             print(f"An error occurred while collecting speech links: {str(e)}")
             return speech_infos
 
-    def fetch_speech_date(self):
+    def fetch_speech_date(self, soup: BeautifulSoup):
         """提取NewYork联储演讲网站的演讲日期
 
+        Args:
+            soup (BeautifulSoup): 演讲详情页
+
         Returns:
             str: 演讲日期
         """
         try:
-            date_elemment = self.driver.find_element(
-                By.XPATH, "//body/div[@container_12]/div/div[@class='ts-contact-info']"
-            )
-            date_text = date_elemment.text.strip()
+            date_elemment = soup.select_one("div.container_12 div.ts-contact-info")
+            date_text = date_elemment.get_text("\n").strip()
             posted_date = [line for line in date_text.split("\n") if "Posted" in line]
             date = posted_date[0] if posted_date else date_text.split("\n")[0]
         except Exception as e:
@@ -113,24 +122,25 @@ class NewYorkSpeechScraper(SpeechScraper):
             date = "Unknown"
         return date
 
-    def fetch_speaker(self):
+    def fetch_speaker(self, soup: BeautifulSoup):
         """提取NewYork联储演讲网站的演讲人
 
+        Args:
+            soup (BeautifulSoup): 演讲详情页
+
         Returns:
             tuple(str, str): 演讲人和演讲人职位
         """
         try:
-            speaker_elements = self.driver.find_elements(
-                By.XPATH,
-                "//div[@class='ts-contact-info']/a[@href]",
-            )
+            speaker_elements = soup.select("div.ts-contact-info > a[href]")
             speaker = (
-                speaker_elements[0].text.strip()
+                speaker_elements[0].get_text().strip()
                 if len(speaker_elements) > 0
                 else "Unknown, UnKnown"
             )
-            speaker = speaker.split(",", maxsplit=2)[0]
-            officier_title = speaker.split(",", maxsplit=2)[1]
+            speaker, officier_title = [
+                item.strip() for item in speaker.split(",", maxsplit=1)
+            ]
             # if not officier_title.startswith('President'):  # 非 Fed President
             #     return "NotPresident"
             return speaker, officier_title
@@ -141,28 +151,24 @@ class NewYorkSpeechScraper(SpeechScraper):
     def extract_single_speech(self, speech_info: dict):
         try:
             url = speech_info["url"]
-            self.driver.get(url)
-            title = self.driver.find_element(
-                By.CLASS_NAME, "ts-article-title"
-            ).text.strip()
-
-            # Wait for the content to load
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "container_12"))
-            )
+            soup = self.fetch_page(url, self.CONTENT_SELECTOR)
+            title = soup.select_one(".ts-article-title").get_text().strip()
+
             # Extract the "Posted" date
             # 日期
-            date = self.fetch_speech_date()
+            date = self.fetch_speech_date(soup)
             assert date != "Unknown", "Date was unknown"
             # 演讲人. 此处可能失败.
-            speaker, officier_position = self.fetch_speaker()
-            assert officier_position.startwith(
+            speaker, officier_position = self.fetch_speaker(soup)
+            assert officier_position.startswith(
                 "President"
             ), "The {} was not president but {}.".format(speaker, officier_position)
             # 演讲正文内容
-            content_elem = self.driver.find_element(By.CLASS_NAME, "ts-article-text")
-            paragraphs = content_elem.find_elements(By.TAG_NAME, "p")
-            content = "\n\n".join([p.text for p in paragraphs if p.text.strip()])
+            content_elem = soup.select_one(self.CONTENT_SELECTOR)
+            paragraphs = content_elem.find_all("p")
+            content = "\n\n".join(
+                [p.get_text() for p in paragraphs if p.get_text().strip()]
+            )
 
             return {
                 "title": title,
@@ -173,12 +179,18 @@ class NewYorkSpeechScraper(SpeechScraper):
             }
         except TimeoutException as e:
             print(f"Timeout error extracting content from {url}: {str(e)}")
+            error = e
         except WebDriverException as e:
             print(f"WebDriver error extracting content from {url}: {str(e)}")
+            error = e
         except AssertionError as e:
             print(repr(e))
+            error = e
         except Exception as e:
             print(f"Unexpected error extracting content from {url}: {str(e)}")
+            error = e
+        # 提取失败时保留演讲信息，正文为空以便记入失败列表
+        return dict(speech_info, content="", error=type(error).__name__)
 
     def extract_speeches(
         self, speech_infos_by_year: dict, start_date: str = "Jan 01, 2006"
@@ -196,25 +208,27 @@ class NewYorkSpeechScraper(SpeechScraper):
             if int(year) < start_year:
                 continue
             single_year_speeches = []
+            # 并发预取本年度的详情页
+            self.prefetch_pages(single_year_infos, start_date)
             for speech_info in single_year_infos:
                 # 跳过start_date之前的演讲
                 if parse_datestring(speech_info["date"]) <= start_date:
                     logger.info(
                         "Skip speech {speaker} {date} {title} cause' it's earlier than start_date.".format(
-                            speaker=speech_info["speaker"],
+                            speaker=speech_info.get("speaker", ""),
                             date=speech_info["date"],
                             title=speech_info["title"],
                         )
                     )
                     continue
                 # 提取演讲正文
-                single_speech = self.extract_single_speech(speech_info)
+                single_speech = self.run_job(speech_info)
                 if single_speech["content"] == "":
                     # 记录提取失败的报告
                     failed.append(single_speech)
                     logger.warning(
                         "Extract {speaker} {date} {title}".format(
-                            speaker=speech_info["speaker"],
+                            speaker=speech_info.get("speaker", ""),
                             date=speech_info["date"],
                             title=speech_info["title"],
                         )
@@ -245,77 +259,53 @@ class NewYorkSpeechScraper(SpeechScraper):
         Returns:
             str: list[dict]
         """
-        # 提取每年演讲的基本信息（不含正文和highlights等）
+        # 已有演讲信息时只刷新列表页，增量抓取新的演讲
         if os.path.exists(self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"):
-            speech_infos = json_load(
-                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
+            logger.info("Speech Infos Data already exists, update incrementally.")
+            return self.update()
+
+        # 提取每年演讲的基本信息（不含正文和highlights等）
+        speech_infos = self.extract_speech_infos()
+        if self.save:
+            json_dump(
+                speech_infos,
+                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
             )
-            # 查看已有的最新的演讲日期
-            latest_year = max([k for k, _ in speech_infos.items()])
-            existed_lastest = max(
-                [
-                    parse_datestring(speech_info["date"])
-                    for speech_info in speech_infos[latest_year]
-                ]
-            ).strftime("%b %d, %Y")
-            logger.info("Speech Infos Data already exists, skip collecting infos.")
-        else:
-            speech_infos = self.extract_speech_infos()
-            if self.save:
-                json_dump(
-                    speech_infos,
-                    self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
-                )
-            existed_lastest = "Jan 01, 2006"
 
         # 提取演讲正文内容
-        speeches = self.extract_speeches(speech_infos, existed_lastest)
+        speeches = self.extract_speeches(speech_infos)
+        self.save_watermark(speeches)
         return speeches
 
     def extract_lastest_speech_date(self):
-        """获取最近演讲的信息"""
-        try:
-            # 设置时间范围为最早和最晚
-            from_years_element = self.driver.find_element(By.ID, "fromYears")
-            from_years_options = [
-                int(option.text)
-                for option in Select(from_years_element).options
-                if option.text.isdigit()
-            ]
-            from_years_element.send_keys(str(min(from_years_options)))
-
-            to_years_element = self.driver.find_element(By.ID, "toYears")
-            to_years_options = [
-                int(option.text)
-                for option in Select(to_years_element).options
-                if option and option.text.isdigit()
-            ]
-            to_years_element.send_keys(str(max(to_years_options)))
-            # 点击搜寻按键
-            search_button = self.driver.find_element(
-                By.CSS_SELECTOR, "button.btn.btn-link[aria-label='Submit Filters']"
-            )
-            search_button.click()
-            # 等待页面
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located(
-                    (By.XPATH, "//*[@id='content']/div[3]/div[1]/search-results/div")
-                )
-            )
-            time.sleep(2.0)
-        except Exception as e:
-            print(f"Error setting date range: {e}")
+        """读取演讲列表newsTable中第一条演讲的日期，列表中没有演讲时为None"""
+        table = parse_html(
+            self.fetcher.fetch_text(self.url), selector_strainer(self.LISTING_SELECTOR)
+        ).select_one(self.LISTING_SELECTOR)
+        if table is None:
+            # 静态HTML中没有列表时在浏览器中读取
+            self.navigate(self.url)
+            self.wait_for_element((By.CLASS_NAME, "newsTable"), raise_on_timeout=False)
+            table = self.snapshot(
+                parse_only=selector_strainer(self.LISTING_SELECTOR)
+            ).select_one(self.LISTING_SELECTOR)
+        if table is None:
+            return None
+        # 列表按日期倒序排列，跳过年份标题行
+        for row in table.find_all("tr"):
+            if "yrHead" in row.get("class", []):
+                continue
+            date_div = row.select_one("td > div")
+            if date_div is None:
+                continue
+            date = parse_datestring(date_div.get_text().strip().split("==")[0].strip())
+            if isinstance(date, datetime):
+                return date
+        return None
 
-        soup = BeautifulSoup(self.driver.page_source, "html.parser")
-        speech_items = soup.find_all("li", class_="result-item")
-        # 提取最早的演讲的日期，锁定第一个演讲元素
-        latest_date = (
-            speech_items[0]
-            .find("div", class_="date-reference")
-            .text.split(" | ")[0]
-            .strip()
-        )
-        return parse_datestring(latest_date)
+    def latest_listed_date(self):
+        """列表页上最新演讲的日期，不晚于水位线时update跳过列表刷新"""
+        return self.extract_lastest_speech_date()
 
 
 def test_extract_speech_infos():
@@ -335,8 +325,8 @@ def test_extract_single_speech():
 
 
 def test():
-    scraper = NewYorkSpeechScraper()
-    scraper.collect()
+    with NewYorkSpeechScraper() as scraper:
+        scraper.collect()
 
 
 if __name__ == "__main__":
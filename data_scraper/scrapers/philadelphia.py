@@ -8,23 +8,16 @@
 @Desc    :   费城联储银行讲话数据爬取
 """
 
+from datetime import datetime
 import os
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support.ui import Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import (
-    TimeoutException,
-    WebDriverException,
-    NoSuchElementException,
-)
 
-from bs4 import BeautifulSoup
-import time
 
 from data_scraper.scrapers.scraper import SpeechScraper
 from utils.common import parse_datestring
-from utils.file_saver import json_dump, json_load, json_update
+from utils.file_saver import json_dump, json_update
+from utils.html_parser import parse_html
 from utils.logger import logger
 
 
@@ -33,6 +26,14 @@ class PhiladelphiaSpeechScraper(SpeechScraper):
     __fed_name__ = "philadelphia"
     __name__ = f"{__fed_name__.title()}SpeechScraper"
     SAVE_PATH = f"../../data/fed_speeches/{__fed_name__}_fed_speeches/"
+    FETCH_BACKEND = "requests"
+    MAX_IN_FLIGHT = 4
+    DRIVER_POOL_SIZE = 4
+    PAGE_PARAM = "page"
+    LISTING_SELECTOR = "#content div.result.search-result"
+    PAGINATION_SELECTOR = "#content section > ul > li > a"
+    NEXT_PAGE_SELECTOR = "#content section > ul > li.next > a[role='button']"
+    CONTENT_SELECTOR = "#content div.article-body"
 
     def __init__(self, url: str = None, auto_save: bool = True):
         super().__init__(url)
@@ -42,6 +43,39 @@ class PhiladelphiaSpeechScraper(SpeechScraper):
         print(f"{self.SAVE_PATH} has been created.")
         self.save = auto_save
 
+    def parse_listing_page(self, soup) -> list[dict]:
+        """解析一页演讲列表"""
+        speech_infos = []
+        for item in soup.select(self.LISTING_SELECTOR):
+            # 话题类型记录一下
+            date_topic = item.get("data-topic")
+            # 提取日期
+            date = item.select_one("header > div.result-authors > p.result-date")
+            date = date.get_text().strip() if date else ""
+            if len(date.split(",")) < 2:
+                continue
+            date = parse_datestring(date).strftime("%B %d, %Y")
+            # 提取演讲者
+            speaker = item.select_one(
+                "header > div > ul.authors > li.author > a[href]"
+            ).get_text().strip()
+
+            # 提取标题和链接
+            title_link = item.select_one("header > h2.result-title > a[href]")
+            title = title_link.get_text().strip()
+            href = self.absolute_url(title_link["href"])
+
+            speech_infos.append(
+                {
+                    "date": date,
+                    "speaker": speaker,
+                    "title": title,
+                    "href": href,
+                    "date_topic": date_topic,
+                }
+            )
+        return speech_infos
+
     def extract_speech_infos(self):
         """抽取演讲的信息"""
         # 设置为 Most recent
@@ -49,110 +83,40 @@ class PhiladelphiaSpeechScraper(SpeechScraper):
             By.XPATH,
             "//*[@id='content']/section[1]/div/div/div[@class='search-sort']/ul/li[.='Most Recent']/button",
         )
+        old_items = self.driver.find_elements(
+            By.XPATH,
+            "//*[@id='content']/section[1]/div/section/div/div[@class='result search-result']",
+        )[:1]
         sory_by_button.click()
-        time.sleep(1.2)
-
-        # 主循环获取所有演讲信息
-        speech_infos_by_year = {}
-        while True:
-            # 获取当前网页上所有演讲元素. 依次解析每一条
-            speech_items = self.driver.find_elements(
-                By.XPATH,
-                "//*[@id='content']/section[1]/div/section/div/div[@class='result search-result']",
-            )
-
-            for i, item in enumerate(speech_items):
-                # 话题类型记录一下
-                date_topic = speech_items[i].get_attribute("data-topic")
-                # 提取日期
-                date = speech_items[i].find_element(
-                    By.XPATH,
-                    "header/div[@class='result-authors']/p[@class='result-date']",
-                )
-                date = date.text.strip()
-                if len(date.split(",")) >= 2:
-                    year = int(date.split(",")[1].strip(" ")) 
-                else:
-                    continue
-                    year = min(speech_infos_by_year.keys())
-                if year not in speech_infos_by_year:
-                    speech_infos_by_year[year] = []
-                date = parse_datestring(date).strftime("%B %d, %Y")
-                # 提取演讲者
-                speaker = speech_items[i].find_element(
-                    By.XPATH, "header/div/ul[@class='authors']/li[@class='author']/a[@href]"
-                ).text.strip()
-
-                # 提取标题和链接
-                title_link = item.find_element(
-                    By.XPATH, "header/h2[@class='result-title']/a[@href]"
-                )
-                title = title_link.text.strip()
-                href = title_link.get_attribute("href")
-
-                speech_infos_by_year[year].append(
-                    {
-                        "date": date,
-                        "speaker": speaker,
-                        "title": title,
-                        "href": href,
-                        "date_topic": date_topic,
-                    }
-                )
-
-            # 点击下一页
-            try:
-                next_button = self.driver.find_element(
-                    By.XPATH,
-                    "//*[@id='content']/section[1]/div/section/ul/li[@class='next']/a[@role='button']",
-                )
-                self.driver.execute_script("arguments[0].click();", next_button)
-                # 等待页面加载
-                time.sleep(1.2)
-            except NoSuchElementException as e:
-                print(
-                    f"Next button not found or disabled. Reached last page. {repr(e)}"
-                )
-                break
-            except TimeoutException as e:
-                print(
-                    f"Next button not found or disabled. Reached last page. {repr(e)}"
-                )
-                break
-            except WebDriverException as e:
-                print(
-                    f"Next button not found or disabled. Reached last page. {repr(e)}"
-                )
-                break
-
+        self.wait_for_page_change(old_items)
+
+        # 排序参数名未公开，当前网址能得到同样的第一页时其余列表页按网址并发抓取，否则逐页点击
+        first_soup = self.snapshot()
+        base_url = self.driver.current_url
+        if not self.listing_url_reproduces(
+            base_url, self.parse_listing_page, self.parse_listing_page(first_soup)
+        ):
+            base_url = None
+        speech_infos = self.crawl_listing_pages(self.parse_listing_page, first_soup, base_url)
+        speech_infos_by_year = self.group_by_year(speech_infos)
         self.speech_infos_by_year = speech_infos_by_year
         return speech_infos_by_year
 
     def extract_single_speech(self, speech_info: dict):
         speech = {"speaker": "", "position": "", "highlights": "", "content": ""}
         try:
-            self.driver.get(speech_info["href"])
-            # 等待加载完
-            WebDriverWait(self.driver, 10).until(
-                EC.visibility_of_all_elements_located((By.ID, "content"))
-            )
-            time.sleep(1.2)
+            soup = self.fetch_page(speech_info["href"], self.CONTENT_SELECTOR)
 
             # 演讲人职位
-            author_title = self.driver.find_element(
-                by=By.XPATH,
-                value="//*[@id='content']/div[1]/div[2]/div/div[@class='author-desc']/p[@class='author-title']",
-            )
-            position = author_title.text.strip() if author_title else ""
+            author_title = soup.select_one("#content div.author-desc > p.author-title")
+            position = author_title.get_text().strip() if author_title else ""
 
             # 主内容元素
-            main_content = self.driver.find_element(By.ID, "content")
-            paragraph_elements = main_content.find_elements(
-                By.XPATH,
-                "//div[contains(@class, 'article-body')]/p",
-            )
+            paragraph_elements = soup.select("div.article-body > p")
             if paragraph_elements:
-                content = "\n\n".join([p.text.strip() for p in paragraph_elements])
+                content = "\n\n".join(
+                    [p.get_text().strip() for p in paragraph_elements]
+                )
                 print(
                     "{} {} {} content extracted.".format(
                         speech_info["speaker"],
@@ -177,7 +141,7 @@ class PhiladelphiaSpeechScraper(SpeechScraper):
                     href=speech_info["href"], error=repr(e)
                 )
             )
-            speech = {"content": ""}
+            speech = {"content": "", "error": type(e).__name__}
             print(
                 "{} {} {} content failed.".format(
                     speech_info["speaker"], speech_info["date"], speech_info["title"]
@@ -202,6 +166,8 @@ class PhiladelphiaSpeechScraper(SpeechScraper):
             if int(year) < start_year:
                 continue
             single_year_speeches = []
+            # 并发预取本年度的详情页
+            self.prefetch_pages(single_year_infos, start_date)
             for speech_info in single_year_infos:
                 # 跳过start_date之前的演讲
                 if parse_datestring(speech_info["date"]) <= start_date:
@@ -214,7 +180,7 @@ class PhiladelphiaSpeechScraper(SpeechScraper):
                     )
                     continue
                 # 提取演讲正文
-                single_speech = self.extract_single_speech(speech_info)
+                single_speech = self.run_job(speech_info)
                 if single_speech["content"] == "":
                     # 记录提取失败的报告
                     failed.append(single_speech)
@@ -251,100 +217,40 @@ class PhiladelphiaSpeechScraper(SpeechScraper):
         Returns:
             _type_: _description_
         """
-        # 提取每年演讲的基本信息（不含正文和highlights等）
+        # 已有演讲信息时只刷新列表页，增量抓取新的演讲
         if os.path.exists(self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"):
-            speech_infos = json_load(
-                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
+            logger.info("Speech Infos Data already exists, update incrementally.")
+            return self.update()
+
+        # 提取每年演讲的基本信息（不含正文和highlights等）
+        speech_infos = self.extract_speech_infos()
+        if self.save:
+            json_dump(
+                speech_infos,
+                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
             )
-            # 查看已有的最新的演讲日期
-            latest_year = max([k for k, _ in speech_infos.items()])
-            existed_lastest = max(
-                [
-                    parse_datestring(speech_info["date"])
-                    for speech_info in speech_infos[latest_year]
-                ]
-            ).strftime("%b %d, %Y")
-            logger.info("Speech Infos Data already exists, skip collecting infos.")
-            existed_lastest = "Jan 01, 2006"
-        else:
-            speech_infos = self.extract_speech_infos()
-            if self.save:
-                json_dump(
-                    speech_infos,
-                    self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
-                )
-            existed_lastest = "Jan 01, 2006"
 
         # 提取演讲正文内容
-        speeches = self.extract_speeches(speech_infos, existed_lastest)
+        speeches = self.extract_speeches(speech_infos)
+        self.save_watermark(speeches)
         return speeches
 
     def extract_lastest_speech_date(self):
-        """获取最近演讲的信息"""
-        try:
-            # 设置时间范围为最早和最晚
-            from_years_element = self.driver.find_element(By.ID, "fromYears")
-            from_years_options = [
-                int(option.text)
-                for option in Select(from_years_element).options
-                if option.text.isdigit()
-            ]
-            from_years_element.send_keys(str(min(from_years_options)))
-
-            to_years_element = self.driver.find_element(By.ID, "toYears")
-            to_years_options = [
-                int(option.text)
-                for option in Select(to_years_element).options
-                if option and option.text.isdigit()
-            ]
-            to_years_element.send_keys(str(max(to_years_options)))
-            # 点击搜寻按键
-            search_button = self.driver.find_element(
-                By.CSS_SELECTOR, "button.btn.btn-link[aria-label='Submit Filters']"
-            )
-            search_button.click()
-            # 等待页面
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located(
-                    (By.XPATH, "//*[@id='content']/div[3]/div[1]/search-results/div")
-                )
-            )
-            time.sleep(2.0)
-        except Exception as e:
-            print(f"Error setting date range: {e}")
-
-        soup = BeautifulSoup(self.driver.page_source, "html.parser")
-        speech_items = soup.find_all("li", class_="result-item")
-        # 提取最早的演讲的日期，锁定第一个演讲元素
-        latest_date = (
-            speech_items[0]
-            .find("div", class_="date-reference")
-            .text.split(" | ")[0]
-            .strip()
-        )
-        return parse_datestring(latest_date)
-
-    def update(self):
-        """更新报告
-
-        Returns:
-            _type_: _description_
-        """
-        # 读取本地演讲信息
-        speech_infos = json_load(
-            self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
-        )
-        # 查看最新的演讲日期
-        latest_year = max([k for k, _ in speech_infos.items()])
-        existed_lastest = max(
-            [
-                parse_datestring(speech_info["date"])
-                for speech_info in speech_infos[latest_year]
-            ]
-        )
-        # 获取网页上最新的报告日期
-        latest_speech_date = self.extract_lastest_speech_date()
-        return latest_speech_date > existed_lastest
+        """读取列表第一页中最新演讲的日期，没有演讲条目时为None"""
+        soup = parse_html(self.fetcher.fetch_text(self.url))
+        if soup.select_one(self.LISTING_SELECTOR) is None:
+            # 静态HTML中没有列表时在浏览器中读取
+            soup = self.snapshot()
+        dates = [
+            parse_datestring(speech_info["date"])
+            for speech_info in self.parse_listing_page(soup)
+        ]
+        dates = [date for date in dates if isinstance(date, datetime)]
+        return max(dates) if dates else None
+
+    def latest_listed_date(self):
+        """列表页上最新演讲的日期，不晚于水位线时update跳过列表刷新"""
+        return self.extract_lastest_speech_date()
 
 
 def test_extract_speech_infos():
@@ -370,8 +276,8 @@ def test_extract_single_speech():
 
 
 def test():
-    scraper = PhiladelphiaSpeechScraper()
-    scraper.collect()
+    with PhiladelphiaSpeechScraper() as scraper:
+        scraper.collect()
 
 
 if __name__ == "__main__":
@@ -9,14 +9,12 @@
 """
 
 import os
-import sys
 
-sys.path.append("../../")
-from scraper import SpeechScraper
-from selenium.webdriver.support import expected_conditions as EC
+from data_scraper.scrapers.scraper import SpeechScraper
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from utils.file_saver import json_dump, json_load
+from utils.file_saver import json_dump, json_update
+from utils.html_parser import parse_html
+from utils.logger import logger
 
 PROMPT = """
 下面这个链接是Richmond联储官员讲话的网址。
@@ -29,133 +27,69 @@ https://www.richmondfed.org/press_room/speeches
 
 
 class RichmondSpeechScraper(SpeechScraper):
-    URL = "https://www.richmondfed.org/press_room/speeches"  # ?mode=archive#2
+    URL = "https://www.richmondfed.org/press_room/speeches"
+    # 归档视图按年份列出全部演讲
+    ARCHIVE_QUERY = "?mode=archive"
     SAVE_PATH = "../../data/fed_speeches/richmond_fed_speeches/"
     __fed_name__ = "richmond_fed"
+    FETCH_BACKEND = "requests"
+    MAX_IN_FLIGHT = 4
+    CONTENT_SELECTOR = "#pi_center_column > div.tmplt.speech > div.tmplt__content"
+    # 归档中按年份折叠的列表，每个li为一年
+    ARCHIVE_SELECTOR = "#pi_center_column > div.component.comp-archive > ul"
 
     def __init__(self, url: str = None, auto_save: bool = True):
         super().__init__(url)
+        # 归档页与列表页同址，回放模式下随self.url一起改写
+        self.archive_url = self.absolute_url(self.ARCHIVE_QUERY)
         self.speech_infos_by_year = None
         self.speeches_by_year = None
         os.makedirs(self.SAVE_PATH, exist_ok=True)
         self.save = auto_save
 
-    def expand_all(self, accordian):
-        """展开所有年份
+    def parse_archive(self, soup) -> tuple:
+        """一次解析整个归档列表
 
-        Args:
-            accordian (_type_): _description_
+        Returns:
+            tuple: (按年份组织的演讲信息, 归档中的年份列表)
         """
-        year_links = accordian.find_elements(By.CSS_SELECTOR, "li a[data-anchor-id]")
-        for i, link in enumerate(year_links):
-            try:
-                # year_name = link.text.split("\n")[0] if len(link.text.split("\n")) > 1 else link.text
-                link.click()
-                # print(f"Year Item: {year_name} done.")
-                # 等待加载完
-                WebDriverWait(self.driver, 10).until(
-                    EC.presence_of_element_located(
-                        (
-                            By.CSS_SELECTOR,
-                            f"# pi_center_column > div.component.comp-archive > ul > li:nth-child({i}) > div.content[data-target-id]",
-                        )
-                    )
-                )
-            except Exception as e:
-                # print(f"Year Item {year_name} is not clickable. {repr(e)}")
-                print(repr(e))
-
-    def click_years(self, accordian):
-        year_titles = accordian.find_elements(
-            By.XPATH,
-            "//li //a[starts-with(@href, 'javascript:;')]",
-        )
-
-        for title in year_titles:
-            try:
-                # 检查内容区域是否已经展开
-                content_div = title.find_element(
-                    By.XPATH, "./following-sibling::div[contains(@class, 'content')]"
-                )
-                if content_div.get_attribute("style") != "display: block;":
-                    # 如果内容区域没有展开，则点击标题
-                    title.click()
-                    # 等待内容区域展开
-                    WebDriverWait(self.driver, 5).until(
-                        EC.text_to_be_present_in_element(
-                            (
-                                By.XPATH,
-                                "./following-sibling::div[contains(@class, 'content')]",
-                            ),
-                            "data-id",
-                        )
-                    )
-                    # 等待内容区域展开
-                    # WebDriverWait(self.driver, 10).until(EC.visibility_of(content_div))
-            except:
-                pass
-
-    def extract_speech_infos(self):
-        # 点击view more
-        view_more = self.driver.find_element(
-            By.XPATH, "//*[@id='pi_center_column']/div[2]/a"
-        )
-        view_more.click()
-        # Wait for the content to load
-        WebDriverWait(self.driver, 10).until(
-            EC.presence_of_element_located((By.ID, "content"))
-        )
-        # 展开所有年份的按键
-        accordian = self.driver.find_element(
-            By.XPATH,
-            "/html/body/div[1]/main/div/div/div/div[2]/div[2]/div[1]/ul",
+        accordian = soup.select_one(self.ARCHIVE_SELECTOR) or soup.select_one(
+            "body > div:nth-of-type(1) > main > div > div > div > div:nth-of-type(2) > div:nth-of-type(2) > div:nth-of-type(1) > ul"
         )
-        # option 1:
-        self.click_years(accordian)
-        
-        # option 2:
-        # self.expand_all(accordian)
-
-        speeches_by_year = accordian.find_elements(By.TAG_NAME, "li")
+        if accordian is None:
+            return {}, []
+        years = []
         speech_infos_by_year = {}
         # 获取每一年的演讲
-        for single_year_speeches in speeches_by_year:
+        for single_year_speeches in accordian.find_all("li"):
             # 标题
-            year_title = single_year_speeches.find_element(
-                By.CSS_SELECTOR, "a[href]"
-            ).text
-            year = year_title.split("\n")[0]
+            year_link = single_year_speeches.select_one("a[href]")
+            if year_link is None:
+                continue
+            year = year_link.get_text("\n", strip=True).split("\n")[0]
+            years.append(year)
             # 按数据行进行处理
-            data_rows = single_year_speeches.find_elements(
-                By.CSS_SELECTOR, "div.content > div.data__row"
-            )
+            data_rows = single_year_speeches.select("div.content > div.data__row")
             speech_infos_single_year = []
             for data_row in data_rows:
                 # 日期
-                date = data_row.find_element(
-                    By.CSS_SELECTOR,
-                    "section > div.data__pub-container > span.data__date",
-                ).text
+                date = data_row.select_one(
+                    "section > div.data__pub-container > span.data__date"
+                ).get_text().strip()
                 # 标题
-                title_element = data_row.find_element(
-                    By.CSS_SELECTOR, "section.data__group > div.data__title"
-                )
-                title = title_element.text
-                href = title_element.find_element(By.TAG_NAME, "a").get_attribute(
-                    "href"
+                title_element = data_row.select_one(
+                    "section.data__group > div.data__title"
                 )
+                title = title_element.get_text().strip()
+                href = self.absolute_url(title_element.find("a")["href"])
                 # 总结
-                summaries = data_row.find_elements(
-                    By.CSS_SELECTOR, "section > div.data__summary > p"
-                )
-                summary = "\n\n".join(
-                    [p.text for p in summaries]  # .find_elements(By.TAG_NAME, "p")
-                )
+                summaries = data_row.select("section > div.data__summary > p")
+                summary = "\n\n".join([p.get_text().strip() for p in summaries])
                 # 作者
-                speaker_paragraphs = data_row.find_elements(
-                    By.CSS_SELECTOR, "section.data__group > div.data__authors > p"
+                speaker_paragraphs = data_row.select(
+                    "section.data__group > div.data__authors > p"
                 )
-                speaker = "\n\n".join([p.text for p in speaker_paragraphs])
+                speaker = "\n\n".join([p.get_text().strip() for p in speaker_paragraphs])
 
                 speech_info = {
                     "year": year,
@@ -166,7 +100,66 @@ class RichmondSpeechScraper(SpeechScraper):
                     "speaker": speaker,
                 }
                 speech_infos_single_year.append(speech_info)
-            speech_infos_by_year[year] = speech_infos_single_year
+            if speech_infos_single_year:
+                speech_infos_by_year[year] = speech_infos_single_year
+        return speech_infos_by_year, years
+
+    def expand_all(self):
+        """在浏览器中打开归档页，用一段脚本一次性展开所有未加载的年份，再等待全部加载完"""
+        self.navigate(self.archive_url)
+        self.wait_for_element((By.CSS_SELECTOR, self.ARCHIVE_SELECTOR), raise_on_timeout=False)
+        clicked = self.driver.execute_script(
+            """
+            var ul = document.querySelector(arguments[0]);
+            if (!ul) { return 0; }
+            var clicked = 0;
+            ul.querySelectorAll(":scope > li").forEach(function (li) {
+                var title = li.querySelector("a[data-anchor-id], a[href^='javascript:']");
+                if (title && !li.querySelector("div.content > div.data__row")) {
+                    title.click();
+                    clicked++;
+                }
+            });
+            return clicked;
+            """,
+            self.ARCHIVE_SELECTOR,
+        )
+        print(f"Expanded {clicked} year blocks of {self.__fed_name__} archive.")
+
+        def all_loaded(driver):
+            return driver.execute_script(
+                """
+                var ul = document.querySelector(arguments[0]);
+                if (!ul) { return false; }
+                var items = Array.from(ul.querySelectorAll(":scope > li"));
+                return items.every(function (li) {
+                    return li.querySelector("div.content > div.data__row") !== null;
+                });
+                """,
+                self.ARCHIVE_SELECTOR,
+            )
+
+        self.wait_for("archive_expanded", all_loaded, timeout=30, raise_on_timeout=False)
+        self.wait_for_dom_stable(selector=self.ARCHIVE_SELECTOR)
+        return self.snapshot()
+
+    def extract_speech_infos(self):
+        # 先请求静态的归档页，所有年份已在HTML中时无需浏览器
+        try:
+            archive_page = self.fetcher.fetch(self.archive_url).text
+        except Exception as e:
+            logger.warning(f"Static fetch of {self.archive_url} failed. {repr(e)}")
+            archive_page = ""
+        speech_infos_by_year, years = self.parse_archive(parse_html(archive_page))
+        if not years or len(speech_infos_by_year) < len(years):
+            # 部分年份需展开后才加载，在浏览器中一次性展开后对整页做一次快照再解析
+            speech_infos_by_year, years = self.parse_archive(self.expand_all())
+
+        # 核对展开的年份数，发现部分展开
+        print(f"Found {len(speech_infos_by_year)} of {len(years)} year blocks in archive.")
+        missing = [year for year in years if year not in speech_infos_by_year]
+        if missing:
+            logger.warning(f"Speeches of {missing} are not loaded from archive.")
         # 存储到类中
         self.speech_infos_by_year = speech_infos_by_year
         return speech_infos_by_year
@@ -182,32 +175,23 @@ class RichmondSpeechScraper(SpeechScraper):
         """
         try:
             href = speech_info["href"]
-            self.driver.get(href)
-
-            # Wait for the content to load
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.CLASS_NAME, "tmplt.speech"))
-            )
+            soup = self.fetch_page(href, self.CONTENT_SELECTOR)
 
             # 演讲标题
-            speech_title = self.driver.find_element(
-                By.CSS_SELECTOR, "#pi_center_column > div.tmplt.speech > h2"
-            ).text
+            speech_title = soup.select_one(
+                "#pi_center_column > div.tmplt.speech > h2"
+            ).get_text().strip()
             # 重点
-            highlights_elements = self.driver.find_elements(
-                By.CSS_SELECTOR,
+            highlights_elements = soup.select(
                 "#pi_center_column > div.tmplt.speech > div.component.comp-highlights > ul > li",
             )
             highlights = "\n\n".join(
-                [highlight.text for highlight in highlights_elements]
+                [highlight.get_text().strip() for highlight in highlights_elements]
             )
             # 内容
-            content = self.driver.find_element(
-                By.CSS_SELECTOR,
-                "#pi_center_column > div.tmplt.speech > div.tmplt__content",
-            )
-            content_elements = content.find_elements(By.TAG_NAME, "p")
-            contents = "\n\n".join([p.text for p in content_elements])
+            content = soup.select_one(self.CONTENT_SELECTOR)
+            content_elements = content.find_all("p")
+            contents = "\n\n".join([p.get_text().strip() for p in content_elements])
             speech = {
                 "speech_title": speech_title,
                 "highlights": highlights,
@@ -218,7 +202,8 @@ class RichmondSpeechScraper(SpeechScraper):
             speech = {
                 "speech_title": "Error",
                 "highlights": "Error",
-                "content": "Error",
+                "content": "",
+                "error": type(e).__name__,
             }
         speech.update(speech_info)
         return speech
@@ -229,24 +214,27 @@ class RichmondSpeechScraper(SpeechScraper):
         failed = []
         for year, single_year_infos in speech_infos_by_year.items():
             singe_year_speeches = []
+            # 并发预取本年度的详情页
+            self.prefetch_pages(single_year_infos)
             for speech_info in single_year_infos:
-                single_speech = self.extract_single_speech(speech_info)
+                single_speech = self.run_job(speech_info)
                 if single_speech["content"] == "":
                     # 记录提取失败的报告
                     failed.append(single_speech)
                 singe_year_speeches.append(single_speech)
             speeches_by_year[year] = singe_year_speeches
             if self.save:
-                json_dump(
-                    singe_year_speeches,
+                json_update(
                     self.SAVE_PATH + f"{self.__fed_name__}_speeches_{year}.json",
+                    singe_year_speeches,
                 )
         if self.save:
             json_dump(
                 failed, self.SAVE_PATH + f"{self.__fed_name__}_failed_speech_infos.json"
             )
-            json_dump(
-                speeches_by_year, self.SAVE_PATH + f"{self.__fed_name__}_speeches.json"
+            # 更新已存储的演讲内容
+            json_update(
+                self.SAVE_PATH + f"{self.__fed_name__}_speeches.json", speeches_by_year
             )
         return speeches_by_year
 
@@ -256,23 +244,22 @@ class RichmondSpeechScraper(SpeechScraper):
         Returns:
             _type_: _description_
         """
+        # 已有演讲信息时只刷新列表页，增量抓取新的演讲
         if os.path.exists(self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"):
-            speech_infos = json_load(
-                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
+            print("Speech Infos Data already exists, update incrementally.")
+            return self.update()
+
+        # 提取每年演讲的基本信息（不含正文和highlights等）
+        speech_infos = self.extract_speech_infos()
+        if self.save:
+            json_dump(
+                speech_infos,
+                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
             )
-            print("Speech Infos Data already exists, skip collecting.")
-        else:
-            # 提取每年演讲的信息
-            speech_infos = self.extract_speech_infos()
-            if self.save:
-                json_dump(
-                    speech_infos,
-                    self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
-                )
-        # 提取演讲内容
+
+        # 提取演讲正文内容
         speeches = self.extract_speeches(speech_infos)
-        if self.save:
-            json_dump(speeches, self.SAVE_PATH + f"{self.__fed_name__}_speeches.json")
+        self.save_watermark(speeches)
         return speeches
 
 
@@ -299,8 +286,8 @@ def test_extract_single_speech():
 
 
 def test():
-    richmond = RichmondSpeechScraper()
-    result = richmond.collect()
+    with RichmondSpeechScraper() as richmond:
+        result = richmond.collect()
     print(result)
 
 
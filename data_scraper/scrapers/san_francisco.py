@@ -11,22 +11,14 @@
 # from datetime import datetime
 import os
 import re
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
+from urllib.parse import urlsplit
 
 # from selenium.webdriver.support.ui import Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import (
-    TimeoutException,
-    WebDriverException,
-    NoSuchElementException,
-)
 
-from bs4 import BeautifulSoup
-import time
 
 from data_scraper.scrapers.scraper import SpeechScraper
-from utils.file_saver import json_dump, json_load
+from utils.file_saver import json_dump, json_update
+from utils.html_parser import parse_html
 
 
 class SanFranciscoSpeechScraper(SpeechScraper):
@@ -34,6 +26,18 @@ class SanFranciscoSpeechScraper(SpeechScraper):
     __fed_name__ = "sanfrancisco"
     __name__ = f"{__fed_name__.title()}SpeechScraper"
     SAVE_PATH = f"../../data/fed_speeches/{__fed_name__}_fed_speeches/"
+    FETCH_BACKEND = "requests"
+    MAX_IN_FLIGHT = 8
+    RATE_LIMIT = 4.0
+    RATE_BURST = 8
+    DRIVER_POOL_SIZE = 4
+    # facetwp的页码参数
+    PAGE_PARAM = "_paged"
+    LISTING_SELECTOR = "div.fwpl-result"
+    PAGINATION_SELECTOR = "a.facetwp-page"
+    # facetwp翻页时调用的接口，返回每页的模板HTML及分页信息
+    FACETWP_API = "/wp-json/facetwp/v1/refresh"
+    CONTENT_SELECTOR = "#wp--skip-link--target div.entry-content.wp-block-post-content.has-global-padding.is-layout-constrained > div > div.sffed-main-content.wp-block-column.sffed-heading--greycliff.is-layout-flow.wp-block-column-is-layout-flow > div"
 
     def __init__(self, url: str = None, auto_save: bool = True):
         super().__init__(url)
@@ -43,106 +47,117 @@ class SanFranciscoSpeechScraper(SpeechScraper):
         print(f"{self.SAVE_PATH} has been created.")
         self.save = auto_save
 
+    def parse_listing_page(self, soup) -> list[dict]:
+        """解析一页演讲列表"""
+        speech_infos = []
+        for item in soup.select(self.LISTING_SELECTOR):
+            # 提取日期
+            date = item.find("div", class_=["fwpl-item el-julyf"]).text.strip()
+            # 提取演讲者
+            speaker_element = item.find(
+                "span",
+                class_=re.compile("fwpl-term.*fwpl-tax-speech-series"),
+            )
+            if speaker_element:
+                speaker = speaker_element.text.strip()
+                speaker = re.sub(r"['’]*s* Speeches", "", speaker)
+            else:
+                speaker = ""
+
+            # 提取标题和链接
+            title_link = item.find("a", href=True)
+            title = title_link.text.strip()
+            href = title_link["href"]
+
+            # 提取演讲地点
+            location_element = item.find(
+                "div",
+                class_=re.compile("fwpl-item.*el-6d47we.*wp-block-post-excerpt"),
+            )
+            location = location_element.text.strip() if location_element else ""
+
+            speech_infos.append(
+                {
+                    "date": date,
+                    "speaker": speaker,
+                    "title": title,
+                    "href": self.absolute_url(href),
+                    "location": location,
+                }
+            )
+        return speech_infos
+
+    def site_path(self) -> str:
+        """列表页在本站中的路径，回放模式下与原网站一致，使请求体与录制时相同"""
+        root_path = urlsplit(self.site_root).path
+        return urlsplit(self.url).path[len(root_path):].strip("/")
+
+    def facetwp_refresh(self, template: str, page: int) -> dict:
+        """请求facetwp接口获取某一页的结果"""
+        payload = {
+            "action": "facetwp_refresh",
+            "data": {
+                "facets": {},
+                "frozen_facets": {},
+                "http_params": {
+                    "get": {},
+                    "uri": self.site_path(),
+                    "url_vars": {},
+                },
+                "template": template,
+                "extras": {"sort": "default"},
+                "soft_refresh": 0,
+                "is_bfcache": 0,
+                "first_load": 0,
+                "paged": page,
+            },
+        }
+        return self.fetcher.fetch_json(
+            self.site_root + self.FACETWP_API.lstrip("/"), "POST", json=payload
+        )
+
+    def extract_speech_infos_from_api(self) -> list[dict]:
+        """通过facetwp接口获取各页结果，不需要渲染列表页"""
+        soup = parse_html(self.fetcher.fetch(self.url).text)
+        template = soup.select_one("div.facetwp-template[data-name]")
+        if template is None:
+            return None
+        first = self.facetwp_refresh(template["data-name"], 1)
+        page_count = first.get("settings", {}).get("pager", {}).get("total_pages")
+
+        def fetch_page(page):
+            data = first if page == 1 else self.facetwp_refresh(template["data-name"], page)
+            return self.parse_listing_page(parse_html(data.get("template", "")))
+
+        return self.crawl_api_pages(fetch_page, page_count)
+
     def extract_speech_infos(self):
         """抽取演讲的信息"""
-        # 主循环获取所有演讲信息
-        speech_infos_by_year = {}
-        while True:
-            soup = BeautifulSoup(self.driver.page_source, "html.parser")
-            speech_items = soup.find_all("div", class_="fwpl-result")
-
-            for item in speech_items:
-                # 提取日期
-                date = item.find("div", class_=["fwpl-item el-julyf"]).text.strip()
-                year = date.split(",")[-1].strip()
-                if year not in speech_infos_by_year:
-                    speech_infos_by_year[year] = []
-                # 提取演讲者
-                speaker_element = item.find(
-                    "span",
-                    class_=re.compile("fwpl-term.*fwpl-tax-speech-series"),
-                )
-                if speaker_element:
-                    speaker = speaker_element.text.strip()
-                    speaker = re.sub(r"['’]*s* Speeches", "", speaker)
-                else:
-                    speaker = ""
-
-                # 提取标题和链接
-                title_link = item.find("a", href=True)
-                title = title_link.text.strip()
-                href = title_link["href"]
-
-                # 提取演讲地点
-                location_element = item.find(
-                    "div",
-                    class_=re.compile("fwpl-item.*el-6d47we.*wp-block-post-excerpt"),
-                )
-                location = location_element.text.strip() if location_element else ""
-
-                speech_infos_by_year[year].append(
-                    {
-                        "date": date,
-                        "speaker": speaker,
-                        "title": title,
-                        "href": href,
-                        "location": location,
-                    }
-                )
-
-            # # Try to find and click the "Next" button
-            try:
-                next_button = self.driver.find_element(
-                    By.CSS_SELECTOR, "a.facetwp-page.next:not(.disabled)"
-                )
-                self.driver.execute_script("arguments[0].click();", next_button)
-                # 等待页面加载
-                time.sleep(2.0)
-            except NoSuchElementException as e:
-                print(
-                    f"Next button not found or disabled. Reached last page. {repr(e)}"
-                )
-                break
-            except TimeoutException as e:
-                print(
-                    f"Next button not found or disabled. Reached last page. {repr(e)}"
-                )
-                break
-            except WebDriverException as e:
-                print(
-                    f"Next button not found or disabled. Reached last page. {repr(e)}"
-                )
-                break
+        # 优先请求facetwp接口，不可用时再渲染列表页
+        speech_infos_by_year = self.listing_from_api()
+        if speech_infos_by_year is not None:
+            self.speech_infos_by_year = speech_infos_by_year
+            return speech_infos_by_year
 
+        # 第一页已在浏览器中打开，列表页不设筛选条件，其余页按self.url加页码参数并发抓取后按顺序合并
+        speech_infos = self.crawl_listing_pages(
+            self.parse_listing_page, self.snapshot(), self.url
+        )
+        speech_infos_by_year = self.group_by_year(speech_infos)
         self.speech_infos_by_year = speech_infos_by_year
-        if self.save:
-            json_dump(
-                speech_infos_by_year,
-                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
-            )
+        # 演讲信息由collect/update统一保存，update需先与已保存的信息合并
         return speech_infos_by_year
 
     def extract_single_speech(self, speech_info: dict):
         speech = {"speaker": "", "position": "", "highlights": "", "content": ""}
         try:
-            self.driver.get(speech_info["href"])
-            # 等待加载完
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, "wp--skip-link--target"))
-            )
+            soup = self.fetch_page(speech_info["href"], self.CONTENT_SELECTOR)
 
             # 主内容元素
-            main_content = self.driver.find_element(By.ID, "wp--skip-link--target")
-            content_element = main_content.find_element(
-                By.CSS_SELECTOR,
-                "div.entry-content.wp-block-post-content.has-global-padding.is-layout-constrained > div > div.sffed-main-content.wp-block-column.sffed-heading--greycliff.is-layout-flow.wp-block-column-is-layout-flow > div",
-            )
+            content_element = soup.select_one(self.CONTENT_SELECTOR)
             if content_element:
                 content = "\n\n".join(
-                    [
-                        p.text.strip()
-                        for p in content_element.find_elements(By.TAG_NAME, "p")
-                    ]
+                    [p.get_text().strip() for p in content_element.find_all("p")]
                 )
                 print(
                     "{} {} {} content extracted.".format(
@@ -168,7 +183,7 @@ class SanFranciscoSpeechScraper(SpeechScraper):
                     href=speech_info["href"], error=repr(e)
                 )
             )
-            speech = {"content": ""}
+            speech = {"content": "", "error": type(e).__name__}
             print(
                 "{} {} {} content failed.".format(
                     speech_info["speaker"], speech_info["date"], speech_info["title"]
@@ -183,61 +198,53 @@ class SanFranciscoSpeechScraper(SpeechScraper):
         failed = []
         for year, single_year_infos in speech_infos_by_year.items():
             singe_year_speeches = []
+            # 并发预取本年度的详情页
+            self.prefetch_pages(single_year_infos)
             for speech_info in single_year_infos:
-                single_speech = self.extract_single_speech(speech_info)
+                single_speech = self.run_job(speech_info)
                 if single_speech["content"] == "":
                     # 记录提取失败的报告
                     failed.append(single_speech)
                 singe_year_speeches.append(single_speech)
             speeches_by_year[year] = singe_year_speeches
             if self.save:
-                json_dump(
-                    singe_year_speeches,
+                json_update(
                     self.SAVE_PATH + f"{self.__fed_name__}_speeches_{year}.json",
+                    singe_year_speeches,
                 )
             print(f"Speeches of {year} collected.")
         if self.save:
             json_dump(
                 failed, self.SAVE_PATH + f"{self.__fed_name__}_failed_speech_infos.json"
             )
-            json_dump(
-                speeches_by_year, self.SAVE_PATH + f"{self.__fed_name__}_speeches.json"
+            # 更新已存储的演讲内容
+            json_update(
+                self.SAVE_PATH + f"{self.__fed_name__}_speeches.json", speeches_by_year
             )
         return speeches_by_year
 
-    # def update(self, latest_date: str):
-    # 获取最新的演讲的日期，如果演讲日期与页面上演讲日期不一致，则更新最新演讲日期之后的报告
-    # if os.path.exists(self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"):
-    #     speech_infos = json_load(
-    #         self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
-    #     )
-    #     print("Speech Infos Data already exists, skip collecting.")
-    #     # 获取
-
     def collect(self):
         """收集每篇演讲的信息
 
         Returns:
             _type_: _description_
         """
-        # 提取每年演讲的信息，若存在则不再更新？.做更新机制.
+        # 已有演讲信息时只刷新列表页，增量抓取新的演讲
         if os.path.exists(self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"):
-            speech_infos = json_load(
-                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
+            print("Speech Infos Data already exists, update incrementally.")
+            return self.update()
+
+        # 提取每年演讲的基本信息（不含正文和highlights等）
+        speech_infos = self.extract_speech_infos()
+        if self.save:
+            json_dump(
+                speech_infos,
+                self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
             )
-            print("Speech Infos Data already exists, skip collecting.")
-        else:
-            speech_infos = self.extract_speech_infos()
-            if self.save:
-                json_dump(
-                    speech_infos,
-                    self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json",
-                )
 
-        # 提取演讲内容
+        # 提取演讲正文内容
         speeches = self.extract_speeches(speech_infos)
-        if self.save:
-            json_dump(speeches, self.SAVE_PATH + f"{self.__fed_name__}_speeches.json")
+        self.save_watermark(speeches)
         return speeches
 
 
@@ -265,8 +272,8 @@ def test_extract_speech_infos():
 
 
 def test():
-    scraper = SanFranciscoSpeechScraper()
-    scraper.collect()
+    with SanFranciscoSpeechScraper() as scraper:
+        scraper.collect()
 
 
 if __name__ == "__main__":
@@ -1,6 +1,39 @@
 from abc import abstractmethod
-from selenium import webdriver
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import time
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from utils.async_crawler import AsyncCrawler
+from utils.browser import (
+    DEFAULT_BLOCKED_RESOURCES,
+    DriverPool,
+    build_chrome_options,
+    launch_chrome,
+)
+from utils.common import parse_datestring
+from utils.fetcher import HttpFetcher, get_fetcher
+from utils.file_saver import json_dump, json_load
+from utils.html_parser import parse_html
+from utils.job_queue import DONE, FAILED, get_job_queue
+from utils.logger import logger
+from utils.rate_limiter import get_rate_limiter
+from utils.raw_archive import get_archive
+from utils.replay import get_recorder, get_replay_server, wrap_recording
+from utils.retry import get_circuit_breaker, retry_call
+from utils.watermark import Watermark, speech_url
+from utils.xhr_discovery import (
+    build_request,
+    get_xhr_log,
+    load_endpoint,
+    pick,
+    records_from_json,
+)
 
 FOMC_MEETING_PROMPT = """
 下面这个网站是美联储FOMC的会议网址：https://www.federalreserve.gov/monetarypolicy/fomccalendars.htm
@@ -18,14 +51,941 @@ date: 决议日期，为str类型，如17-19
 
 class SpeechScraper(object):
     URL: str = ""
+    # 详情页抓取方式: "selenium" 或 "requests"（静态HTML，缺失内容时回退到selenium）
+    FETCH_BACKEND: str = "selenium"
+    # 并发抓取详情页时，同一host同时在途的最大请求数（1表示逐篇抓取）
+    MAX_IN_FLIGHT: int = 1
+    # 详情页正文的CSS选择器
+    CONTENT_SELECTOR: str = ""
+    # 并发渲染详情页的Chrome实例数（0表示不启用浏览器池）
+    DRIVER_POOL_SIZE: int = 0
+    # Chrome是否以无头模式运行
+    HEADLESS: bool = True
+    # 屏蔽的资源类型: image, font, stylesheet, analytics
+    BLOCKED_RESOURCES: tuple = DEFAULT_BLOCKED_RESOURCES
+    # 是否把抓取到的原始页面存入内容寻址存档，供reparse离线重新解析
+    ARCHIVE_RAW: bool = True
+    # 对本联储host的限速: 每秒请求数及允许的突发请求数
+    RATE_LIMIT: float = 2.0
+    RATE_BURST: int = 4
+    # 临时性错误的最多重试次数
+    RETRIES: int = 3
+    # 是否用SQLite任务表记录每篇演讲的抓取进度，崩溃后可继续
+    USE_JOB_QUEUE: bool = True
+    # 同一篇演讲在多次继续运行中最多尝试的次数
+    MAX_ATTEMPTS: int = 3
+    # 增量更新中同一篇演讲连续失败的轮数达到该值后不再抓取
+    MAX_FAILED_RUNS: int = 3
+    # 列表页的页码参数名，用于直接构造各页网址并发抓取，替代逐页点击"下一页"
+    PAGE_PARAM: str = ""
+    # 列表页中每条演讲的CSS选择器，静态HTML中缺失时改用浏览器渲染
+    LISTING_SELECTOR: str = ""
+    # 分页控件中页码链接的CSS选择器，用于读取总页数
+    PAGINATION_SELECTOR: str = ""
+    # "下一页"控件的CSS选择器，筛选条件无法写入列表页网址时逐页点击
+    NEXT_PAGE_SELECTOR: str = ""
+    # 发现模式记录的列表接口中，匹配本联储列表接口网址的正则
+    LISTING_API_PATTERN: str = ""
+    # 列表接口返回的条目到演讲信息的字段映射: 字段 -> 候选键名
+    API_FIELDS: dict = {
+        "date": ("date", "publishDate", "publishedDate", "displayDate", "eventDate"),
+        "speaker": ("speaker", "speakers", "author", "authors"),
+        "title": ("title", "name", "headline"),
+        "href": ("url", "link", "href", "path"),
+        "highlights": ("teaser", "summary", "description", "abstract"),
+    }
 
     def __init__(self, url: str = None, **kwargs):
-        options = kwargs.get("options", None)
-        self.driver = webdriver.Chrome(options=options)
-        url = self.URL if url is None else url
-        if not url:
+        # 浏览器在第一次使用self.driver时才启动
+        self._options = kwargs.get("options", None)
+        self._driver = None
+        self.fetcher = get_fetcher()
+        self.archive = get_archive() if self.ARCHIVE_RAW else None
+        # reparse模式下详情页只从存档读取，不访问网络
+        self.reparse_mode = False
+        self.jobs = get_job_queue() if self.USE_JOB_QUEUE else None
+        self.run_id = None
+        # 已保存演讲的水位线，update时读取
+        self.watermark = None
+        self.fetch_stats = {"prefetched": 0, "static": 0, "fallback": 0, "selenium": 0}
+        # 并发预取的详情页HTML, 网址 -> HTML
+        self._prefetched = {}
+        self.driver_pool = None
+        # 每类等待的实际耗时(秒), 名称 -> list[float]
+        self.wait_stats = {}
+        self.url = self.URL if url is None else url
+        if not self.url:
             raise ValueError("No url provided.")
-        self.driver.get(url)
+        # 回放模式下改为访问本地fixture服务，并关闭缓存和存档以保证结果可复现
+        # 本联储网站的根网址，用于判断链接是否指向本站
+        self.site_root = urljoin(self.url, "/")
+        replay_server = get_replay_server()
+        if replay_server is not None:
+            self.URL = self.url = replay_server.rewrite_url(self.url)
+            self.site_root = replay_server.rewrite_url(self.site_root)
+            self.fetcher = HttpFetcher()
+            self.archive = None
+            self.jobs = None
+        # 回放本地fixture时不限速，以测量爬虫自身的吞吐
+        self.rate_limiter = get_rate_limiter()
+        self.rate_limiter.configure(
+            self.url, None if replay_server is not None else self.RATE_LIMIT, self.RATE_BURST
+        )
+
+    @property
+    def driver(self):
+        """按需启动Chrome并打开起始网址"""
+        if self._driver is None:
+            options = self._options or self.build_options()
+            self._driver = launch_chrome(options, self.BLOCKED_RESOURCES)
+            if get_recorder() is not None:
+                self._driver = wrap_recording(self._driver, get_recorder())
+            logger.info(f"{type(self).__name__} launched Chrome for {self.url}.")
+            self.navigate(self.url, self._driver)
+        return self._driver
+
+    @property
+    def browser_started(self) -> bool:
+        return self._driver is not None
+
+    def close(self):
+        """关闭浏览器及浏览器池"""
+        if self._driver is not None:
+            try:
+                self._driver.quit()
+            except Exception as e:
+                logger.warning(f"Quit driver failed. {repr(e)}")
+            self._driver = None
+        else:
+            logger.info(f"{type(self).__name__} finished without launching a browser.")
+        if self.fetcher.cache is not None:
+            logger.info(f"{type(self).__name__} HTTP cache stats: {self.fetcher.cache.stats}")
+        if self.driver_pool is not None:
+            self.driver_pool.close()
+            self.driver_pool = None
+        self.rate_limiter.log_summary()
+        breaker_stats = get_circuit_breaker().stats
+        if breaker_stats:
+            logger.warning(f"Circuit breaker trips: {breaker_stats}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # 异常退出时保留未结束的轮次，下次从中断处继续
+        if exc_type is None:
+            self.finish_run()
+        self.close()
+
+    def build_options(self, prefs: dict = None):
+        """按本联储的配置构建Chrome选项
+
+        Args:
+            prefs (dict, optional): 额外的Chrome偏好设置. Defaults to None.
+
+        Returns:
+            Options: Chrome选项
+        """
+        return build_chrome_options(
+            headless=self.HEADLESS,
+            blocked_resources=self.BLOCKED_RESOURCES,
+            prefs=prefs,
+            performance_log=get_recorder() is not None or get_xhr_log() is not None,
+        )
+
+    def snapshot(self, driver=None, parse_only=None) -> BeautifulSoup:
+        """对当前页面做一次page_source快照并解析，避免逐个元素调用WebDriver
+
+        Args:
+            driver (WebDriver, optional): 默认为self.driver. Defaults to None.
+            parse_only (SoupStrainer, optional): 只解析目标子树. Defaults to None.
+
+        Returns:
+            BeautifulSoup: 解析后的页面
+        """
+        driver = self.driver if driver is None else driver
+        self.record_traffic(driver)
+        return parse_html(driver.page_source, parse_only)
+
+    def absolute_url(self, href: str) -> str:
+        """将快照中的相对链接补全为绝对链接"""
+        return urljoin(self.url, href) if href else ""
+
+    def is_site_url(self, href: str) -> bool:
+        """链接是否指向本联储网站，回放模式下按回放服务上的网址判断"""
+        return bool(href) and self.absolute_url(href).startswith(self.site_root)
+
+    def fetch_page(self, url: str, selector: str, timeout: float = 10) -> BeautifulSoup:
+        """获取详情页并解析为BeautifulSoup
+
+        FETCH_BACKEND为"requests"时先请求静态HTML，若其中不含selector对应的内容，
+        再回退到selenium渲染页面.
+
+        Args:
+            url (str): 网址
+            selector (str): 正文内容的CSS选择器
+            timeout (float, optional): selenium等待内容出现的超时时间. Defaults to 10.
+
+        Returns:
+            BeautifulSoup: 解析后的页面
+        """
+        if self.reparse_mode:
+            html = self.archive.get_text(url) if self.archive is not None else ""
+            if not html:
+                logger.warning(f"{url} not found in raw archive.")
+            return parse_html(html)
+
+        prefetched = self._prefetched.pop(url, None)
+        if prefetched:
+            soup = parse_html(prefetched)
+            if soup.select_one(selector) is not None:
+                self.fetch_stats["prefetched"] += 1
+                return soup
+
+        if self.FETCH_BACKEND == "requests":
+            html = self.fetcher.fetch_text(url) if prefetched is None else ""
+            if html:
+                soup = parse_html(html)
+                if soup.select_one(selector) is not None:
+                    self.fetch_stats["static"] += 1
+                    self.archive_page(url, html)
+                    return soup
+            logger.info(f"Static HTML of {url} lacks `{selector}`, fallback to selenium.")
+            self.fetch_stats["fallback"] += 1
+        else:
+            self.fetch_stats["selenium"] += 1
+
+        self.navigate(url)
+        self.wait_for_element((By.CSS_SELECTOR, selector), timeout=timeout)
+        html = self.driver.page_source
+        self.archive_page(url, html)
+        self.record_traffic(self.driver)
+        return parse_html(html)
+
+    def navigate(self, url: str, driver=None):
+        """按host限速后在浏览器中打开网址，所有selenium跳转都应经过这里
+
+        页面加载超时、浏览器会话断开按指数退避重试，连续失败的host会被熔断暂停.
+
+        Args:
+            url (str): 网址
+            driver (WebDriver, optional): 默认为self.driver. Defaults to None.
+        """
+        driver = self.driver if driver is None else driver
+
+        def load():
+            self.rate_limiter.acquire(url)
+            driver.get(url)
+
+        retry_call(load, url, self.RETRIES)
+
+    def run_job(self, speech_info: dict) -> dict:
+        """通过任务表提取单篇演讲，结果立即落盘
+
+        本轮中已完成或已放弃的演讲直接返回保存的结果，不再抓取；
+        正由其他进程抓取的演讲返回空正文，error为"InProgress".
+
+        Args:
+            speech_info (dict): 演讲信息
+
+        Returns:
+            dict: extract_single_speech的结果
+        """
+        url = speech_info.get("href") or speech_info.get("url")
+        if self.jobs is None or self.reparse_mode or not url:
+            return self.extract_single_speech(speech_info)
+        if self.run_id is None:
+            self.run_id = self.jobs.start_run(self.__fed_name__)
+        if not self.jobs.claim(self.run_id, self.__fed_name__, url):
+            job = self.jobs.get(self.run_id, url)
+            if job is None or job["result"] is None:
+                return dict(speech_info, content="", error="InProgress")
+            return job["result"]
+        try:
+            speech = self.extract_single_speech(speech_info)
+        except Exception as e:
+            self.jobs.fail(
+                self.run_id, url, dict(speech_info), type(e).__name__, self.MAX_ATTEMPTS
+            )
+            raise
+        if speech.get("content"):
+            self.jobs.complete(self.run_id, url, speech)
+        else:
+            error = speech.get("error") or "EmptyContent"
+            self.jobs.fail(self.run_id, url, speech, error, self.MAX_ATTEMPTS)
+        return speech
+
+    def job_finished(self, url: str) -> bool:
+        """本轮中该网址的任务是否已完成或已放弃"""
+        if self.jobs is None or self.run_id is None:
+            return False
+        job = self.jobs.get(self.run_id, url)
+        return job is not None and job["state"] in (DONE, FAILED)
+
+    def finish_run(self):
+        """正常结束本轮抓取，下次collect将开始新的一轮"""
+        if self.jobs is not None and self.run_id is not None:
+            logger.info(f"Run {self.run_id} finished: {self.jobs.counts(self.run_id)}")
+            self.jobs.finish_run(self.run_id)
+            self.run_id = None
+
+    def record_traffic(self, driver):
+        """录制模式下记录driver当前已加载的响应，发现模式下记录XHR/fetch请求"""
+        recorder = get_recorder()
+        if recorder is not None:
+            recorder.record_page(driver)
+        xhr_log = get_xhr_log()
+        if xhr_log is not None:
+            xhr_log.collect(driver)
+
+    def archive_page(self, url: str, html):
+        """把抓取到的原始页面存入存档"""
+        if self.archive is None or self.reparse_mode or not html:
+            return
+        try:
+            self.archive.put(url, html)
+        except Exception as e:
+            logger.warning(f"Archive {url} failed. {repr(e)}")
+
+    def reparse(self):
+        """从原始存档重新解析已有的演讲信息并重建演讲JSON，不访问网络
+
+        未存档的演讲会被跳过，以免用空内容覆盖已保存的正文.
+
+        Returns:
+            dict: extract_speeches的结果
+        """
+        speech_infos = json_load(self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json")
+        if not speech_infos or self.archive is None:
+            logger.error(f"No speech infos or raw archive of {self.__fed_name__} to reparse.")
+            return {}
+        archived_infos = {}
+        for year, single_year_infos in speech_infos.items():
+            archived = [
+                speech_info
+                for speech_info in single_year_infos
+                if (speech_info.get("href") or speech_info.get("url")) in self.archive
+            ]
+            if archived:
+                archived_infos[year] = archived
+        total = sum(len(v) for v in speech_infos.values())
+        archived_count = sum(len(v) for v in archived_infos.values())
+        print(f"Reparse {archived_count} of {total} speeches from raw archive.")
+        if not archived_infos:
+            return {}
+        self.reparse_mode = True
+        try:
+            return self.extract_speeches(archived_infos)
+        finally:
+            self.reparse_mode = False
+
+    def load_watermark(self) -> Watermark:
+        """读取本联储的水位线，首次使用时从已保存的演讲重建"""
+        self.watermark = Watermark.load(
+            self.SAVE_PATH + f"{self.__fed_name__}_watermark.json",
+            self.SAVE_PATH + f"{self.__fed_name__}_speeches.json",
+            self.MAX_FAILED_RUNS,
+        )
+        return self.watermark
+
+    def save_watermark(self, speeches):
+        """把本次抓取到正文的演讲计入水位线并保存"""
+        if self.watermark is None:
+            self.load_watermark()
+        self.watermark.add(speeches)
+        if self.save:
+            self.watermark.save()
+
+    def latest_listed_date(self):
+        """列表页上最新演讲的日期，用于判断是否需要刷新列表；不支持时为None"""
+        return None
+
+    def listing_page_url(self, base_url: str, page: int) -> str:
+        """在列表页网址上设置页码参数，保留其余筛选参数（包括多选时重复的参数）"""
+        parts = urlsplit(base_url)
+        query = [
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if name != self.PAGE_PARAM
+        ]
+        query.append((self.PAGE_PARAM, str(page)))
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    def filtered_listing_url(self, url: str, params: dict) -> str:
+        """按筛选参数显式构造列表页网址
+
+        Args:
+            url (str): 设置筛选后的网址或翻页链接，从中读取各参数的取值
+            params (dict): 参数名 -> 预期取值，为None时只要求参数存在
+
+        Returns:
+            str: self.url加上这些参数的网址；缺少参数或取值不符时为None，此时应逐页点击
+        """
+        values = {}
+        for name, value in parse_qsl(urlsplit(url).query, keep_blank_values=True):
+            values.setdefault(name, []).append(value)
+        parts = urlsplit(self.url)
+        query = [
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if name not in params
+        ]
+        for name, expected in params.items():
+            if not values.get(name) or (expected is not None and expected not in values[name]):
+                logger.warning(f"{url} lacks listing parameter {name}, page through the browser.")
+                return None
+            query += [(name, value) for value in values[name]]
+        return urlunsplit(parts._replace(query=urlencode(query)))
+
+    def listing_url_reproduces(self, base_url: str, parse_page, first_infos: list[dict]) -> bool:
+        """按网址获取的第一页是否与浏览器中筛选/排序后的第一页相同
+
+        筛选条件的参数名未知时，以此确认base_url带有全部筛选条件.
+        """
+        if not first_infos:
+            return False
+        url = self.listing_page_url(base_url, 1)
+        page_infos = parse_page(parse_html(self.fetch_listing_pages([url]).get(url, "")))
+        if page_infos and speech_url(page_infos[0]) == speech_url(first_infos[0]):
+            return True
+        logger.warning(f"{base_url} does not reproduce the filtered listing, page through the browser.")
+        return False
+
+    def parse_page_count(self, soup: BeautifulSoup) -> int:
+        """从分页控件读取总页数，无法读取时为None"""
+        if not self.PAGINATION_SELECTOR:
+            return None
+        pages = [
+            int(link.get_text().strip())
+            for link in soup.select(self.PAGINATION_SELECTOR)
+            if link.get_text().strip().isdigit()
+        ]
+        return max(pages) if pages else None
+
+    def fetch_listing_pages(
+        self, urls: list[str], selector: str = None, paged: bool = True
+    ) -> dict:
+        """并发获取一批列表页，静态HTML中没有selector的页面交给浏览器渲染
+
+        列表页会随新演讲发布而变化，因此不经过HTTP缓存，也不存入原始存档.
+
+        Args:
+            urls (list[str]): 列表页网址
+            selector (str, optional): 列表条目的CSS选择器. Defaults to LISTING_SELECTOR.
+            paged (bool, optional): 是否为同一列表的连续页码，为False时各网址互不相关. Defaults to True.
+
+        Returns:
+            dict: 网址 -> HTML
+        """
+        selector = selector or self.LISTING_SELECTOR
+        pages = {}
+        if self.FETCH_BACKEND == "requests":
+            pages = AsyncCrawler(max(1, self.MAX_IN_FLIGHT)).crawl(urls)
+        static = {
+            url
+            for url, html in pages.items()
+            if html and parse_html(html).select_one(selector) is not None
+        }
+        # 同批次有页面能静态获取时，其余没有结果的页面视为超出末页，只重试请求失败的页面
+        pending = [
+            url
+            for url in urls
+            if url not in static and (not paged or not static or not pages.get(url))
+        ]
+        if not pending:
+            return pages
+        if self.DRIVER_POOL_SIZE > 0:
+            rendered = self.get_driver_pool().map(
+                lambda driver, url: self._render_page(driver, url, selector=selector),
+                pending,
+            )
+        else:
+            rendered = [
+                self._render_page(self.driver, url, selector=selector) for url in pending
+            ]
+        pages.update({url: html for url, html in zip(pending, rendered) if html})
+        return pages
+
+    def crawl_listing_pages(
+        self, parse_page, first_soup: BeautifulSoup, base_url: str = None
+    ) -> list[dict]:
+        """按网址并发抓取其余列表页，按页码顺序合并每页的演讲信息
+
+        能读到总页数时一次并发抓取全部页面；读不到或增量更新时按批抓取，
+        遇到空页、重复页或listing_caught_up的页面即停止.
+
+        Args:
+            parse_page (callable): 解析一页列表，接收BeautifulSoup，返回list[dict]
+            first_soup (BeautifulSoup): 浏览器中已打开的第一页
+            base_url (str, optional): 带全部筛选参数的列表页网址，为None时在浏览器中逐页点击. Defaults to None.
+
+        Returns:
+            list[dict]: 与列表顺序一致的演讲信息
+        """
+        if base_url is None:
+            return self.click_through_listing(parse_page, first_soup)
+        speech_infos = parse_page(first_soup)
+        if not speech_infos or self.listing_caught_up(speech_infos):
+            return speech_infos
+        page_count = self.parse_page_count(first_soup)
+        incremental = self.watermark is not None and not self.watermark.empty
+        batch = max(1, self.MAX_IN_FLIGHT, self.DRIVER_POOL_SIZE)
+        previous = speech_infos
+        page = 2
+        while page_count is None or page <= page_count:
+            if page_count is not None and not incremental:
+                last = page_count
+            else:
+                last = page + batch - 1
+                if page_count is not None:
+                    last = min(last, page_count)
+            urls = [self.listing_page_url(base_url, p) for p in range(page, last + 1)]
+            pages = self.fetch_listing_pages(urls)
+            for url in urls:
+                page_infos = parse_page(parse_html(pages.get(url, "")))
+                if not page_infos:
+                    if page_count is not None:
+                        logger.warning(f"Listing page {url} is empty, stop paging.")
+                    return speech_infos
+                # 网站忽略页码参数时会反复返回同一页
+                if speech_url(page_infos[0]) == speech_url(previous[0]):
+                    logger.warning(f"Listing page {url} repeats the previous page.")
+                    return speech_infos
+                speech_infos.extend(page_infos)
+                previous = page_infos
+                if self.listing_caught_up(page_infos):
+                    print("Reached speeches already stored, stop paging.")
+                    return speech_infos
+            print(f"Listing pages {page}-{last} fetched.")
+            page = last + 1
+        return speech_infos
+
+    def click_through_listing(self, parse_page, first_soup: BeautifulSoup) -> list[dict]:
+        """在浏览器中逐页点击NEXT_PAGE_SELECTOR，按顺序合并每页的演讲信息"""
+        speech_infos = []
+        previous = None
+        soup = first_soup
+        while True:
+            page_infos = parse_page(soup)
+            if not page_infos:
+                break
+            if previous and speech_url(page_infos[0]) == speech_url(previous[0]):
+                logger.warning("Listing page did not change after clicking next.")
+                break
+            speech_infos.extend(page_infos)
+            previous = page_infos
+            if self.listing_caught_up(page_infos):
+                print("Reached speeches already stored, stop paging.")
+                break
+            next_buttons = (
+                self.driver.find_elements(By.CSS_SELECTOR, self.NEXT_PAGE_SELECTOR)
+                if self.NEXT_PAGE_SELECTOR
+                else []
+            )
+            if not next_buttons:
+                print("Next button not found. Reached last page.")
+                break
+            old_items = self.driver.find_elements(By.CSS_SELECTOR, self.LISTING_SELECTOR)[:1]
+            self.driver.execute_script("arguments[0].click();", next_buttons[0])
+            self.wait_for_page_change(old_items)
+            soup = self.snapshot()
+        return speech_infos
+
+    def listing_api(self) -> dict:
+        """发现模式保存的本联储列表接口，没有时为None"""
+        return load_endpoint(self.__fed_name__, self.LISTING_API_PATTERN)
+
+    def call_api(self, endpoint: dict, params: dict = None):
+        """按参数重放发现到的接口，返回解析后的JSON"""
+        url, body, headers = build_request(endpoint, params)
+        replay_server = get_replay_server()
+        if replay_server is not None:
+            url = replay_server.rewrite_url(url)
+        return self.fetcher.fetch_json(
+            url, endpoint.get("method", "GET"), data=body, headers=headers
+        )
+
+    def api_speech_infos(self, data) -> list[dict]:
+        """把接口返回的JSON条目转换为演讲信息，日期统一为"%B %d, %Y"格式"""
+        speech_infos = []
+        for record in records_from_json(data):
+            speech_info = {
+                field: pick(record, candidates) for field, candidates in self.API_FIELDS.items()
+            }
+            date = parse_datestring(speech_info["date"])
+            if not isinstance(date, datetime) or not speech_info["href"]:
+                continue
+            speech_info["date"] = date.strftime("%B %d, %Y")
+            speech_info["href"] = self.absolute_url(speech_info["href"])
+            speech_infos.append(speech_info)
+        return speech_infos
+
+    def crawl_api_pages(self, fetch_page, page_count: int = None) -> list[dict]:
+        """并发请求列表接口的各页，按页码顺序合并
+
+        Args:
+            fetch_page (callable): 接收页码，返回该页的演讲信息list[dict]
+            page_count (int, optional): 总页数，未知时按批请求直到出现空页. Defaults to None.
+
+        Returns:
+            list[dict]: 与列表顺序一致的演讲信息
+        """
+        incremental = self.watermark is not None and not self.watermark.empty
+        batch = max(1, self.MAX_IN_FLIGHT)
+        speech_infos = []
+        previous = None
+        page = 1
+        with ThreadPoolExecutor(max_workers=batch) as executor:
+            while page_count is None or page <= page_count:
+                if page_count is not None and not incremental:
+                    last = page_count
+                else:
+                    last = page + batch - 1
+                    if page_count is not None:
+                        last = min(last, page_count)
+                for page_infos in executor.map(fetch_page, range(page, last + 1)):
+                    if not page_infos:
+                        return speech_infos
+                    # 接口忽略页码参数时会反复返回同一页
+                    if previous and speech_url(page_infos[0]) == speech_url(previous[0]):
+                        logger.warning("Listing API repeats the previous page, stop paging.")
+                        return speech_infos
+                    speech_infos.extend(page_infos)
+                    previous = page_infos
+                    if self.listing_caught_up(page_infos):
+                        print("Reached speeches already stored, stop paging.")
+                        return speech_infos
+                page = last + 1
+        return speech_infos
+
+    def extract_speech_infos_from_api(self) -> list[dict]:
+        """直接请求列表接口获取演讲信息，不支持时返回None"""
+        return None
+
+    def listing_from_api(self) -> dict:
+        """优先通过列表接口获取按年份分组的演讲信息，失败时返回None以回退到页面操作"""
+        # 发现模式下需要操作页面以记录接口
+        if get_xhr_log() is not None:
+            return None
+        try:
+            speech_infos = self.extract_speech_infos_from_api()
+        except Exception as e:
+            logger.warning(f"Listing API of {self.__fed_name__} failed. {repr(e)}")
+            return None
+        if not speech_infos:
+            return None
+        print(f"{len(speech_infos)} speech infos fetched from listing API.")
+        return self.group_by_year(speech_infos)
+
+    @staticmethod
+    def group_by_year(speech_infos: list[dict]) -> dict:
+        """按演讲日期的年份分组，保持列表中的顺序"""
+        speech_infos_by_year = {}
+        for speech_info in speech_infos:
+            date = parse_datestring(speech_info["date"])
+            if not isinstance(date, datetime):
+                logger.warning(f"Unknown date of {speech_info}, skipped.")
+                continue
+            speech_infos_by_year.setdefault(date.year, []).append(speech_info)
+        return speech_infos_by_year
+
+    def listing_caught_up(self, page_infos: list[dict]) -> bool:
+        """增量更新时，列表页上的演讲是否都早于水位线或已保存
+
+        列表按日期倒序排列，此时之后的页面都是旧演讲，翻页可以提前结束.
+        完整抓取（未读取水位线）时始终为False.
+        """
+        if self.watermark is None or self.watermark.empty or not page_infos:
+            return False
+        return all(self.watermark.is_stored(speech_info) for speech_info in page_infos)
+
+    @staticmethod
+    def merge_speech_infos(stored: dict, fresh: dict) -> dict:
+        """合并已保存的和新刷新的演讲信息，同一篇演讲以新刷新的为准
+
+        年份统一为字符串，与从JSON读取的保持一致.
+        """
+        merged = {}
+        for speech_infos_by_year in (fresh, stored):
+            for year, single_year_infos in speech_infos_by_year.items():
+                year_infos = merged.setdefault(str(year), {})
+                for speech_info in single_year_infos:
+                    key = speech_url(speech_info) or (
+                        speech_info.get("date"),
+                        speech_info.get("title"),
+                    )
+                    year_infos.setdefault(key, speech_info)
+        return {year: list(infos.values()) for year, infos in merged.items()}
+
+    def update(self):
+        """增量更新：只刷新列表页，抓取晚于水位线或尚未保存正文的演讲
+
+        Returns:
+            dict: 本次抓取的演讲，按年份组织
+        """
+        infos_path = self.SAVE_PATH + f"{self.__fed_name__}_speech_infos.json"
+        watermark = self.load_watermark()
+        stored = json_load(infos_path) or {}
+        try:
+            latest_listed = self.latest_listed_date()
+        except Exception as e:
+            logger.warning(f"Get latest listed date failed. {repr(e)}")
+            latest_listed = None
+        if (
+            stored
+            and isinstance(latest_listed, datetime)
+            and watermark.latest_date is not None
+            and latest_listed <= watermark.latest_date
+        ):
+            print(
+                f"No {self.__fed_name__} speeches newer than "
+                f"{watermark.latest_date:%Y-%m-%d}, skip refreshing listing."
+            )
+            speech_infos = stored
+        else:
+            speech_infos = self.merge_speech_infos(stored, self.extract_speech_infos())
+            if self.save:
+                json_dump(speech_infos, infos_path)
+
+        new_infos = {}
+        for year, single_year_infos in speech_infos.items():
+            single_year_new = [
+                speech_info for speech_info in single_year_infos if watermark.is_new(speech_info)
+            ]
+            if single_year_new:
+                new_infos[year] = single_year_new
+        count = sum(len(v) for v in new_infos.values())
+        print(f"{count} new or missing {self.__fed_name__} speeches to fetch.")
+        if not new_infos:
+            return {}
+        speeches = self.extract_speeches(new_infos)
+        self.save_watermark(speeches)
+        return speeches
+
+    def prefetch_pages(self, speech_infos: list[dict], start_date=None):
+        """并发预取一批演讲的详情页，之后fetch_page直接使用预取结果
+
+        Args:
+            speech_infos (list[dict]): extract_speech_infos产出的演讲信息
+            start_date (datetime, optional): 早于该日期的演讲不预取. Defaults to None.
+        """
+        use_crawler = self.FETCH_BACKEND == "requests" and self.MAX_IN_FLIGHT > 1
+        if self.reparse_mode or not use_crawler and self.DRIVER_POOL_SIZE <= 0:
+            return
+        urls = []
+        for speech_info in speech_infos:
+            url = speech_info.get("href") or speech_info.get("url")
+            if not url or not url.startswith("http"):
+                continue
+            if start_date is not None and speech_info.get("date"):
+                speech_date = parse_datestring(speech_info["date"])
+                if isinstance(speech_date, datetime) and speech_date <= start_date:
+                    continue
+            # 继续中断的轮次时，已完成的演讲无需再抓取
+            if self.job_finished(url):
+                continue
+            urls.append(url)
+        # 只保留本批次的预取结果，避免占用过多内存
+        self._prefetched = {}
+        if use_crawler:
+            pages = AsyncCrawler(self.MAX_IN_FLIGHT, cache=self.fetcher.cache).crawl(urls)
+            self._prefetched = {url: html for url, html in pages.items() if html}
+            for url, html in self._prefetched.items():
+                self.archive_page(url, html)
+        # 静态HTML中缺少正文的页面交给浏览器池并发渲染
+        if self.DRIVER_POOL_SIZE > 0 and self.CONTENT_SELECTOR:
+            pending = [
+                url
+                for url in urls
+                if url not in self._prefetched
+                or parse_html(self._prefetched[url]).select_one(
+                    self.CONTENT_SELECTOR
+                )
+                is None
+            ]
+            if pending:
+                pool = self.get_driver_pool()
+                rendered = pool.map(self._render_page, pending)
+                self._prefetched.update(
+                    {url: html for url, html in zip(pending, rendered) if html}
+                )
+
+    def get_driver_pool(self) -> DriverPool:
+        """按需创建浏览器池"""
+        if self.driver_pool is None:
+            self.driver_pool = DriverPool(
+                self.DRIVER_POOL_SIZE,
+                options_factory=self.build_options,
+                blocked_resources=self.BLOCKED_RESOURCES,
+            )
+        return self.driver_pool
+
+    def _render_page(
+        self, driver, url: str, timeout: float = 10, selector: str = None
+    ) -> str:
+        """用浏览器池中的driver渲染页面，返回page_source
+
+        selector默认为CONTENT_SELECTOR，此时渲染的是详情页并存入存档.
+        """
+        try:
+            self.navigate(url, driver)
+            self.wait_for_element(
+                (By.CSS_SELECTOR, selector or self.CONTENT_SELECTOR),
+                timeout=timeout,
+                driver=driver,
+            )
+            html = driver.page_source
+            if selector is None:
+                self.archive_page(url, html)
+            self.record_traffic(driver)
+            return html
+        except Exception as e:
+            logger.warning(f"Render {url} in driver pool failed. {repr(e)}")
+            return ""
+
+    def wait_for(
+        self,
+        name: str,
+        condition,
+        timeout: float = 10,
+        driver=None,
+        raise_on_timeout: bool = True,
+        poll_frequency: float = 0.1,
+    ):
+        """等待条件满足，并记录实际等待时间
+
+        Args:
+            name (str): 等待的名称，用于统计
+            condition (callable): 接收driver的条件函数，返回真值时结束等待
+            timeout (float, optional): 超时时间(秒). Defaults to 10.
+            driver (WebDriver, optional): 默认为self.driver. Defaults to None.
+            raise_on_timeout (bool, optional): 超时是否抛出TimeoutException. Defaults to True.
+            poll_frequency (float, optional): 轮询间隔(秒). Defaults to 0.1.
+
+        Returns:
+            _type_: condition的返回值，超时且不抛出时返回None
+        """
+        driver = self.driver if driver is None else driver
+        start = time.perf_counter()
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(
+                condition
+            )
+        except TimeoutException:
+            logger.warning(f"Wait `{name}` timed out after {timeout}s.")
+            if raise_on_timeout:
+                raise
+            return None
+        finally:
+            elapsed = time.perf_counter() - start
+            self.wait_stats.setdefault(name, []).append(elapsed)
+            logger.debug(f"Wait `{name}` took {elapsed:.3f}s.")
+
+    def wait_for_element(
+        self,
+        locator: tuple,
+        timeout: float = 10,
+        visible: bool = False,
+        driver=None,
+        raise_on_timeout: bool = True,
+    ):
+        """等待元素出现（或可见）"""
+        if visible:
+            condition = EC.visibility_of_element_located(locator)
+        else:
+            condition = EC.presence_of_element_located(locator)
+        return self.wait_for(
+            "element",
+            condition,
+            timeout=timeout,
+            driver=driver,
+            raise_on_timeout=raise_on_timeout,
+        )
+
+    def wait_for_dom_stable(
+        self, stable_ms: int = 500, timeout: float = 10, selector: str = None, driver=None
+    ):
+        """等待DOM（或selector对应的子树）在stable_ms毫秒内不再变化"""
+        script = (
+            "var el = document.querySelector(arguments[0]);"
+            "return el ? el.innerHTML.length : -1;"
+            if selector
+            else "return document.documentElement.innerHTML.length;"
+        )
+        state = {"size": None, "since": time.perf_counter()}
+
+        def dom_stable(driver):
+            size = driver.execute_script(script, selector)
+            now = time.perf_counter()
+            if size != state["size"]:
+                state["size"], state["since"] = size, now
+                return False
+            return size != -1 and (now - state["since"]) * 1000 >= stable_ms
+
+        return self.wait_for(
+            "dom_stable", dom_stable, timeout=timeout, driver=driver, raise_on_timeout=False
+        )
+
+    def wait_for_network_idle(self, idle_ms: int = 500, timeout: float = 10, driver=None):
+        """等待页面加载完成，且idle_ms毫秒内没有新的资源请求"""
+        script = (
+            "return [document.readyState,"
+            " performance.getEntriesByType('resource').length];"
+        )
+        state = {"count": None, "since": time.perf_counter()}
+
+        def network_idle(driver):
+            ready_state, count = driver.execute_script(script)
+            now = time.perf_counter()
+            if ready_state != "complete" or count != state["count"]:
+                state["count"], state["since"] = count, now
+                return False
+            return (now - state["since"]) * 1000 >= idle_ms
+
+        return self.wait_for(
+            "network_idle", network_idle, timeout=timeout, driver=driver, raise_on_timeout=False
+        )
+
+    def wait_for_page_change(
+        self,
+        old_elements: list,
+        stable_ms: int = 300,
+        timeout: float = 10,
+        selector: str = None,
+        driver=None,
+    ):
+        """点击翻页/筛选后，等待旧的结果元素失效且新内容稳定
+
+        Args:
+            old_elements (list[WebElement]): 点击前的结果元素，通常取第一个即可
+            stable_ms (int, optional): DOM稳定时长(毫秒). Defaults to 300.
+            timeout (float, optional): 超时时间(秒). Defaults to 10.
+            selector (str, optional): 只观察该子树的变化. Defaults to None.
+            driver (WebDriver, optional): 默认为self.driver. Defaults to None.
+        """
+        if old_elements:
+            self.wait_for(
+                "staleness",
+                EC.staleness_of(old_elements[0]),
+                timeout=timeout,
+                driver=driver,
+                raise_on_timeout=False,
+            )
+        self.wait_for_dom_stable(
+            stable_ms=stable_ms, timeout=timeout, selector=selector, driver=driver
+        )
+
+    def wait_summary(self) -> dict:
+        """各类等待的次数、总耗时、平均耗时与最大耗时"""
+        return {
+            name: {
+                "count": len(elapsed),
+                "total": round(sum(elapsed), 3),
+                "mean": round(sum(elapsed) / len(elapsed), 3),
+                "max": round(max(elapsed), 3),
+            }
+            for name, elapsed in self.wait_stats.items()
+        }
 
     @abstractmethod
     def extract_speech_infos(self):
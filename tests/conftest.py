@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   conftest.py
+@Time    :   2024/11/25 10:12:08
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   测试共用的fixture：临时工作目录、回放服务，以及按CSS选择器生成页面和最小PDF
+"""
+
+import os
+import re
+import sys
+import tempfile
+
+import pytest
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_PATH not in sys.path:
+    sys.path.insert(0, ROOT_PATH)
+# 导入utils.logger时即创建日志文件，须在导入前指定目录，避免写入仓库根目录
+os.environ.setdefault("SCRAPER_LOG_DIR", tempfile.mkdtemp(prefix="scraper-logs-"))
+
+from utils import fetcher, job_queue, raw_archive  # noqa: E402
+from utils.http_cache import HttpCache  # noqa: E402
+from utils.job_queue import JobQueue  # noqa: E402
+from utils.raw_archive import RawArchive  # noqa: E402
+from utils.replay import FixtureRecorder, start_replay, stop_replay  # noqa: E402
+
+
+def html_for(selector: str, inner: str = "") -> str:
+    """生成能被selector选中的嵌套元素，inner放在最内层
+
+    只支持各联储选择器中用到的写法：标签、#id、.class、[属性]、:nth-child/:nth-of-type，
+    以及后代和子元素组合符.
+    """
+    html = inner
+    for compound in reversed(re.split(r"\s*>\s*|\s+", selector.strip())):
+        tag = re.match(r"[a-z][a-z0-9]*", compound)
+        tag = tag.group() if tag else "div"
+        attrs = ""
+        ids = re.findall(r"#([\w-]+)", compound)
+        if ids:
+            attrs += f' id="{ids[0]}"'
+        classes = re.findall(r"\.([\w-]+)", re.sub(r"\[.*?\]", "", compound))
+        if classes:
+            attrs += ' class="{}"'.format(" ".join(classes))
+        for name, value in re.findall(r"\[([\w-]+)(?:[*^$~]?=['\"]?([^'\"\]]*)['\"]?)?\]", compound):
+            attrs += f' {name}="{value}"'
+        element = f"<{tag}{attrs}>{html}</{tag}>"
+        nth = re.search(r":nth-(?:child|of-type)\((\d+)\)", compound)
+        if nth:
+            element = f"<{tag}></{tag}>" * (int(nth.group(1)) - 1) + element
+        html = element
+    return html
+
+
+def page(*parts: str) -> str:
+    """拼成完整的HTML文档"""
+    body = "".join(parts)
+    if not body.startswith("<body"):
+        body = f"<body>{body}</body>"
+    return f"<html><head><title>fixture</title></head>{body}</html>"
+
+
+def make_pdf(text: str) -> bytes:
+    """生成只有一页文字的最小PDF"""
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R "
+        b"/Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    body = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, 1):
+        offsets.append(len(body))
+        body += b"%d 0 obj\n" % number + obj + b"\nendobj\n"
+    xref = len(body)
+    body += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        body += b"%010d 00000 n \n" % offset
+    body += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return body
+
+
+class Replay(object):
+    """先record原网址的响应，再start启动回放服务，之后创建的爬虫都访问本地服务"""
+
+    def __init__(self, bundle_dir: str):
+        self.recorder = FixtureRecorder(bundle_dir)
+        self.server = None
+
+    def record(self, url: str, body, content_type: str = "text/html"):
+        self.recorder.record(url, body, content_type)
+
+    def start(self):
+        self.recorder.save()
+        self.server = start_replay(self.recorder.bundle_dir)
+        return self.server
+
+
+@pytest.fixture(autouse=True)
+def isolated_singletons(tmp_path, monkeypatch):
+    """共用的缓存、抓取器、原始页面归档和任务表都放到tmp_path下，不读写仓库中的data目录"""
+    cache = HttpCache(str(tmp_path / "http_cache"))
+    monkeypatch.setattr(fetcher, "_default_cache", cache)
+    monkeypatch.setattr(fetcher, "_default_fetcher", fetcher.HttpFetcher(cache=cache))
+    monkeypatch.setattr(raw_archive, "_default_archive", RawArchive(str(tmp_path / "raw")))
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    monkeypatch.setattr(job_queue, "_default_queue", queue)
+    yield
+    queue.close()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """在tmp_path下两层的目录中运行，各联储 ../../data/ 开头的SAVE_PATH落在tmp_path中"""
+    cwd = tmp_path / "data_scraper" / "scrapers"
+    cwd.mkdir(parents=True)
+    monkeypatch.chdir(cwd)
+    return tmp_path
+
+
+@pytest.fixture
+def replay(workdir):
+    replay = Replay(str(workdir / "fixtures"))
+    yield replay
+    stop_replay()
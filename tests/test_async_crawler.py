@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   test_async_crawler.py
+@Time    :   2024/11/26 11:02:35
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   同步接口在已运行的事件循环中（如Jupyter）也可调用
+"""
+
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.async_crawler import AsyncCrawler
+from utils.rate_limiter import get_rate_limiter
+
+
+@pytest.fixture
+def base_url():
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = f"<html><body>{self.path}</body></html>".encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = "http://{}:{}".format(*httpd.server_address[:2])
+    get_rate_limiter().configure(url, None)
+    yield url
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_crawl_inside_running_loop(base_url):
+    urls = [f"{base_url}/speeches/{i}" for i in range(3)]
+
+    async def notebook_cell():
+        # 事件循环中调用同步接口，以及直接await异步接口
+        return AsyncCrawler(2).crawl(urls), await AsyncCrawler(2).crawl_async(urls)
+
+    pages, awaited = asyncio.run(notebook_cell())
+    assert pages == awaited
+    assert [pages[url] for url in urls] == [
+        f"<html><body>/speeches/{i}</body></html>" for i in range(3)
+    ]
+
+
+def test_crawl_without_loop(base_url):
+    crawler = AsyncCrawler(2)
+    pages = crawler.crawl([f"{base_url}/a", f"{base_url}/a", ""])
+    assert list(pages) == [f"{base_url}/a"]
+    assert crawler.stats["pages"] == 1
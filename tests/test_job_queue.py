@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   test_job_queue.py
+@Time    :   2024/11/25 14:05:52
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   任务表在进程中断后继续同一轮抓取
+"""
+
+from data_scraper.scrapers.scraper import SpeechScraper
+from utils.job_queue import DONE, FAILED, PENDING, JobQueue
+
+
+class CountingScraper(SpeechScraper):
+    """记录实际抓取了哪些网址的爬虫"""
+
+    URL = "https://www.example.org/speeches"
+    __fed_name__ = "example"
+    ARCHIVE_RAW = False
+    USE_JOB_QUEUE = False
+
+    def __init__(self, jobs: JobQueue):
+        super().__init__()
+        self.jobs = jobs
+        self.fetched = []
+
+    def extract_single_speech(self, speech_info: dict):
+        self.fetched.append(speech_info["href"])
+        return dict(speech_info, content=f"content of {speech_info['href']}")
+
+
+def test_resume_unfinished_run(tmp_path):
+    db_path = str(tmp_path / "jobs.sqlite")
+    queue = JobQueue(db_path)
+    run_id = queue.start_run("example")
+    assert queue.claim(run_id, "example", "a")
+    queue.complete(run_id, "a", {"content": "A"})
+    # 抓取b时进程退出，b停留在running状态
+    assert queue.claim(run_id, "example", "b")
+    queue.close()
+
+    queue = JobQueue(db_path)
+    assert queue.start_run("example") == run_id
+    assert not queue.claim(run_id, "example", "a")
+    assert queue.get(run_id, "a")["result"] == {"content": "A"}
+    assert queue.get(run_id, "b")["state"] == PENDING
+    assert queue.claim(run_id, "example", "b")
+    assert queue.get(run_id, "b")["attempts"] == 2
+
+    queue.finish_run(run_id)
+    assert queue.start_run("example") != run_id
+    queue.close()
+
+
+def test_fail_requeues_until_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    run_id = queue.start_run("example")
+    for attempt in range(1, 3):
+        assert queue.claim(run_id, "example", "a")
+        queue.fail(run_id, "a", {"content": ""}, "TimeoutException", max_attempts=2)
+        assert queue.get(run_id, "a")["attempts"] == attempt
+    job = queue.get(run_id, "a")
+    assert job["state"] == FAILED
+    assert job["last_error"] == "TimeoutException"
+    assert not queue.claim(run_id, "example", "a")
+    assert queue.counts(run_id) == {FAILED: 1}
+    queue.close()
+
+
+def test_run_job_skips_finished_speeches_after_restart(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    db_path = str(tmp_path / "jobs.sqlite")
+    speech_info = {"href": "https://www.example.org/speeches/a", "title": "A"}
+
+    scraper = CountingScraper(JobQueue(db_path))
+    first = scraper.run_job(dict(speech_info))
+    assert scraper.fetched == [speech_info["href"]]
+    # 未调用finish_run即退出，下次启动继续这一轮
+    scraper.jobs.close()
+
+    scraper = CountingScraper(JobQueue(db_path))
+    assert scraper.run_job(dict(speech_info)) == first
+    assert scraper.fetched == []
+    assert scraper.jobs.get(scraper.run_id, speech_info["href"])["state"] == DONE
+    scraper.jobs.close()
+
+
+def test_run_job_in_progress_elsewhere(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    queue = JobQueue(str(tmp_path / "jobs.sqlite"))
+    scraper = CountingScraper(queue)
+    scraper.run_id = queue.start_run("example")
+    speech_info = {"href": "https://www.example.org/speeches/b", "title": "B"}
+    # 另一个进程已领取该任务但尚未写入结果
+    assert queue.claim(scraper.run_id, "example", speech_info["href"])
+
+    speech = scraper.run_job(dict(speech_info))
+    assert speech == dict(speech_info, content="", error="InProgress")
+    assert scraper.fetched == []
+    queue.close()
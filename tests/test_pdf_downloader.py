@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   test_pdf_downloader.py
+@Time    :   2024/11/25 15:38:09
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   PDF下载中断后按Range续传、校验及文件命名
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from conftest import make_pdf
+
+from utils import retry
+from utils.fetcher import HttpFetcher
+from utils.pdf_downloader import PdfDownloader, PdfDownloadError, file_sha256, pdf_filename
+from utils.rate_limiter import get_rate_limiter
+
+BODY = make_pdf("Range resume " * 40)
+
+
+class PdfServer(object):
+    """本地PDF服务，可在第一次响应发送一半时断开连接，也可不支持Range"""
+
+    def __init__(self, body: bytes = BODY, support_range: bool = True, cut_first: bool = True):
+        self.body = body
+        self.support_range = support_range
+        self.cut_first = cut_first
+        self.ranges = []
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.url = "http://{}:{}/docs/speech.pdf".format(*self.httpd.server_address[:2])
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        get_rate_limiter().configure(self.url, None)
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = server.body
+                range_header = self.headers.get("Range")
+                server.ranges.append(range_header)
+                start = 0
+                if range_header and server.support_range:
+                    start = int(range_header[len("bytes=") :].rstrip("-"))
+                    self.send_response(206)
+                    self.send_header(
+                        "Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}"
+                    )
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Type", "application/pdf")
+                self.send_header("Content-Length", str(len(body) - start))
+                self.end_headers()
+                if server.cut_first:
+                    # 只发送一半即断开
+                    server.cut_first = False
+                    self.wfile.write(body[start : start + (len(body) - start) // 2])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body[start:])
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def downloader(tmp_path, monkeypatch):
+    monkeypatch.setattr(retry, "backoff_delay", lambda attempt, base=1.0, cap=30.0: 0)
+    return PdfDownloader(str(tmp_path), chunk_size=64, fetcher=HttpFetcher(retries=2))
+
+
+def test_resume_with_range(downloader):
+    server = PdfServer()
+    try:
+        filepath = downloader.download(server.url)
+    finally:
+        server.stop()
+    assert server.ranges[0] is None
+    # 从.part中已写入的整块之后续传
+    offset = int(server.ranges[1][len("bytes=") : -1])
+    assert 0 < offset <= len(BODY) // 2
+    with open(filepath, "rb") as f:
+        assert f.read() == BODY
+    with open(filepath + ".sha256", "r", encoding="utf-8") as f:
+        assert f.read() == file_sha256(filepath)
+    assert downloader.stats["resumed"] == 1
+    assert downloader.stats["downloaded"] == 1
+
+
+def test_restart_without_range_support(downloader):
+    server = PdfServer(support_range=False)
+    try:
+        filepath = downloader.download(server.url)
+        # 已下载且摘要一致时不再请求
+        assert downloader.download(server.url) == filepath
+    finally:
+        server.stop()
+    assert len(server.ranges) == 2
+    with open(filepath, "rb") as f:
+        assert f.read() == BODY
+    assert downloader.stats["resumed"] == 0
+    assert downloader.stats["skipped"] == 1
+
+
+def test_rejects_non_pdf_and_wrong_digest(downloader):
+    server = PdfServer(body=b"<html>not found</html>", cut_first=False)
+    try:
+        with pytest.raises(PdfDownloadError):
+            downloader.download(server.url)
+        server.body = BODY
+        with pytest.raises(PdfDownloadError):
+            downloader.download(server.url, sha256="0" * 64)
+    finally:
+        server.stop()
+    assert not downloader.is_downloaded(downloader.path(server.url))
+
+
+def test_pdf_filename_distinguishes_urls():
+    first = pdf_filename("https://www.example.org/2023/speech.pdf")
+    second = pdf_filename("https://www.example.org/2024/speech.pdf")
+    assert first != second
+    assert first.startswith("speech-") and first.endswith(".pdf")
+    assert pdf_filename("https://www.example.org/docs/remarks").endswith(".pdf")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   test_recording.py
+@Time    :   2024/11/26 09:41:27
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   经爬虫实际的请求路径录制页面，再回放得到相同的结果
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from conftest import html_for, page
+
+from data_scraper.scrapers.richmond import RichmondSpeechScraper
+from data_scraper.scrapers.san_francisco import SanFranciscoSpeechScraper
+from utils.replay import start_recording, start_replay, stop_recording, stop_replay
+
+ARCHIVE = page(
+    html_for(
+        RichmondSpeechScraper.ARCHIVE_SELECTOR,
+        '<li><a href="#2024">2024</a><div class="content"><div class="data__row">'
+        '<section class="data__group">'
+        '<div class="data__title"><a href="/press_room/speeches/2024/outlook">Outlook</a></div>'
+        '<div class="data__authors"><p>Tom Barkin</p></div></section>'
+        '<section><div class="data__pub-container"><span class="data__date">May 1, 2024</span></div>'
+        '<div class="data__summary"><p>Summary.</p></div></section>'
+        "</div></div></li>",
+    )
+)
+SPEECH = page(
+    '<div id="pi_center_column"><div class="tmplt speech"><h2>Outlook</h2>'
+    '<div class="component comp-highlights"><ul><li>Point.</li></ul></div>'
+    '<div class="tmplt__content"><p>Thanks.</p></div></div></div>'
+)
+
+
+class OriginServer(object):
+    """模拟联储网站的本地服务"""
+
+    def __init__(self, pages: dict, api=None):
+        self.pages = pages
+        # 接收(路径, 请求JSON)，返回响应JSON
+        self.api = api
+        self.requests = []
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.base_url = "http://{}:{}".format(*self.httpd.server_address[:2])
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests.append(self.path)
+                body = server.pages.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                body = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length))
+                server.requests.append(self.path)
+                body = json.dumps(server.api(self.path, payload)).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def scrape(url: str) -> tuple:
+    scraper = RichmondSpeechScraper(url, auto_save=False)
+    speech_infos = scraper.extract_speech_infos()["2024"]
+    return speech_infos, scraper.extract_single_speech(speech_infos[0])
+
+
+def test_record_then_replay(workdir):
+    origin = OriginServer(
+        {
+            "/press_room/speeches" + RichmondSpeechScraper.ARCHIVE_QUERY: ARCHIVE,
+            "/press_room/speeches/2024/outlook": SPEECH,
+        }
+    )
+    url = origin.base_url + "/press_room/speeches"
+    bundle_dir = str(workdir / "fixtures")
+    try:
+        start_recording(bundle_dir)
+        # 归档页经fetcher.fetch请求，详情页经fetch_text请求
+        recorded_infos, recorded_speech = scrape(url)
+    finally:
+        stop_recording()
+        origin.stop()
+    assert len(origin.requests) == 2
+    assert recorded_speech["content"] == "Thanks."
+
+    server = start_replay(bundle_dir)
+    try:
+        replayed_infos, replayed_speech = scrape(url)
+    finally:
+        stop_replay()
+    assert server.stats["missed"] == 0
+    assert server.stats["served"] == 2
+    # 回放时链接指向回放服务，其余字段与录制时一致
+    assert replayed_infos[0]["href"] == server.rewrite_url(recorded_infos[0]["href"])
+    assert dict(replayed_speech, href=None) == dict(recorded_speech, href=None)
+
+
+def facetwp_item(date: str, slug: str) -> str:
+    return (
+        f'<div class="fwpl-result"><div class="fwpl-item el-julyf">{date}</div>'
+        '<span class="fwpl-term fwpl-term-mary-c-daly fwpl-tax-speech-series">Mary C. Daly’s Speeches</span>'
+        f'<a href="/news-and-media/speeches/mary-c-daly/{slug}/">{slug}</a>'
+        '<div class="fwpl-item el-6d47we wp-block-post-excerpt">San Francisco, CA</div></div>'
+    )
+
+
+def test_record_then_replay_post_api(workdir):
+    items = {1: facetwp_item("May 1, 2024", "outlook"), 2: facetwp_item("May 1, 2023", "review")}
+
+    def facetwp(path, payload):
+        assert path == SanFranciscoSpeechScraper.FACETWP_API
+        assert payload["data"]["http_params"]["uri"] == "news-and-media/speeches"
+        paged = payload["data"]["paged"]
+        return {"template": items[paged], "settings": {"pager": {"total_pages": 2}}}
+
+    origin = OriginServer(
+        {"/news-and-media/speeches/": page('<div class="facetwp-template" data-name="speeches"></div>')},
+        facetwp,
+    )
+    url = origin.base_url + "/news-and-media/speeches/"
+    bundle_dir = str(workdir / "fixtures")
+    try:
+        start_recording(bundle_dir)
+        recorded = SanFranciscoSpeechScraper(url, auto_save=False).extract_speech_infos()
+    finally:
+        stop_recording()
+        origin.stop()
+    assert sorted(recorded) == [2023, 2024]
+
+    # 两页接口请求的网址相同，按请求体区分
+    server = start_replay(bundle_dir)
+    try:
+        replayed = SanFranciscoSpeechScraper(url, auto_save=False).extract_speech_infos()
+    finally:
+        stop_replay()
+    assert server.stats["missed"] == 0
+    assert server.stats["served"] == 3
+    assert [info["title"] for infos in replayed.values() for info in infos] == ["outlook", "review"]
@@ -0,0 +1,480 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   test_replay_smoke.py
+@Time    :   2024/11/25 10:40:31
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   各联储爬虫在回放fixture上的冒烟测试，不访问网络也不启动浏览器
+
+fixture按原网址录制，链接写成站内相对链接、本站绝对链接和站外链接几种形式，
+检查解析出的链接都指向回放服务，且详情页能提取出正文.
+"""
+
+from datetime import datetime
+
+from conftest import html_for, make_pdf, page
+
+from data_scraper.scrapers.altanta import AtlantaSpeechScraper
+from data_scraper.scrapers.boston import BostonSpeechScraper
+from data_scraper.scrapers.chicago import ChicagoSpeechScraper
+from data_scraper.scrapers.cleveland import ClevelandSpeechScraper
+from data_scraper.scrapers.dallas import DallasSpeechScraper
+from data_scraper.scrapers.kansas_city import KansasCitySpeechScraper
+from data_scraper.scrapers.new_york import NewYorkSpeechScraper
+from data_scraper.scrapers.philadelphia import PhiladelphiaSpeechScraper
+from data_scraper.scrapers.richmond import RichmondSpeechScraper
+from data_scraper.scrapers.san_francisco import SanFranciscoSpeechScraper
+from utils import pdf_extractor
+from utils.html_parser import parse_html
+from utils.watermark import speech_url
+
+
+def assert_replayed(server, speech_infos: list[dict]):
+    """解析出的链接都指向回放服务"""
+    assert speech_infos
+    for speech_info in speech_infos:
+        assert speech_url(speech_info).startswith(server.base_url + "/"), speech_info
+
+
+def test_atlanta(replay):
+    url = "https://www.atlantafed.org/news/speeches/2024/05/01/bostic-outlook"
+    replay.record(
+        AtlantaSpeechScraper.URL,
+        page(
+            '<select id="YearList"><option>All</option>'
+            "<option>2024</option><option>2023</option></select>",
+            '<div class="row frba-content_router-date-linked-headline-Teaser-grouped">'
+            '<div data-bind="foreach: items">'
+            '<div class="font-weight-bold">May 1, 2024</div>'
+            '<a href="/news/speeches/2024/05/01/bostic-outlook">Economic Outlook</a>'
+            "<p>Bostic discusses the outlook.</p>"
+            "</div></div>",
+        ),
+    )
+    replay.record(
+        url,
+        page(
+            html_for(
+                AtlantaSpeechScraper.CONTENT_SELECTOR,
+                "<p><strong>Raphael Bostic\nPresident and CEO</strong></p>"
+                "<ul><li>Inflation is easing.</li></ul>"
+                "<p>Thank you for having me.</p>",
+            )
+        ),
+    )
+    server = replay.start()
+    scraper = AtlantaSpeechScraper(auto_save=False)
+
+    assert scraper.listing_years() == [2024, 2023]
+    speech_infos = scraper.parse_year_page(scraper.fetcher.fetch_text(scraper.url))
+    assert_replayed(server, speech_infos)
+    assert speech_infos[0]["href"] == server.rewrite_url(url)
+
+    speech = scraper.extract_single_speech(speech_infos[0])
+    assert speech["speaker"] == "Raphael Bostic"
+    assert speech["position"] == "President and CEO"
+    assert speech["content"] == "Thank you for having me."
+
+
+def test_atlanta_keeps_year_order(workdir, monkeypatch):
+    scraper = AtlantaSpeechScraper(auto_save=False)
+    # 不启动浏览器池，逐年依次提取
+    monkeypatch.setattr(scraper, "DRIVER_POOL_SIZE", 0)
+    monkeypatch.setattr(scraper, "listing_from_api", lambda: None)
+    monkeypatch.setattr(scraper, "listing_years", lambda: [2024, 2023, 2022])
+    monkeypatch.setattr(
+        scraper, "extract_single_year_speech_infos", lambda year, driver=None: [{"year": year}]
+    )
+    # 逐年结果按列表页的顺序合并，从新到旧
+    assert list(scraper.extract_speech_infos()) == [2024, 2023, 2022]
+
+
+def test_boston(replay):
+    url = "https://www.bostonfed.org/news-and-events/speeches/2024/outlook.aspx"
+    row = (
+        '<div class="row"><p class="date-and-location">{date} | Boston, MA</p>'
+        '<h1 class="card-title"><a href="{href}">{title}</a></h1>'
+        '<p class="event-text">Summary.</p><ul class="speaker"><li>Susan M. Collins</li></ul>'
+        "</div>"
+    )
+    replay.record(
+        BostonSpeechScraper.URL,
+        page(
+            row.format(date="May 1, 2024", href="/news-and-events/speeches/2024/outlook.aspx", title="Outlook"),
+            row.format(date="April 1, 2024", href="https://www.bostonfed.org/news-and-events/speeches/2024/april.aspx", title="April"),
+            row.format(date="March 1, 2024", href="https://www.youtube.com/watch?v=collins", title="Video"),
+        ),
+    )
+    replay.record(
+        url,
+        page(
+            '<h1 class="page-title">Outlook</h1>',
+            html_for(BostonSpeechScraper.CONTENT_SELECTOR, "<p>Good afternoon.</p>"),
+        ),
+    )
+    server = replay.start()
+    scraper = BostonSpeechScraper(auto_save=False)
+
+    soup = parse_html(scraper.fetcher.fetch_text(scraper.url))
+    speech_infos = [scraper.parse_single_row(row) for row in soup.select("div.row")]
+    speech_infos = [info for info in speech_infos if scraper.is_site_url(info["href"])]
+    # 站外的视频链接被过滤，站内相对链接和本站绝对链接都保留
+    assert [info["title"] for info in speech_infos] == ["Outlook", "April"]
+    assert_replayed(server, speech_infos)
+
+    speech = scraper.extract_single_speech(speech_infos[0])
+    assert speech["speech_title"] == "Outlook"
+    assert speech["content"] == "Good afternoon."
+
+
+def test_chicago(replay):
+    president = (
+        '<td style="width: 33% !important;"><a title="{name}" href="{href}">{name}</a>'
+        "<p>{order}</p><p>{term}</p></td>"
+    )
+    replay.record(
+        ChicagoSpeechScraper.URL,
+        page(
+            '<table class="focus-people"><tr>',
+            president.format(name="Austan D. Goolsbee", href="/people/g/goolsbee-austan", order="10th President", term="2023 – present"),
+            president.format(name="Charles L. Evans", href="/people/e/evans-charles", order="9th President", term="2007 – 2023"),
+            president.format(name="Silas Keehn", href="/people/k/keehn-silas", order="8th President", term="1981 – 1994"),
+            "</tr></table>",
+        ),
+    )
+    replay.record(
+        "https://www.chicagofed.org/people/g/goolsbee-austan",
+        page(
+            '<div class="cyan-publication">'
+            '<a href="/publications/speeches/2024/goolsbee-may">Inflation Talk</a>'
+            '<p class="cyan-publication-date">May 1, 2024</p><p>Remarks on inflation.</p></div>'
+        ),
+    )
+    replay.record(
+        "https://www.chicagofed.org/people/e/evans-charles",
+        page(
+            '<section id="speeches"><h3>2022</h3><div class="peoplePublication__container">'
+            '<div><a href="https://www.chicagofed.org/publications/speeches/2022/evans-jan">'
+            "Policy Remarks</a></div><p>Evans on policy.</p></div></section>"
+        ),
+    )
+    replay.record(
+        "https://www.chicagofed.org/publications/speeches/2024/goolsbee-may",
+        page(
+            '<div class="cfedDetail__lastUpdated">Last Updated: May 02, 2024</div>'
+            '<div class="cfedContent"><p>Thank you.</p></div>'
+        ),
+    )
+    replay.record(
+        "https://www.chicagofed.org/publications/speeches/2022/evans-jan",
+        page(
+            '<div class="cfedDetail__lastUpdated">unknown</div>'
+            '<div class="cfedContent"><p>Hello.</p></div>'
+        ),
+    )
+    server = replay.start()
+    scraper = ChicagoSpeechScraper(auto_save=False)
+
+    # 1994年之前上任的行长不抓取
+    speech_infos_by_year = scraper.extract_speech_infos()
+    assert list(speech_infos_by_year) == ["2022", "2024"]
+    goolsbee, evans = speech_infos_by_year["2024"][0], speech_infos_by_year["2022"][0]
+    assert_replayed(server, [goolsbee, evans])
+
+    speech = scraper.extract_single_speech(goolsbee)
+    assert speech["date"] == "May 02, 2024"
+    assert speech["content"] == "Thank you."
+    # 没有日期的演讲提取失败时只记录错误，不因缺少date而抛出KeyError
+    speech = scraper.extract_single_speech(evans)
+    assert speech["content"] == ""
+    assert speech["error"] == "IndexError"
+
+    # 逐篇提取前并发预取本年度的详情页
+    speeches_by_year = scraper.extract_speeches({"2024": [goolsbee]})
+    assert speeches_by_year["2024"][0]["content"] == "Thank you."
+    assert scraper.fetch_stats["prefetched"] == 1
+
+
+def test_cleveland(replay):
+    url = "https://www.clevelandfed.org/collections/speeches/2024/sp-20240501-outlook"
+    item = (
+        '<li class="result-item"><div class="date-reference">{date} | Speech</div>'
+        '<span class="author-name">Beth M. Hammack</span><a href="{href}">{title}</a>'
+        '<div class="page-description"><p>Description.</p></div></li>'
+    )
+    pagination = (
+        '<ul><li class="page-selector-item"><a>1</a></li>'
+        '<li class="page-selector-item"><a>2</a></li></ul>'
+    )
+    replay.record(
+        ClevelandSpeechScraper.URL,
+        page(
+            "<ul>",
+            item.format(date="05.01.2024", href="/collections/speeches/2024/sp-20240501-outlook", title="Outlook"),
+            "</ul>",
+            pagination,
+        ),
+    )
+    replay.record(
+        ClevelandSpeechScraper.URL + "?page=2",
+        page(
+            "<ul>",
+            item.format(date="04.01.2024", href="https://www.clevelandfed.org/collections/speeches/2024/sp-20240401", title="April"),
+            "</ul>",
+            pagination,
+        ),
+    )
+    replay.record(
+        url,
+        page(
+            html_for(
+                ClevelandSpeechScraper.CONTENT_SELECTOR,
+                "<p>Good morning.</p><h2>Outlook</h2>",
+            )
+        ),
+    )
+    server = replay.start()
+    scraper = ClevelandSpeechScraper(auto_save=False)
+
+    # 第二页按页码参数从回放服务获取
+    first_page = parse_html(scraper.fetcher.fetch_text(scraper.url))
+    speech_infos = scraper.crawl_listing_pages(
+        scraper.parse_listing_page, first_page, scraper.url
+    )
+    assert [info["date"] for info in speech_infos] == ["May 01, 2024", "April 01, 2024"]
+    assert_replayed(server, speech_infos)
+
+    speech = scraper.extract_single_speech(speech_infos[0])
+    assert speech["content"] == "Good morning.\n\nOutlook"
+
+
+def test_dallas(replay):
+    url = "https://www.dallasfed.org/news/speeches/logan/2024/lkl240501"
+    replay.record(
+        url,
+        page(
+            html_for(
+                DallasSpeechScraper.CONTENT_SELECTOR,
+                "<h3>Remarks</h3><p>Good evening.</p>",
+            )
+        ),
+    )
+    server = replay.start()
+    scraper = DallasSpeechScraper(auto_save=False)
+
+    assert scraper.is_site_url(server.rewrite_url(url))
+    assert not scraper.is_site_url("https://www.federalreserve.gov/newsevents/speech.htm")
+
+    speech = scraper.extract_single_speech(
+        {
+            "date": "May 1, 2024",
+            "title": "Remarks",
+            "href": server.rewrite_url(url),
+            "speaker": "Lorie K. Logan",
+        }
+    )
+    assert speech["content"] == "Remarks\n\nGood evening."
+
+
+def test_kansas_city(replay, workdir, monkeypatch):
+    url = "https://www.kansascityfed.org/documents/1234/2024-Schmid-Outlook.pdf"
+    replay.record(
+        KansasCitySpeechScraper.URL,
+        page(
+            '<div class="result-list"><div class="clear">'
+            '<span class="date"><time>May 1, 2024</time></span>'
+            '<a class="mnt-tag-group-staff-link" href="/people/jeffrey-schmid/">Jeffrey Schmid</a>'
+            '<h3><a href="/documents/1234/2024-Schmid-Outlook.pdf">Outlook</a></h3>'
+            "</div></div>"
+        ),
+    )
+    replay.record(url, make_pdf("Economic outlook remarks"), "application/pdf")
+    # 文本缓存写到临时目录
+    extractor = pdf_extractor.PdfTextExtractor(str(workdir / "pdf_text"), backend="pypdf2")
+    monkeypatch.setitem(pdf_extractor._extractors, "pypdf2", extractor)
+    server = replay.start()
+    scraper = KansasCitySpeechScraper(auto_save=False)
+
+    speech_infos = scraper.parse_listing_page(
+        parse_html(scraper.fetcher.fetch_text(scraper.url))
+    )
+    assert_replayed(server, speech_infos)
+    assert speech_infos[0]["speaker"] == "Jeffrey Schmid"
+
+    # 各页网址只带显式的筛选参数，多选的演讲者参数全部保留
+    next_href = scraper.absolute_url("?6-12=101&6-12=102&6-13=all&perpage=100&page=2&utm=x")
+    base_url = scraper.filtered_listing_url(next_href, scraper.LISTING_PARAMS)
+    assert base_url == scraper.url + "?6-12=101&6-12=102&6-13=all&perpage=100"
+    assert scraper.listing_page_url(base_url, 3) == base_url + "&page=3"
+    # 每页条数未生效时逐页点击
+    ten_per_page = next_href.replace("perpage=100", "perpage=10")
+    assert scraper.filtered_listing_url(ten_per_page, scraper.LISTING_PARAMS) is None
+
+    speech = scraper.extract_single_speech(speech_infos[0])
+    assert "Economic outlook remarks" in speech["content"]
+    assert scraper.pdf_downloader.stats["downloaded"] == 1
+
+
+def test_new_york(replay):
+    detail = (
+        '<div class="container_12"><div class="ts-article-title">{title}</div>'
+        '<div class="ts-contact-info"><a href="/people/{slug}">{speaker}</a>'
+        "<br/>Posted May 1, 2024</div>"
+        '<div class="ts-article-text"><p>Good morning.</p></div></div>'
+    )
+    url = "https://www.newyorkfed.org/newsevents/speeches/2024/wil240501"
+    other = "https://www.newyorkfed.org/newsevents/speeches/2024/per240501"
+    replay.record(
+        url,
+        page(
+            detail.format(
+                title="Remarks",
+                slug="williams",
+                speaker="John C. Williams, President and Chief Executive Officer",
+            )
+        ),
+    )
+    replay.record(
+        other,
+        page(
+            detail.format(
+                title="Panel",
+                slug="perli",
+                speaker="Roberto Perli, Executive Vice President",
+            )
+        ),
+    )
+    replay.record(
+        NewYorkSpeechScraper.URL,
+        page(
+            '<table class="newsTable"><tr><td>Speeches</td></tr>'
+            '<tr class="yrHead"><td>2024</td></tr>'
+            '<tr><td><div>May 1, 2024</div></td><td><a href="/newsevents/speeches/2024/wil240501">'
+            "Williams: Remarks</a></td></tr>"
+            '<tr><td><div>April 1, 2024</div></td><td><a href="/newsevents/speeches/2024/wil240401">'
+            "Williams: April</a></td></tr></table>"
+        ),
+    )
+    server = replay.start()
+    scraper = NewYorkSpeechScraper(auto_save=False)
+
+    # 增量更新按列表第一行的日期判断是否需要刷新，不需要浏览器
+    assert scraper.latest_listed_date() == datetime(2024, 5, 1)
+
+    # 纽约联储的演讲信息没有speaker，非行长的演讲提取失败时也不应抛出KeyError
+    speeches = scraper.extract_speeches(
+        {
+            "2024": [
+                {"url": server.rewrite_url(url), "date": "May 1, 2024", "title": "Remarks"},
+                {"url": server.rewrite_url(other), "date": "May 1, 2024", "title": "Panel"},
+            ]
+        }
+    )
+    williams, perli = speeches["2024"]
+    assert williams["speaker"] == "John C. Williams"
+    assert williams["content"] == "Good morning."
+    assert perli["content"] == ""
+    assert perli["error"] == "AssertionError"
+
+
+def test_philadelphia(replay):
+    url = "https://www.philadelphiafed.org/the-economy/2024-05-01-outlook"
+    replay.record(
+        PhiladelphiaSpeechScraper.URL,
+        page(
+            '<div id="content"><div class="result search-result" data-topic="Economy"><header>'
+            '<div class="result-authors"><p class="result-date">May 1, 2024</p>'
+            '<ul class="authors"><li class="author"><a href="/people/anna-paulson">Anna Paulson</a></li></ul>'
+            "</div>"
+            '<h2 class="result-title"><a href="/the-economy/2024-05-01-outlook">Outlook</a></h2>'
+            "</header></div></div>"
+        ),
+    )
+    replay.record(
+        url,
+        page(
+            '<div id="content"><div class="author-desc"><p class="author-title">President and CEO</p></div>'
+            '<div class="article-body"><p>Thank you.</p></div></div>'
+        ),
+    )
+    server = replay.start()
+    scraper = PhiladelphiaSpeechScraper(auto_save=False)
+
+    assert scraper.latest_listed_date() == datetime(2024, 5, 1)
+
+    speech_infos = scraper.parse_listing_page(
+        parse_html(scraper.fetcher.fetch_text(scraper.url))
+    )
+    assert_replayed(server, speech_infos)
+
+    speech = scraper.extract_single_speech(speech_infos[0])
+    assert speech["position"] == "President and CEO"
+    assert speech["content"] == "Thank you."
+
+
+def test_richmond(replay):
+    url = "https://www.richmondfed.org/press_room/speeches/thomas_i_barkin/2024/barkin_speech_20240501"
+    replay.record(
+        RichmondSpeechScraper.URL + RichmondSpeechScraper.ARCHIVE_QUERY,
+        page(
+            html_for(
+                RichmondSpeechScraper.ARCHIVE_SELECTOR,
+                '<li><a href="#2024">2024</a><div class="content"><div class="data__row">'
+                '<section class="data__group">'
+                '<div class="data__title"><a href="/press_room/speeches/thomas_i_barkin/2024/barkin_speech_20240501">Outlook</a></div>'
+                '<div class="data__authors"><p>Tom Barkin</p></div></section>'
+                '<section><div class="data__pub-container"><span class="data__date">May 1, 2024</span></div>'
+                '<div class="data__summary"><p>Summary.</p></div></section>'
+                "</div></div></li>",
+            )
+        ),
+    )
+    replay.record(
+        url,
+        page(
+            '<div id="pi_center_column"><div class="tmplt speech"><h2>Outlook</h2>'
+            '<div class="component comp-highlights"><ul><li>Point.</li></ul></div>'
+            '<div class="tmplt__content"><p>Thanks.</p></div></div></div>'
+        ),
+    )
+    server = replay.start()
+    scraper = RichmondSpeechScraper(auto_save=False)
+
+    # 归档页的全部年份都在静态HTML中，不需要浏览器展开
+    speech_infos_by_year = scraper.extract_speech_infos()
+    assert list(speech_infos_by_year) == ["2024"]
+    assert_replayed(server, speech_infos_by_year["2024"])
+
+    speech = scraper.extract_single_speech(speech_infos_by_year["2024"][0])
+    assert speech["speech_title"] == "Outlook"
+    assert speech["highlights"] == "Point."
+    assert speech["content"] == "Thanks."
+
+
+def test_san_francisco(replay):
+    url = "https://www.frbsf.org/news-and-media/speeches/mary-c-daly/2024/05/outlook/"
+    replay.record(
+        SanFranciscoSpeechScraper.URL,
+        page(
+            '<div class="fwpl-result"><div class="fwpl-item el-julyf">May 1, 2024</div>'
+            '<span class="fwpl-term fwpl-term-mary-c-daly fwpl-tax-speech-series">Mary C. Daly’s Speeches</span>'
+            '<a href="/news-and-media/speeches/mary-c-daly/2024/05/outlook/">Outlook</a>'
+            '<div class="fwpl-item el-6d47we wp-block-post-excerpt">San Francisco, CA</div></div>'
+        ),
+    )
+    replay.record(
+        url,
+        page(html_for(SanFranciscoSpeechScraper.CONTENT_SELECTOR, "<p>Thank you.</p>")),
+    )
+    server = replay.start()
+    scraper = SanFranciscoSpeechScraper(auto_save=False)
+
+    speech_infos = scraper.parse_listing_page(
+        parse_html(scraper.fetcher.fetch_text(scraper.url))
+    )
+    assert_replayed(server, speech_infos)
+    assert speech_infos[0]["speaker"] == "Mary C. Daly"
+
+    speech = scraper.extract_single_speech(speech_infos[0])
+    assert speech["content"] == "Thank you."
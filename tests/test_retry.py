@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   test_retry.py
+@Time    :   2024/11/25 15:01:44
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   临时性错误的判断、重试以及熔断器的半开状态
+"""
+
+import time
+
+import pytest
+import requests
+from selenium.common.exceptions import (
+    InvalidSessionIdException,
+    NoSuchDriverException,
+    NoSuchElementException,
+    TimeoutException,
+    WebDriverException,
+)
+
+from utils import retry
+from utils.retry import CircuitBreaker, is_transient, retry_call
+
+URL = "https://www.example.org/speeches"
+
+
+def http_error(status: int) -> requests.HTTPError:
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(response=response)
+
+
+@pytest.mark.parametrize(
+    "exc, transient",
+    [
+        (http_error(503), True),
+        (http_error(429), True),
+        (http_error(404), False),
+        (requests.ConnectionError(), True),
+        (requests.exceptions.ChunkedEncodingError(), True),
+        (TimeoutException(), True),
+        (InvalidSessionIdException(), True),
+        (WebDriverException("chrome not reachable"), True),
+        (NoSuchElementException(), False),
+        (NoSuchDriverException("Unable to obtain driver"), False),
+        (ValueError(), False),
+    ],
+)
+def test_is_transient(exc, transient):
+    assert is_transient(exc) is transient
+
+
+def test_breaker_half_open():
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=0.05)
+    for _ in range(3):
+        breaker.record_failure(URL)
+    assert breaker.stats["www.example.org"]["trips"] == 1
+    assert breaker.wait(URL) > 0
+
+    # 暂停结束后试探失败一次即重新暂停
+    breaker.record_failure(URL)
+    assert breaker.stats["www.example.org"]["trips"] == 2
+    assert breaker.wait(URL) > 0
+
+    # 试探成功后恢复，需重新累计failure_threshold次才暂停
+    breaker.record_success(URL)
+    breaker.record_failure(URL)
+    assert breaker.stats["www.example.org"]["trips"] == 2
+    assert breaker.wait(URL) == 0
+
+
+def test_breaker_ignores_failures_while_open():
+    breaker = CircuitBreaker(failure_threshold=2, cooldown=60)
+    for _ in range(2):
+        breaker.record_failure(URL)
+    # 暂停前已发出的请求陆续失败，不重复熔断
+    breaker.record_failure(URL)
+    assert breaker.stats["www.example.org"]["trips"] == 1
+
+
+def test_retry_call(monkeypatch):
+    monkeypatch.setattr(retry, "backoff_delay", lambda attempt, base=1.0, cap=30.0: 0)
+    breaker = CircuitBreaker(failure_threshold=10)
+    calls = []
+
+    def flaky():
+        calls.append(time.monotonic())
+        if len(calls) < 3:
+            raise requests.ConnectionError()
+        return "ok"
+
+    assert retry_call(flaky, URL, retries=3, breaker=breaker) == "ok"
+    assert len(calls) == 3
+
+    def broken():
+        calls.append(time.monotonic())
+        raise NoSuchElementException()
+
+    calls.clear()
+    with pytest.raises(NoSuchElementException):
+        retry_call(broken, URL, retries=3, breaker=breaker)
+    assert len(calls) == 1
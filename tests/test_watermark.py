@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   test_watermark.py
+@Time    :   2024/11/25 14:32:17
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   水位线的增量判断及反复失败网址的放弃
+"""
+
+from datetime import datetime
+
+from utils.file_saver import json_dump
+from utils.watermark import Watermark
+
+
+def speech(url: str, date: str = "May 1, 2024", content: str = "text") -> dict:
+    return {"href": url, "date": date, "title": url, "content": content}
+
+
+def test_add_and_is_new(tmp_path):
+    watermark = Watermark(str(tmp_path / "watermark.json"))
+    assert watermark.empty
+    watermark.add({"2024": [speech("a", "May 1, 2024"), speech("b", "April 1, 2024")]})
+
+    assert watermark.latest_date == datetime(2024, 5, 1)
+    assert not watermark.is_new({"href": "a"})
+    assert watermark.is_new({"href": "c"})
+    # 没有网址时按日期判断
+    assert watermark.is_new({"date": "June 1, 2024"})
+    assert not watermark.is_new({"date": "March 1, 2024"})
+    assert watermark.is_stored({"href": "c", "date": "March 1, 2024"})
+
+
+def test_failed_url_is_abandoned_after_max_runs(tmp_path):
+    filepath = str(tmp_path / "watermark.json")
+    watermark = Watermark(filepath, max_failed_runs=2)
+    failed = speech("a", content="")
+    # 同一轮中重复出现只计一次失败
+    watermark.add([failed, failed])
+    assert watermark.failed_urls == {"a": 1}
+    assert watermark.is_new(failed)
+    watermark.save()
+
+    watermark = Watermark.load(filepath, max_failed_runs=2)
+    assert watermark.failed_urls == {"a": 1}
+    watermark.add([failed])
+    assert watermark.is_abandoned("a")
+    assert not watermark.is_new(failed)
+    assert watermark.is_stored(failed)
+    # 失败的演讲不推进水位线
+    assert watermark.latest_date is None
+
+
+def test_success_clears_failures(tmp_path):
+    watermark = Watermark(str(tmp_path / "watermark.json"))
+    watermark.add([speech("a", content="")])
+    watermark.add([speech("a")])
+    assert watermark.failed_urls == {}
+    assert "a" in watermark.seen_urls
+    # 已成功抓取的网址之后正文为空也不计失败
+    watermark.add([speech("a", content="")])
+    assert watermark.failed_urls == {}
+
+
+def test_load_rebuilds_from_saved_speeches(tmp_path):
+    speeches_path = str(tmp_path / "speeches.json")
+    json_dump({"2024": [speech("a"), speech("b", content="")]}, speeches_path)
+
+    watermark = Watermark.load(str(tmp_path / "watermark.json"), speeches_path)
+    assert watermark.seen_urls == {"a"}
+    assert watermark.failed_urls == {"b": 1}
+    assert watermark.latest_date == datetime(2024, 5, 1)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   async_crawler.py
+@Time    :   2024/11/05 14:36:02
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   基于asyncio的详情页并发抓取，按host限制并发数
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+from utils.fetcher import DEFAULT_HEADERS, decode_body
+from utils.http_cache import HttpCache
+from utils.logger import logger
+from utils.rate_limiter import get_rate_limiter
+from utils.retry import retry_async
+from utils.replay import get_recorder
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+
+class AsyncCrawler(object):
+    """并发抓取一组网址的HTML，同一host同时在途的请求数不超过per_host_limit"""
+
+    def __init__(
+        self,
+        per_host_limit: int = 8,
+        timeout: float = 15.0,
+        headers: dict = None,
+        cache: HttpCache = None,
+        retries: int = 3,
+    ):
+        if aiohttp is None and httpx is None:
+            raise ImportError("AsyncCrawler requires `aiohttp` or `httpx`.")
+        self.per_host_limit = max(1, per_host_limit)
+        self.cache = cache
+        self.retries = retries
+        self.rate_limiter = get_rate_limiter()
+        self.timeout = timeout
+        self.headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        self.stats = {"pages": 0, "failed": 0, "seconds": 0.0, "pages_per_sec": 0.0}
+        self._semaphores = {}
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.per_host_limit)
+        return self._semaphores[host]
+
+    async def _fetch_aiohttp(self, session, url: str, headers: dict) -> tuple:
+        async with session.get(url, headers=headers) as response:
+            if response.status == 304:
+                return 304, None, None, None
+            response.raise_for_status()
+            body = await response.read()
+            return 200, body, response.headers, response.get_encoding()
+
+    async def _fetch_httpx(self, client, url: str, headers: dict) -> tuple:
+        response = await client.get(url, headers=headers)
+        if response.status_code == 304:
+            return 304, None, None, None
+        response.raise_for_status()
+        return 200, response.content, response.headers, response.encoding
+
+    async def _fetch(self, client, url: str):
+        entry = self.cache.get(url) if self.cache is not None else None
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.stats["fresh"] += 1
+            self.stats["pages"] += 1
+            return url, decode_body(entry)
+        headers = HttpCache.conditional_headers(entry)
+
+        async def attempt():
+            # 先在令牌桶中排队，再占用并发名额；重试的退避期间不占用名额
+            await self.rate_limiter.acquire_async(url)
+            async with self._semaphore(url):
+                if aiohttp is not None:
+                    return await self._fetch_aiohttp(client, url, headers)
+                return await self._fetch_httpx(client, url, headers)
+
+        try:
+            result = await retry_async(attempt, url, self.retries)
+            status, body, response_headers, encoding = result
+            self.stats["pages"] += 1
+            if status == 304 and entry is not None:
+                self.cache.stats["revalidated"] += 1
+                self.cache.touch(url)
+                return url, decode_body(entry)
+            if self.cache is not None:
+                self.cache.stats["miss"] += 1
+                self.cache.put(
+                    url,
+                    body,
+                    etag=response_headers.get("ETag"),
+                    last_modified=response_headers.get("Last-Modified"),
+                    encoding=encoding,
+                )
+            return url, body.decode(encoding or "utf-8", errors="replace")
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.warning(f"Async fetch of {url} failed. {repr(e)}")
+            return url, ""
+
+    async def crawl_async(self, urls: list[str]) -> dict:
+        """并发抓取所有网址
+
+        Args:
+            urls (list[str]): 网址列表
+
+        Returns:
+            dict: 网址 -> HTML文本，失败的网址对应空字符串
+        """
+        self._semaphores = {}
+        if aiohttp is not None:
+            client = aiohttp.ClientSession(
+                headers=self.headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        else:
+            client = httpx.AsyncClient(
+                headers=self.headers, timeout=self.timeout, follow_redirects=True
+            )
+        async with client:
+            results = await asyncio.gather(*[self._fetch(client, url) for url in urls])
+        recorder = get_recorder()
+        if recorder is not None:
+            for url, html in results:
+                if html:
+                    recorder.record(url, html)
+        return dict(results)
+
+    def crawl(self, urls: list[str]) -> dict:
+        """同步接口，并统计抓取速度
+
+        调用方已在事件循环中（如Jupyter）时asyncio.run不可用，改在工作线程中运行；
+        异步代码中应直接await crawl_async.
+
+        Args:
+            urls (list[str]): 网址列表
+
+        Returns:
+            dict: 网址 -> HTML文本
+        """
+        urls = list(dict.fromkeys(url for url in urls if url))
+        if not urls:
+            return {}
+        start = time.perf_counter()
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pages = asyncio.run(self.crawl_async(urls))
+        else:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                pages = executor.submit(asyncio.run, self.crawl_async(urls)).result()
+        elapsed = time.perf_counter() - start
+        self.stats["seconds"] += elapsed
+        self.stats["pages_per_sec"] = (
+            self.stats["pages"] / self.stats["seconds"] if self.stats["seconds"] else 0.0
+        )
+        msg = "Crawled {} pages in {:.2f}s ({:.2f} pages/sec, {} in flight per host).".format(
+            len(urls), elapsed, len(urls) / elapsed if elapsed else 0.0, self.per_host_limit
+        )
+        print(msg)
+        logger.info(msg)
+        return pages
@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   browser.py
+@Time    :   2024/11/06 09:48:15
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   Chrome浏览器池，供多个线程并发渲染页面
+"""
+
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import os
+import queue
+import threading
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+
+from utils.logger import logger
+
+
+# 按资源类型屏蔽的URL模式，供CDP Network.setBlockedURLs使用
+BLOCKED_URL_PATTERNS = {
+    "image": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico"],
+    "font": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot"],
+    "stylesheet": ["*.css"],
+    "analytics": [
+        "*google-analytics.com*",
+        "*googletagmanager.com*",
+        "*doubleclick.net*",
+        "*connect.facebook.net*",
+        "*hotjar.com*",
+        "*nr-data.net*",
+        "*newrelic.com*",
+        "*siteimproveanalytics*",
+        "*adobedtm.com*",
+        "*demdex.net*",
+        "*omtrdc.net*",
+        "*addthis.com*",
+    ],
+}
+# 可以直接通过Chrome偏好设置屏蔽的资源
+BLOCKED_CONTENT_PREFS = {
+    "image": {"profile.managed_default_content_settings.images": 2},
+    "stylesheet": {"profile.managed_default_content_settings.stylesheets": 2},
+}
+DEFAULT_BLOCKED_RESOURCES = ("image", "font", "stylesheet", "analytics")
+
+
+def build_chrome_options(
+    headless: bool = True,
+    blocked_resources: tuple = DEFAULT_BLOCKED_RESOURCES,
+    prefs: dict = None,
+    page_load_strategy: str = "eager",
+    performance_log: bool = False,
+) -> Options:
+    """构建统一的Chrome选项
+
+    Args:
+        headless (bool, optional): 是否无头模式. Defaults to True.
+        blocked_resources (tuple, optional): 屏蔽的资源类型. Defaults to DEFAULT_BLOCKED_RESOURCES.
+        prefs (dict, optional): 额外的Chrome偏好设置，如下载目录. Defaults to None.
+        page_load_strategy (str, optional): 页面加载策略，eager表示DOMContentLoaded即返回. Defaults to "eager".
+        performance_log (bool, optional): 是否开启性能日志以读取网络请求. Defaults to False.
+
+    Returns:
+        Options: Chrome选项
+    """
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-extensions")
+    options.page_load_strategy = page_load_strategy
+    if performance_log:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+
+    all_prefs = {}
+    for resource in blocked_resources or ():
+        all_prefs.update(BLOCKED_CONTENT_PREFS.get(resource, {}))
+    if "image" in (blocked_resources or ()):
+        options.add_argument("--blink-settings=imagesEnabled=false")
+    all_prefs.update(prefs or {})
+    if all_prefs:
+        options.add_experimental_option("prefs", all_prefs)
+    return options
+
+
+def block_resources(driver, blocked_resources: tuple = DEFAULT_BLOCKED_RESOURCES):
+    """通过CDP屏蔽字体、样式表和第三方统计脚本等请求
+
+    Args:
+        driver (WebDriver): Chrome实例
+        blocked_resources (tuple, optional): 屏蔽的资源类型. Defaults to DEFAULT_BLOCKED_RESOURCES.
+    """
+    patterns = [
+        pattern
+        for resource in blocked_resources or ()
+        for pattern in BLOCKED_URL_PATTERNS.get(resource, [])
+    ]
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    except Exception as e:
+        logger.warning(f"Block resources via CDP failed. {repr(e)}")
+
+
+def launch_chrome(options: Options = None, blocked_resources: tuple = DEFAULT_BLOCKED_RESOURCES):
+    """启动Chrome并屏蔽不需要的资源"""
+    if options is None:
+        options = build_chrome_options(blocked_resources=blocked_resources)
+    driver = webdriver.Chrome(options=options)
+    block_resources(driver, blocked_resources)
+    return driver
+
+
+class DriverPool(object):
+    """WebDriver池
+
+    最多启动size个Chrome实例，通过队列分发给工作线程；每个实例处理
+    max_pages_per_driver个页面后会被回收重建，以免Chrome内存持续增长.
+    """
+
+    def __init__(
+        self,
+        size: int = None,
+        options_factory=build_chrome_options,
+        max_pages_per_driver: int = 200,
+        blocked_resources: tuple = DEFAULT_BLOCKED_RESOURCES,
+    ):
+        self.size = max(1, size or os.cpu_count() or 1)
+        self.options_factory = options_factory
+        self.blocked_resources = blocked_resources
+        self.max_pages_per_driver = max_pages_per_driver
+        self._available = queue.Queue()
+        self._drivers = {}  # driver -> 已处理页面数
+        self._count = 0  # 已启动及正在启动的driver数
+        self._lock = threading.Lock()
+        self._closed = False
+        atexit.register(self.close)
+
+    def _launch(self):
+        driver = launch_chrome(self.options_factory(), self.blocked_resources)
+        with self._lock:
+            self._drivers[driver] = 0
+        return driver
+
+    def _quit(self, driver):
+        with self._lock:
+            self._drivers.pop(driver, None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"Quit driver failed. {repr(e)}")
+
+    def acquire(self, timeout: float = None):
+        """取出一个空闲的driver，池未满时新建一个
+
+        Args:
+            timeout (float, optional): 等待空闲driver的超时时间. Defaults to None.
+
+        Returns:
+            WebDriver: Chrome实例
+        """
+        if self._closed:
+            raise RuntimeError("DriverPool has been closed.")
+        try:
+            return self._available.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_launch = self._count < self.size
+            if can_launch:
+                self._count += 1
+        if can_launch:
+            try:
+                return self._launch()
+            except Exception:
+                with self._lock:
+                    self._count -= 1
+                raise
+        return self._available.get(timeout=timeout)
+
+    def release(self, driver, broken: bool = False):
+        """归还driver，达到页面上限或已损坏时回收重建
+
+        Args:
+            driver (WebDriver): Chrome实例
+            broken (bool, optional): driver是否已不可用. Defaults to False.
+        """
+        with self._lock:
+            pages = self._drivers.get(driver, 0) + 1
+            self._drivers[driver] = pages
+        if self._closed:
+            self._quit(driver)
+            return
+        if broken or pages >= self.max_pages_per_driver:
+            self._quit(driver)
+            try:
+                driver = self._launch()
+            except Exception as e:
+                with self._lock:
+                    self._count -= 1
+                logger.error(f"Relaunch driver failed. {repr(e)}")
+                return
+        self._available.put(driver)
+
+    @contextmanager
+    def driver(self, timeout: float = None):
+        """with语句中借用一个driver"""
+        driver = self.acquire(timeout)
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = not self._is_alive(driver)
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    @staticmethod
+    def _is_alive(driver) -> bool:
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    def map(self, func, items: list) -> list:
+        """在size个线程上并发执行func(driver, item)
+
+        Args:
+            func (callable): 接收(driver, item)的函数
+            items (list): 待处理的元素
+
+        Returns:
+            list: 与items顺序一致的结果
+        """
+
+        def run(item):
+            with self.driver() as driver:
+                return func(driver, item)
+
+        with ThreadPoolExecutor(max_workers=self.size) as executor:
+            return list(executor.map(run, items))
+
+    def close(self):
+        """关闭所有driver"""
+        self._closed = True
+        while True:
+            try:
+                self._available.get_nowait()
+            except queue.Empty:
+                break
+        with self._lock:
+            drivers = list(self._drivers)
+        for driver in drivers:
+            self._quit(driver)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   fetcher.py
+@Time    :   2024/11/04 10:12:31
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   基于requests.Session连接池的静态页面抓取
+"""
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.http_cache import HttpCache
+from utils.logger import logger
+from utils.rate_limiter import get_rate_limiter
+from utils.retry import retry_call
+from utils.replay import get_recorder
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9",
+}
+
+
+class HttpFetcher(object):
+    """复用TCP连接的HTTP抓取器，各联储共用一个Session
+
+    设置cache后，fetch_text会先查磁盘缓存，过期条目通过条件请求重新验证.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = 16,
+        timeout: float = 15.0,
+        headers: dict = None,
+        cache: HttpCache = None,
+        retries: int = 3,
+    ):
+        self.timeout = timeout
+        self.cache = cache
+        self.retries = retries
+        self.rate_limiter = get_rate_limiter()
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, url: str, **kwargs) -> requests.Response:
+        """GET请求，超时、连接错误和5xx按指数退避重试
+
+        Args:
+            url (str): 网址
+
+        Returns:
+            requests.Response: 响应
+        """
+        kwargs.setdefault("timeout", self.timeout)
+
+        def request():
+            self.rate_limiter.acquire(url)
+            response = self.session.get(url, **kwargs)
+            response.raise_for_status()
+            return response
+
+        response = retry_call(request, url, self.retries)
+        if response.status_code != 304:
+            record_response(url, response)
+        return response
+
+    def fetch_json(self, url: str, method: str = "GET", **kwargs):
+        """请求JSON接口，不经过磁盘缓存，按指数退避重试
+
+        Args:
+            url (str): 网址
+            method (str, optional): 请求方法. Defaults to "GET".
+
+        Returns:
+            解析后的JSON
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        kwargs["headers"] = dict({"Accept": "application/json"}, **(kwargs.get("headers") or {}))
+
+        def request():
+            self.rate_limiter.acquire(url)
+            response = self.session.request(method, url, **kwargs)
+            response.raise_for_status()
+            return response
+
+        response = retry_call(request, url, self.retries)
+        record_response(url, response, method, response.request.body)
+        return response.json()
+
+    def fetch_text(self, url: str, **kwargs) -> str:
+        """获取网页的HTML文本，失败时返回空字符串
+
+        Args:
+            url (str): 网址
+
+        Returns:
+            str: HTML文本
+        """
+        text = self._fetch_text(url, **kwargs)
+        recorder = get_recorder()
+        # 实际发出的请求已在fetch中录制，这里只补录缓存命中的页面
+        if recorder is not None and text and url not in recorder:
+            recorder.record(url, text)
+        return text
+
+    def _fetch_text(self, url: str, **kwargs) -> str:
+        entry = self.cache.get(url) if self.cache is not None else None
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.stats["fresh"] += 1
+            return decode_body(entry)
+        try:
+            if entry is not None:
+                kwargs["headers"] = dict(
+                    kwargs.get("headers") or {}, **self.cache.conditional_headers(entry)
+                )
+            response = self.fetch(url, **kwargs)
+            if response.status_code == 304 and entry is not None:
+                self.cache.stats["revalidated"] += 1
+                self.cache.touch(url)
+                return decode_body(entry)
+            # 部分联储网站未声明编码
+            if response.encoding is None or response.encoding == "ISO-8859-1":
+                response.encoding = response.apparent_encoding
+            if self.cache is not None:
+                self.cache.stats["miss"] += 1
+                self.cache.put(
+                    url,
+                    response.content,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    encoding=response.encoding,
+                )
+            return response.text
+        except requests.RequestException as e:
+            logger.warning(f"Static fetch of {url} failed. {repr(e)}")
+            return ""
+
+    def close(self):
+        self.session.close()
+
+
+def record_response(
+    url: str, response: requests.Response, method: str = "GET", request_body=None
+):
+    """录制模式下保存响应正文，POST等请求按请求体区分"""
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.record(
+            url,
+            response.content,
+            response.headers.get("Content-Type") or "text/html",
+            response.status_code,
+            method,
+            request_body,
+        )
+
+
+def decode_body(entry: dict) -> str:
+    """按缓存的编码解码正文"""
+    return entry["body"].decode(entry.get("encoding") or "utf-8", errors="replace")
+
+
+# 进程内共享的抓取器和缓存
+_default_fetcher = None
+_default_cache = None
+
+
+def get_cache() -> HttpCache:
+    """获取进程内共享的HttpCache"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = HttpCache()
+    return _default_cache
+
+
+def get_fetcher() -> HttpFetcher:
+    """获取进程内共享的HttpFetcher，详情页请求均经过磁盘缓存"""
+    global _default_fetcher
+    if _default_fetcher is None:
+        _default_fetcher = HttpFetcher(cache=get_cache())
+    return _default_fetcher
@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   html_parser.py
+@Time    :   2024/11/08 15:20:44
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   统一的HTML解析，优先使用lxml，并可通过SoupStrainer只解析目标子树
+"""
+
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.element import Tag
+
+try:
+    import lxml  # noqa: F401
+
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+
+def strainer(name=None, **attrs) -> SoupStrainer:
+    """构建只保留目标元素的SoupStrainer
+
+    Args:
+        name (str, optional): 标签名. Defaults to None.
+        **attrs: 属性过滤条件，如class_="result-item"
+
+    Returns:
+        SoupStrainer: 只保留目标元素的过滤器
+    """
+    if "class_" in attrs:
+        attrs["class"] = attrs.pop("class_")
+    css_class = attrs.get("class")
+    if isinstance(css_class, str) and " " not in css_class:
+        # 解析阶段class属性尚未拆分，按单词匹配以兼容多个class的元素
+        attrs["class"] = re.compile(r"(^|\s){}(\s|$)".format(re.escape(css_class)))
+    return SoupStrainer(name, attrs=attrs)
+
+
+def selector_strainer(selector: str) -> SoupStrainer:
+    """按CSS选择器最外层的复合选择器构建SoupStrainer
+
+    保留下来的子树包含selector的全部祖先条件，裁剪后仍可用selector选中列表条目.
+    只支持由标签、#id和.class组成的复合选择器；逗号分隔的多个选择器须为同一标签且只用class，
+    否则返回None，即不裁剪.
+
+    Args:
+        selector (str): CSS选择器，通常为爬虫的LISTING_SELECTOR
+
+    Returns:
+        SoupStrainer: 只保留目标子树的过滤器
+    """
+    rules = []
+    for part in selector.split(","):
+        compound = re.split(r"\s*>\s*|\s+", part.strip())[0]
+        match = re.fullmatch(r"([a-zA-Z][\w-]*)?((?:[#.][\w-]+)*)", compound)
+        if match is None or not compound:
+            return None
+        tokens = re.findall(r"([#.])([\w-]+)", match.group(2))
+        ids = [value for prefix, value in tokens if prefix == "#"]
+        classes = [value for prefix, value in tokens if prefix == "."]
+        rules.append((match.group(1), ids, classes))
+    if len(rules) == 1:
+        name, ids, classes = rules[0]
+        attrs = {}
+        if ids:
+            attrs["id"] = ids[0]
+        if classes:
+            attrs["class"] = class_pattern([classes])
+        return SoupStrainer(name, attrs=attrs)
+    names = {name for name, _, _ in rules}
+    if len(names) != 1 or any(ids or not classes for _, ids, classes in rules):
+        return None
+    return SoupStrainer(names.pop(), attrs={"class": class_pattern([c for _, _, c in rules])})
+
+
+def class_pattern(alternatives: list[list[str]]) -> re.Pattern:
+    """匹配未拆分的class属性：包含任意一组中的全部class，与顺序无关"""
+    groups = [
+        "".join(r"(?=.*(?:^|\s){}(?:\s|$))".format(re.escape(css_class)) for css_class in classes)
+        for classes in alternatives
+    ]
+    return re.compile("^(?:{})".format("|".join(groups)))
+
+
+def parse_html(html: str, parse_only: SoupStrainer = None, parser: str = None) -> BeautifulSoup:
+    """解析HTML文本
+
+    Args:
+        html (str): HTML文本
+        parse_only (SoupStrainer, optional): 只解析匹配的子树. Defaults to None.
+        parser (str, optional): 解析器，默认lxml（未安装时为html.parser）. Defaults to None.
+
+    Returns:
+        BeautifulSoup: 解析后的文档
+    """
+    return BeautifulSoup(html or "", parser or PARSER, parse_only=parse_only)
+
+
+def parse_subtree(html: str, selector: str, parse_only: SoupStrainer = None) -> Tag:
+    """解析HTML并返回CSS选择器对应的第一个元素
+
+    Args:
+        html (str): HTML文本
+        selector (str): CSS选择器
+        parse_only (SoupStrainer, optional): 先用SoupStrainer裁剪再选择. Defaults to None.
+
+    Returns:
+        Tag: 匹配的元素，不存在时为None
+    """
+    return parse_html(html, parse_only).select_one(selector)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   http_cache.py
+@Time    :   2024/11/11 10:32:57
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   基于ETag/Last-Modified条件请求的磁盘HTTP缓存，按LRU淘汰
+"""
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from utils.logger import logger
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(ROOT_PATH, "data", "http_cache")
+
+
+class HttpCache(object):
+    """以网址为键的磁盘缓存
+
+    正文gzip压缩后按网址哈希存为文件，ETag、Last-Modified等元数据记录在SQLite索引中.
+    在ttl秒内的缓存直接使用，过期后通过If-None-Match/If-Modified-Since重新验证；
+    总大小超过max_bytes时淘汰最久未访问的条目.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        ttl: float = 12 * 3600,
+        max_bytes: int = 2 * 1024**3,
+    ):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.stats = {"fresh": 0, "revalidated": 0, "miss": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(cache_dir, "index.sqlite"), check_same_thread=False
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                encoding TEXT,
+                size INTEGER,
+                stored_at REAL,
+                accessed_at REAL
+            )"""
+        )
+        self._conn.commit()
+
+    def _body_path(self, url: str) -> str:
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + ".gz")
+
+    def get(self, url: str) -> dict:
+        """读取缓存条目
+
+        Args:
+            url (str): 网址
+
+        Returns:
+            dict: 包含body(bytes)、etag、last_modified、encoding、stored_at，不存在时为None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, encoding, stored_at FROM entries WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            try:
+                with gzip.open(self._body_path(url), "rb") as f:
+                    body = f.read()
+            except OSError:
+                self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE url = ?", (time.time(), url)
+            )
+            self._conn.commit()
+        etag, last_modified, encoding, stored_at = row
+        return {
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "encoding": encoding,
+            "stored_at": stored_at,
+        }
+
+    def is_fresh(self, entry: dict) -> bool:
+        return entry is not None and time.time() - entry["stored_at"] < self.ttl
+
+    @staticmethod
+    def conditional_headers(entry: dict) -> dict:
+        """构造重新验证用的请求头"""
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(
+        self,
+        url: str,
+        body: bytes,
+        etag: str = None,
+        last_modified: str = None,
+        encoding: str = None,
+    ):
+        """写入或覆盖缓存条目"""
+        path = self._body_path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock:
+            with gzip.open(path, "wb") as f:
+                f.write(body)
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, encoding, os.path.getsize(path), now, now),
+            )
+            self._conn.commit()
+        self.evict()
+
+    def touch(self, url: str):
+        """304响应后刷新条目的验证时间"""
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "UPDATE entries SET stored_at = ?, accessed_at = ? WHERE url = ?",
+                (now, now, url),
+            )
+            self._conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self):
+        """总大小超过上限时，按最近访问时间淘汰"""
+        total = self.size()
+        if total <= self.max_bytes:
+            return
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url, size FROM entries ORDER BY accessed_at ASC"
+            ).fetchall()
+            for url, size in rows:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(self._body_path(url))
+                except OSError:
+                    pass
+                self._conn.execute("DELETE FROM entries WHERE url = ?", (url,))
+                total -= size
+                self.stats["evicted"] += 1
+            self._conn.commit()
+        logger.info(f"HTTP cache evicted down to {total} bytes.")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
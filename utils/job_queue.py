@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   job_queue.py
+@Time    :   2024/11/18 10:08:44
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   基于SQLite的抓取任务表，进程崩溃后可从中断处继续
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.logger import logger
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_PATH = os.path.join(ROOT_PATH, "data", "jobs.sqlite")
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobQueue(object):
+    """演讲详情页的抓取任务表
+
+    每次collect为一轮(run)，每篇演讲是其中的一个任务(job)，结果在完成时立即写入.
+    一轮正常结束前进程退出的话，下次启动会继续这一轮，已完成的任务直接返回保存的结果.
+    """
+
+    def __init__(self, db_path: str = DEFAULT_DB_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                bank TEXT,
+                started_at REAL,
+                finished_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS jobs (
+                run_id INTEGER,
+                url TEXT,
+                bank TEXT,
+                state TEXT,
+                attempts INTEGER DEFAULT 0,
+                last_error TEXT,
+                result TEXT,
+                updated_at REAL,
+                PRIMARY KEY (run_id, url)
+            );
+            """
+        )
+        self._conn.commit()
+
+    def start_run(self, bank: str) -> int:
+        """开始一轮抓取，有未结束的轮次时继续该轮
+
+        Returns:
+            int: run_id
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id FROM runs WHERE bank = ? AND finished_at IS NULL "
+                "ORDER BY run_id DESC LIMIT 1",
+                (bank,),
+            ).fetchone()
+            if row is not None:
+                run_id = row[0]
+                # 上次崩溃时正在处理的任务重新排队
+                self._conn.execute(
+                    "UPDATE jobs SET state = ? WHERE run_id = ? AND state = ?",
+                    (PENDING, run_id, RUNNING),
+                )
+                done = self._conn.execute(
+                    "SELECT COUNT(*) FROM jobs WHERE run_id = ? AND state IN (?, ?)",
+                    (run_id, DONE, FAILED),
+                ).fetchone()[0]
+                logger.info(f"Resume run {run_id} of {bank}, {done} jobs already finished.")
+            else:
+                cursor = self._conn.execute(
+                    "INSERT INTO runs (bank, started_at) VALUES (?, ?)", (bank, time.time())
+                )
+                run_id = cursor.lastrowid
+            self._conn.commit()
+        return run_id
+
+    def finish_run(self, run_id: int):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), run_id)
+            )
+            self._conn.commit()
+
+    def get(self, run_id: int, url: str) -> dict:
+        """查询任务，不存在时为None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, attempts, last_error, result FROM jobs "
+                "WHERE run_id = ? AND url = ?",
+                (run_id, url),
+            ).fetchone()
+        if row is None:
+            return None
+        state, attempts, last_error, result = row
+        return {
+            "state": state,
+            "attempts": attempts,
+            "last_error": last_error,
+            "result": json.loads(result) if result else None,
+        }
+
+    def enqueue(self, run_id: int, bank: str, urls: list[str]):
+        """批量添加任务，已存在的任务不受影响"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (run_id, url, bank, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(run_id, url, bank, PENDING, now) for url in urls],
+            )
+            self._conn.commit()
+
+    def claim(self, run_id: int, bank: str, url: str) -> bool:
+        """领取任务并计一次尝试
+
+        Returns:
+            bool: 任务已完成或已放弃时为False
+        """
+        self.enqueue(run_id, bank, [url])
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ? "
+                "WHERE run_id = ? AND url = ? AND state = ?",
+                (RUNNING, time.time(), run_id, url, PENDING),
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def complete(self, run_id: int, url: str, result: dict):
+        """保存任务结果"""
+        self._finish(run_id, url, DONE, result, None)
+
+    def fail(self, run_id: int, url: str, result: dict, error: str, max_attempts: int = 3):
+        """记录失败，未达到最大尝试次数时重新排队，下次继续本轮时再试"""
+        job = self.get(run_id, url)
+        attempts = job["attempts"] if job else max_attempts
+        state = FAILED if attempts >= max_attempts else PENDING
+        self._finish(run_id, url, state, result, error)
+
+    def _finish(self, run_id: int, url: str, state: str, result: dict, error: str):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, last_error = ?, updated_at = ? "
+                "WHERE run_id = ? AND url = ?",
+                (state, json.dumps(result, ensure_ascii=False), error, time.time(), run_id, url),
+            )
+            self._conn.commit()
+
+    def counts(self, run_id: int) -> dict:
+        """各状态的任务数"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE run_id = ? GROUP BY state", (run_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# 进程内共享的任务表
+_default_queue = None
+
+
+def get_job_queue() -> JobQueue:
+    """获取进程内共享的JobQueue"""
+    global _default_queue
+    if _default_queue is None:
+        _default_queue = JobQueue()
+    return _default_queue
@@ -1,6 +1,14 @@
 import logging
+import os
 from logging import Logger
 
+# 日志文件所在目录，默认为当前工作目录，测试时指向临时目录
+LOG_DIR = os.environ.get("SCRAPER_LOG_DIR", "")
+
+
+def log_path(name: str) -> str:
+    return os.path.join(LOG_DIR, "{}_scraper.log".format(name))
+
 
 class ScraperLogger(Logger):
     def __init__(self, name: str, level=logging.INFO):
@@ -10,7 +18,7 @@ class ScraperLogger(Logger):
         self.logger.setLevel(logging.DEBUG)
 
         # 创建一个handler，用于写入日志文件
-        self.fh = logging.FileHandler("{}_scraper.log".format(name))
+        self.fh = logging.FileHandler(log_path(name))
         self.fh.setLevel(logging.DEBUG)
 
         # 再创建一个handler，用于输出到控制台
@@ -32,7 +40,7 @@ class ScraperLogger(Logger):
 def setup_logger(name: str, log_file: str = None, level=logging.INFO):
     """Function to setup as many loggers as you want"""
     if not log_file:
-        log_file = "{}_scraper.log".format(name)
+        log_file = log_path(name)
     formatter = logging.Formatter(
         "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
     )
@@ -50,7 +58,7 @@ def get_logger(logger_name: str = "speech_scraper"):
     logger.setLevel(logging.DEBUG)
 
     # 创建一个handler，用于写入日志文件
-    fh = logging.FileHandler("{}_scraper.log".format(logger_name))
+    fh = logging.FileHandler(log_path(logger_name))
     fh.setLevel(logging.DEBUG)
 
     # 再创建一个handler，用于输出到控制台
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   pdf_downloader.py
+@Time    :   2024/11/21 10:05:33
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   PDF并发流式下载，支持Range断点续传与SHA-256校验
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlparse
+
+from utils.fetcher import HttpFetcher, get_fetcher
+from utils.logger import logger
+from utils.replay import get_recorder
+from utils.retry import retry_call
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PDF_DIR = os.path.join(ROOT_PATH, "data", "pdfs")
+PDF_MAGIC = b"%PDF-"
+
+
+class PdfDownloadError(Exception):
+    """下载的文件不完整或校验失败"""
+
+
+def file_sha256(filepath: str, chunk_size: int = 1 << 20) -> str:
+    """分块计算文件的SHA-256"""
+    sha256 = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def pdf_filename(url: str) -> str:
+    """由网址得到PDF文件名，附加完整网址的短摘要，避免不同目录下的同名文件互相覆盖"""
+    name = unquote(os.path.basename(urlparse(url).path)) or "download.pdf"
+    name = re.sub(r"[^\w.\-]", "_", name)
+    stem = name[:-4] if name.lower().endswith(".pdf") else name
+    digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:8]
+    return f"{stem}-{digest}.pdf"
+
+
+class PdfDownloader(object):
+    """复用HttpFetcher连接池的PDF下载器
+
+    正文按块写入<文件名>.part，中断后再次下载时用Range请求续传；
+    下载完成后检查PDF文件头、长度及可选的SHA-256，再改名为正式文件，
+    并在<文件名>.sha256中记录摘要，已下载且摘要一致的文件不再请求.
+    """
+
+    def __init__(
+        self,
+        download_dir: str = DEFAULT_PDF_DIR,
+        max_workers: int = 4,
+        chunk_size: int = 1 << 16,
+        fetcher: HttpFetcher = None,
+    ):
+        self.download_dir = download_dir
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = chunk_size
+        self.fetcher = fetcher or get_fetcher()
+        # 下载的文件数、续传次数、跳过的文件数及字节数
+        self.stats = {"downloaded": 0, "resumed": 0, "skipped": 0, "bytes": 0}
+        self._stats_lock = threading.Lock()
+        os.makedirs(download_dir, exist_ok=True)
+
+    def _count(self, key: str, value: int = 1):
+        """download_many在多个线程中运行，stats的更新需要加锁"""
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def path(self, url: str, filename: str = None) -> str:
+        return os.path.join(self.download_dir, filename or pdf_filename(url))
+
+    def is_downloaded(self, filepath: str, sha256: str = None) -> bool:
+        """文件存在且与记录的摘要一致"""
+        digest_path = filepath + ".sha256"
+        if not os.path.exists(filepath) or not os.path.exists(digest_path):
+            return False
+        with open(digest_path, "r", encoding="utf-8") as f:
+            recorded = f.read().strip()
+        if sha256 is not None and recorded != sha256:
+            return False
+        return file_sha256(filepath) == recorded
+
+    def _fetch_part(self, url: str, part_path: str) -> int:
+        """从.part文件的当前长度续传，返回完整文件的预期长度（未知时为None）"""
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Accept": "application/pdf,*/*", "Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = f"bytes={offset}-"
+        self.fetcher.rate_limiter.acquire(url)
+        with self.fetcher.session.get(
+            url, headers=headers, stream=True, timeout=self.fetcher.timeout
+        ) as response:
+            if response.status_code == 416:
+                # 已下载完整
+                return offset
+            response.raise_for_status()
+            if offset and response.status_code == 206:
+                self._count("resumed")
+                mode = "ab"
+                content_range = response.headers.get("Content-Range", "")
+                total = content_range.rsplit("/", 1)[-1]
+                expected = int(total) if total.isdigit() else None
+            else:
+                # 服务器不支持Range时从头下载
+                mode = "wb"
+                length = response.headers.get("Content-Length")
+                expected = int(length) if length and length.isdigit() else None
+            with open(part_path, mode) as f:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    f.write(chunk)
+                    self._count("bytes", len(chunk))
+        return expected
+
+    def download(self, url: str, filename: str = None, sha256: str = None) -> str:
+        """下载单个PDF
+
+        Args:
+            url (str): PDF网址
+            filename (str, optional): 保存的文件名，默认取网址中的文件名. Defaults to None.
+            sha256 (str, optional): 预期的SHA-256. Defaults to None.
+
+        Returns:
+            str: 本地文件路径
+        """
+        filepath = self.path(url, filename)
+        if self.is_downloaded(filepath, sha256):
+            self._count("skipped")
+            self._record(url, filepath)
+            return filepath
+        part_path = filepath + ".part"
+
+        def attempt():
+            expected = self._fetch_part(url, part_path)
+            size = os.path.getsize(part_path)
+            if expected is not None and size != expected:
+                # 连接中途断开，保留.part以便下次续传
+                raise ConnectionError(f"Incomplete download {size}/{expected} bytes.")
+            return size
+
+        retry_call(attempt, url, self.fetcher.retries)
+        with open(part_path, "rb") as f:
+            if f.read(len(PDF_MAGIC)) != PDF_MAGIC:
+                os.remove(part_path)
+                raise PdfDownloadError(f"{url} is not a PDF file.")
+        digest = file_sha256(part_path)
+        if sha256 is not None and digest != sha256:
+            os.remove(part_path)
+            raise PdfDownloadError(f"SHA-256 mismatch of {url}.")
+        os.replace(part_path, filepath)
+        with open(filepath + ".sha256", "w", encoding="utf-8") as f:
+            f.write(digest)
+        self._count("downloaded")
+        self._record(url, filepath)
+        return filepath
+
+    def _record(self, url: str, filepath: str):
+        """录制模式下保存完整的PDF，分段续传的响应不单独录制"""
+        recorder = get_recorder()
+        if recorder is not None and url not in recorder:
+            with open(filepath, "rb") as f:
+                recorder.record(url, f.read(), "application/pdf")
+
+    def download_many(self, urls: list[str]) -> dict:
+        """并发下载一批PDF
+
+        Returns:
+            dict: 网址 -> 本地文件路径，失败时为None
+        """
+        start = time.perf_counter()
+
+        def run(url):
+            try:
+                return self.download(url)
+            except Exception as e:
+                logger.warning(f"Download PDF {url} failed. {repr(e)}")
+                return None
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            paths = dict(zip(urls, executor.map(run, urls)))
+        elapsed = time.perf_counter() - start
+        done = sum(1 for path in paths.values() if path)
+        print(f"Downloaded {done}/{len(urls)} PDFs in {elapsed:.2f}s, {self.stats}.")
+        return paths
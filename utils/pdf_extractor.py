@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   pdf_extractor.py
+@Time    :   2024/11/22 09:41:18
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   进程池并发提取PDF文本，按文件SHA-256缓存结果；文本提取后端可替换
+"""
+
+import importlib.util
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator
+
+from utils.file_saver import json_dump, json_load
+from utils.logger import logger
+from utils.pdf_downloader import PdfDownloader, file_sha256
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_TEXT_CACHE_DIR = os.path.join(ROOT_PATH, "data", "pdf_text")
+DEFAULT_BACKEND = "pypdf2"
+
+
+def _pypdf2_pages(pdf_filename: str) -> Iterator[str]:
+    from PyPDF2 import PdfReader
+
+    for page in PdfReader(pdf_filename).pages:
+        yield page.extract_text() or ""
+
+
+def _pdfminer_pages(pdf_filename: str) -> Iterator[str]:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+
+    for page_layout in extract_pages(pdf_filename):
+        yield "".join(
+            element.get_text()
+            for element in page_layout
+            if isinstance(element, LTTextContainer)
+        )
+
+
+def _pypdfium2_pages(pdf_filename: str) -> Iterator[str]:
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(pdf_filename)
+    try:
+        for i in range(len(pdf)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            try:
+                yield textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+
+# 后端名称 -> (依赖的模块, 逐页产出文本的函数)，按速度从快到慢排列
+PDF_BACKENDS = {
+    "pypdfium2": ("pypdfium2", _pypdfium2_pages),
+    "pdfminer": ("pdfminer", _pdfminer_pages),
+    "pypdf2": ("PyPDF2", _pypdf2_pages),
+}
+
+
+def available_backends() -> list[str]:
+    """已安装依赖的后端，按速度从快到慢排列"""
+    return [
+        name
+        for name, (module, _) in PDF_BACKENDS.items()
+        if importlib.util.find_spec(module) is not None
+    ]
+
+
+def resolve_backend(backend: str = None) -> str:
+    """确定实际使用的后端
+
+    Args:
+        backend (str, optional): 后端名称，None为默认的pypdf2，"auto"为已安装的最快后端.
+            指定的后端未安装时退回pypdf2. Defaults to None.
+    """
+    if backend is None:
+        return DEFAULT_BACKEND
+    available = available_backends()
+    if backend == "auto":
+        return available[0] if available else DEFAULT_BACKEND
+    if backend not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF backend {backend}, choose from {list(PDF_BACKENDS)}.")
+    if backend not in available:
+        logger.warning(f"PDF backend {backend} is not installed, use {DEFAULT_BACKEND}.")
+        return DEFAULT_BACKEND
+    return backend
+
+
+def iter_pdf_pages(pdf_filename: str, backend: str = None) -> Iterator[str]:
+    """逐页产出PDF文本，不在内存中拼接整份文档"""
+    return PDF_BACKENDS[resolve_backend(backend)][1](pdf_filename)
+
+
+def extract_pdf_text(pdf_filename: str, backend: str = None) -> tuple:
+    """提取PDF全部页面的文本
+
+    Returns:
+        tuple: (文本, 页数)
+    """
+    texts = list(iter_pdf_pages(pdf_filename, backend))
+    return "\n\n".join(texts).strip("\n "), len(texts)
+
+
+def read_pdf_file(pdf_filename: str, backend: str = None) -> str:
+    """读取PDF文本，文件不存在时返回空字符串"""
+    if not os.path.exists(pdf_filename):
+        return ""
+    return get_pdf_extractor(backend).extract(pdf_filename)
+
+
+class PdfTextExtractor(object):
+    """用进程池处理一批已下载的PDF，提取结果按文件的SHA-256缓存
+
+    缓存为<cache_dir>/<sha256>_<后端>.json，内容未变的PDF不会再次解析，
+    文件改名或移动后仍能命中缓存.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_TEXT_CACHE_DIR,
+        max_workers: int = None,
+        backend: str = None,
+    ):
+        self.cache_dir = cache_dir
+        self.backend = resolve_backend(backend)
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        # 命中缓存的文件数、解析的文件数及页数、失败的文件数
+        self.stats = {"cached": 0, "parsed": 0, "pages": 0, "failed": 0}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _cache_path(self, sha256: str) -> str:
+        return os.path.join(self.cache_dir, f"{sha256}_{self.backend}.json")
+
+    def cached(self, sha256: str) -> str:
+        """缓存的文本，未缓存时为None"""
+        cache_path = self._cache_path(sha256)
+        if not os.path.exists(cache_path):
+            return None
+        entry = json_load(cache_path)
+        return entry.get("text") if entry else None
+
+    def _store(self, sha256: str, text: str, pages: int):
+        json_dump({"text": text, "pages": pages}, self._cache_path(sha256))
+
+    def extract(self, pdf_filename: str) -> str:
+        """在当前进程中提取单个PDF的文本，优先读取缓存"""
+        sha256 = file_sha256(pdf_filename)
+        text = self.cached(sha256)
+        if text is not None:
+            self.stats["cached"] += 1
+            return text
+        text, pages = extract_pdf_text(pdf_filename, self.backend)
+        self._store(sha256, text, pages)
+        self.stats["parsed"] += 1
+        self.stats["pages"] += pages
+        return text
+
+    def extract_many(self, pdf_filenames: list[str]) -> dict:
+        """并发提取一批PDF的文本，未缓存的文件交给进程池
+
+        Args:
+            pdf_filenames (list[str]): 本地PDF文件
+
+        Returns:
+            dict: 文件路径 -> 文本，失败时为""
+        """
+        texts = {}
+        # 待解析的文件, SHA-256 -> 文件路径，内容相同的文件只解析一次
+        pending = {}
+        sha256s = {}
+        for pdf_filename in dict.fromkeys(pdf_filenames):
+            if not os.path.exists(pdf_filename):
+                texts[pdf_filename] = ""
+                continue
+            sha256 = sha256s[pdf_filename] = file_sha256(pdf_filename)
+            text = self.cached(sha256)
+            if text is not None:
+                self.stats["cached"] += 1
+                texts[pdf_filename] = text
+            else:
+                pending.setdefault(sha256, pdf_filename)
+        if pending:
+            self._parse(pending)
+            for pdf_filename, sha256 in sha256s.items():
+                if pdf_filename not in texts:
+                    texts[pdf_filename] = self.cached(sha256) or ""
+        return texts
+
+    def _parse(self, pending: dict):
+        """用进程池解析未缓存的PDF，逐个报告进度及每秒页数"""
+        start = time.perf_counter()
+        pages_done = 0
+        total = len(pending)
+        workers = min(self.max_workers, total)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(extract_pdf_text, pdf_filename, self.backend): sha256
+                for sha256, pdf_filename in pending.items()
+            }
+            for i, future in enumerate(as_completed(futures), 1):
+                sha256 = futures[future]
+                pdf_filename = pending[sha256]
+                try:
+                    text, pages = future.result()
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    logger.warning(f"Extract text of {pdf_filename} failed. {repr(e)}")
+                    continue
+                self._store(sha256, text, pages)
+                self.stats["parsed"] += 1
+                self.stats["pages"] += pages
+                pages_done += pages
+                elapsed = time.perf_counter() - start
+                print(
+                    f"[{i}/{total}] {os.path.basename(pdf_filename)} {pages} pages, "
+                    f"{pages_done / elapsed:.1f} pages/s."
+                )
+        print(
+            f"Extracted {total} PDFs ({pages_done} pages) in "
+            f"{time.perf_counter() - start:.2f}s with {workers} {self.backend} processes."
+        )
+
+    def extract_urls(self, urls: list[str], downloader: PdfDownloader) -> dict:
+        """下载并提取一批PDF，如波士顿联储的*-text.pdf附件或FOMC会议纪要
+
+        Returns:
+            dict: 网址 -> 文本，下载或解析失败时为""
+        """
+        paths = downloader.download_many(urls)
+        texts = self.extract_many([path for path in paths.values() if path])
+        return {url: texts.get(path, "") if path else "" for url, path in paths.items()}
+
+
+# 进程内共享的提取器, 后端 -> PdfTextExtractor
+_extractors = {}
+
+
+def get_pdf_extractor(backend: str = None) -> PdfTextExtractor:
+    """获取进程内共享的某个后端的PdfTextExtractor"""
+    backend = resolve_backend(backend)
+    if backend not in _extractors:
+        _extractors[backend] = PdfTextExtractor(backend=backend)
+    return _extractors[backend]
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   rate_limiter.py
+@Time    :   2024/11/15 09:40:12
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   按host的令牌桶限速，进程内所有抓取路径共用
+"""
+
+import asyncio
+import threading
+import time
+from urllib.parse import urlparse
+
+from utils.logger import logger
+
+
+class TokenBucket(object):
+    """令牌桶，每秒补充rate个令牌，最多积攒burst个"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """预订一个令牌，返回需要等待的秒数
+
+        令牌不足时余额记为负数，后来的请求依次排在后面，因此多个线程同时预订也不会超速.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class RateLimiter(object):
+    """每个host一个令牌桶，并统计请求等待令牌的时间"""
+
+    def __init__(self, default_rate: float = 2.0, default_burst: int = 4):
+        self.default_rate = default_rate
+        self.default_burst = default_burst
+        self._buckets = {}
+        # host -> {"requests": 请求数, "waited": 累计等待秒数, "max_wait": 最长等待秒数}
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def configure(self, host: str, rate: float, burst: int = None):
+        """设置某个host的速率
+
+        Args:
+            host (str): host或网址
+            rate (float): 每秒请求数，0或None表示不限速
+            burst (int, optional): 允许的突发请求数. Defaults to None.
+        """
+        host = urlparse(host).netloc or host
+        with self._lock:
+            if not rate:
+                self._buckets[host] = None
+            else:
+                self._buckets[host] = TokenBucket(rate, burst or self.default_burst)
+
+    def _bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            if host not in self._buckets:
+                self._buckets[host] = TokenBucket(self.default_rate, self.default_burst)
+            return self._buckets[host]
+
+    def _reserve(self, url: str) -> float:
+        host = urlparse(url).netloc
+        bucket = self._bucket(host)
+        delay = bucket.reserve() if bucket is not None else 0.0
+        with self._lock:
+            stats = self.stats.setdefault(host, {"requests": 0, "waited": 0.0, "max_wait": 0.0})
+            stats["requests"] += 1
+            stats["waited"] += delay
+            stats["max_wait"] = max(stats["max_wait"], delay)
+        return delay
+
+    def acquire(self, url: str) -> float:
+        """阻塞直到该网址所在host有可用令牌
+
+        Returns:
+            float: 等待的秒数
+        """
+        delay = self._reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self, url: str) -> float:
+        """acquire的协程版本，等待期间不阻塞事件循环"""
+        delay = self._reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+    def summary(self, hosts: list[str] = None) -> str:
+        """各host的请求数和等待令牌的时间"""
+        lines = [f"{'host':<32}{'requests':>10}{'waited(s)':>11}{'avg(ms)':>9}{'max(ms)':>9}"]
+        with self._lock:
+            items = sorted(self.stats.items())
+        for host, stats in items:
+            if hosts is not None and host not in hosts:
+                continue
+            avg = stats["waited"] / stats["requests"] * 1000 if stats["requests"] else 0.0
+            lines.append(
+                f"{host:<32}{stats['requests']:>10}{stats['waited']:>11.2f}"
+                f"{avg:>9.1f}{stats['max_wait'] * 1000:>9.1f}"
+            )
+        return "\n".join(lines)
+
+    def log_summary(self, hosts: list[str] = None):
+        logger.info("Rate limiter token waits:\n" + self.summary(hosts))
+
+
+# 进程内共享的限速器
+_default_limiter = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """获取进程内共享的RateLimiter"""
+    global _default_limiter
+    if _default_limiter is None:
+        _default_limiter = RateLimiter()
+    return _default_limiter
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   raw_archive.py
+@Time    :   2024/11/12 14:05:18
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   按内容哈希存储抓取到的原始HTML/PDF，供离线重新解析
+"""
+
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+from utils.logger import logger
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ARCHIVE_DIR = os.path.join(ROOT_PATH, "data", "raw_archive")
+
+
+class RawArchive(object):
+    """内容寻址的原始响应存档
+
+    正文以sha256为键gzip压缩存放在objects目录下，相同内容只存一份；
+    网址到哈希的索引记录在SQLite中，同一网址以最近一次抓取为准.
+    """
+
+    def __init__(self, archive_dir: str = DEFAULT_ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(archive_dir, "objects"), exist_ok=True)
+        self._conn = sqlite3.connect(
+            os.path.join(archive_dir, "index.sqlite"), check_same_thread=False
+        )
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                digest TEXT,
+                fetched_at REAL
+            )"""
+        )
+        self._conn.commit()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.archive_dir, "objects", digest[:2], digest + ".gz")
+
+    def put(self, url: str, body) -> str:
+        """存档一次响应
+
+        Args:
+            url (str): 网址
+            body (bytes | str): 响应正文，str按utf-8编码
+
+        Returns:
+            str: 正文的sha256
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._object_path(digest)
+        with self._lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # 先写临时文件再改名，避免中断后留下残缺的对象
+                tmp_path = path + ".tmp"
+                with gzip.open(tmp_path, "wb") as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO urls VALUES (?, ?, ?)", (url, digest, time.time())
+            )
+            self._conn.commit()
+        return digest
+
+    def digest(self, url: str) -> str:
+        """网址对应的内容哈希，未存档时为None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM urls WHERE url = ?", (url,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def get(self, url: str) -> bytes:
+        """读取网址最近一次存档的正文，未存档时为None"""
+        digest = self.digest(url)
+        if digest is None:
+            return None
+        try:
+            with gzip.open(self._object_path(digest), "rb") as f:
+                return f.read()
+        except OSError as e:
+            logger.warning(f"Archived object {digest} of {url} unreadable. {repr(e)}")
+            return None
+
+    def get_text(self, url: str) -> str:
+        """读取存档的HTML文本，未存档时返回空字符串"""
+        body = self.get(url)
+        return body.decode("utf-8", errors="replace") if body is not None else ""
+
+    def __contains__(self, url: str) -> bool:
+        return self.digest(url) is not None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# 进程内共享的存档
+_default_archive = None
+
+
+def get_archive() -> RawArchive:
+    """获取进程内共享的RawArchive"""
+    global _default_archive
+    if _default_archive is None:
+        _default_archive = RawArchive()
+    return _default_archive
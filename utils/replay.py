@@ -0,0 +1,342 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   replay.py
+@Time    :   2024/11/13 16:47:09
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   录制爬虫访问的页面并通过本地HTTP服务回放，用于离线测速和回归测试
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+from selenium.webdriver.support.events import AbstractEventListener, EventFiringWebDriver
+
+from utils.logger import logger
+
+MANIFEST_FILE = "manifest.json"
+# 回放时需要改写链接的文本类型
+TEXT_TYPES = ("text/", "javascript", "json", "xml")
+# 录制浏览器流量时保存的资源类型
+RECORDED_RESOURCE_TYPES = ("Document", "XHR", "Fetch", "Script")
+
+
+def request_key(url: str, method: str = "GET", body=None) -> str:
+    """manifest中的键，不带请求体的GET为网址本身，其余为“方法 网址 请求体SHA-1”"""
+    method = method.upper()
+    if method == "GET" and not body:
+        return url
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return "{} {} {}".format(method, url, hashlib.sha1(body or b"").hexdigest())
+
+
+class FixtureRecorder(object):
+    """把访问过的网址及响应正文保存为回放用的fixture包
+
+    目录结构:
+        manifest.json  请求键 -> {"body": 文件名, "status": 状态码, "content_type": 类型}
+        bodies/        响应正文
+
+    GET请求的键为网址本身，POST等请求的键见request_key.
+    """
+
+    def __init__(self, bundle_dir: str):
+        self.bundle_dir = bundle_dir
+        self._lock = threading.Lock()
+        # 浏览器中已收到响应但尚未加载完成的请求, (driver, requestId) -> 响应信息
+        self._pending = {}
+        os.makedirs(os.path.join(bundle_dir, "bodies"), exist_ok=True)
+        manifest_path = os.path.join(bundle_dir, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+
+    def record(
+        self,
+        url: str,
+        body,
+        content_type: str = "text/html",
+        status: int = 200,
+        method: str = "GET",
+        request_body=None,
+    ):
+        """记录一次响应
+
+        Args:
+            url (str): 网址
+            body (bytes | str): 响应正文，str按utf-8编码
+            content_type (str, optional): Content-Type. Defaults to "text/html".
+            status (int, optional): 状态码. Defaults to 200.
+            method (str, optional): 请求方法. Defaults to "GET".
+            request_body (bytes | str, optional): 请求体. Defaults to None.
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+            if "charset" not in content_type:
+                content_type += "; charset=utf-8"
+        key = request_key(url, method, request_body)
+        filename = hashlib.sha1(key.encode("utf-8")).hexdigest() + ".bin"
+        entry = {"body": filename, "status": status, "content_type": content_type}
+        if key != url:
+            entry.update(url=url, method=method.upper())
+        with self._lock:
+            with open(os.path.join(self.bundle_dir, "bodies", filename), "wb") as f:
+                f.write(body)
+            self.manifest[key] = entry
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.manifest
+
+    def record_driver_traffic(self, driver):
+        """从Chrome性能日志中读取已完成的文档、XHR和脚本响应并记录
+
+        需要以performance_log=True构建的Chrome选项.
+        """
+        try:
+            entries = driver.get_log("performance")
+        except Exception as e:
+            logger.warning(f"Read performance log failed. {repr(e)}")
+            return
+        finished = []
+        for entry in entries:
+            message = json.loads(entry["message"])["message"]
+            params = message.get("params", {})
+            if message.get("method") == "Network.responseReceived":
+                if params.get("type") not in RECORDED_RESOURCE_TYPES:
+                    continue
+                response = params["response"]
+                if not response["url"].startswith("http"):
+                    continue
+                self._pending[(id(driver), params["requestId"])] = (
+                    response["url"],
+                    response.get("status", 200),
+                    response.get("mimeType") or "text/html",
+                )
+            elif message.get("method") == "Network.loadingFinished":
+                finished.append(params["requestId"])
+        for request_id in finished:
+            info = self._pending.pop((id(driver), request_id), None)
+            if info is None:
+                continue
+            url, status, content_type = info
+            try:
+                result = driver.execute_cdp_cmd(
+                    "Network.getResponseBody", {"requestId": request_id}
+                )
+            except Exception:
+                # 页面跳转后部分响应正文已被Chrome释放
+                continue
+            body = result["body"]
+            if result.get("base64Encoded"):
+                body = base64.b64decode(body)
+            self.record(url, body, content_type, status)
+
+    def record_page(self, driver):
+        """记录浏览器已加载的响应，性能日志中取不到当前页面时以page_source代替"""
+        driver = getattr(driver, "wrapped_driver", driver)
+        self.record_driver_traffic(driver)
+        try:
+            url = driver.current_url
+            if url.startswith("http") and url not in self:
+                self.record(url, driver.page_source)
+        except Exception as e:
+            logger.warning(f"Record current page failed. {repr(e)}")
+
+    def save(self):
+        """写出manifest"""
+        with self._lock:
+            with open(os.path.join(self.bundle_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        logger.info(f"{len(self.manifest)} responses recorded into {self.bundle_dir}.")
+
+
+class RecordingListener(AbstractEventListener):
+    """在离开当前页面或点击之前记录已加载的响应，之后Chrome可能释放这些正文"""
+
+    def __init__(self, recorder: FixtureRecorder):
+        self.recorder = recorder
+
+    def before_navigate_to(self, url, driver):
+        self.recorder.record_page(driver)
+
+    def before_navigate_back(self, driver):
+        self.recorder.record_page(driver)
+
+    def before_click(self, element, driver):
+        self.recorder.record_page(driver)
+
+    def before_quit(self, driver):
+        self.recorder.record_page(driver)
+
+
+def wrap_recording(driver, recorder: FixtureRecorder):
+    """包装driver，使每次跳转和点击前都录制当前页面"""
+    return EventFiringWebDriver(driver, RecordingListener(recorder))
+
+
+class FixtureServer(object):
+    """在本地回放fixture包的HTTP服务
+
+    原网址 https://host/path?query 映射为 http://127.0.0.1:port/host/path?query，
+    回放的文本响应中指向已录制host的绝对链接和以/开头的相对链接都会被改写.
+    """
+
+    def __init__(self, bundle_dir: str, host: str = "127.0.0.1", port: int = 0):
+        self.bundle_dir = bundle_dir
+        with open(os.path.join(bundle_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.hosts = sorted(
+            {urlparse(entry.get("url", key)).netloc for key, entry in self.manifest.items()},
+            key=len,
+            reverse=True,
+        )
+        self.stats = {"served": 0, "missed": 0, "bytes": 0}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.base_url = "http://{}:{}".format(*self.httpd.server_address[:2])
+        self._host_pattern = None
+        if self.hosts:
+            # 匹配 https://host、//host 以及JSON中转义的 https:\/\/host
+            hosts = "|".join(re.escape(h) for h in self.hosts)
+            self._host_pattern = re.compile(r"(?:https?:)?(?:\\?/){2}(" + hosts + ")")
+
+    def rewrite_url(self, url: str) -> str:
+        """把原网址改写为回放服务上的网址"""
+        parsed = urlparse(url)
+        if not parsed.netloc or url.startswith(self.base_url):
+            return url
+        rewritten = f"{self.base_url}/{parsed.netloc}{parsed.path or '/'}"
+        return rewritten + (f"?{parsed.query}" if parsed.query else "")
+
+    def rewrite_body(self, body: bytes, host: str) -> bytes:
+        """改写响应中的链接，使其指向回放服务"""
+        text = body.decode("utf-8", errors="replace")
+        if self._host_pattern is not None:
+            text = self._host_pattern.sub(lambda m: f"{self.base_url}/{m.group(1)}", text)
+        text = re.sub(
+            r"""((?:href|src|action)\s*=\s*["'])/(?!/)""",
+            lambda m: f"{m.group(1)}/{host}/",
+            text,
+        )
+        return text.encode("utf-8")
+
+    def lookup(self, path: str, referer: str = None, method: str = "GET", body: bytes = None) -> tuple:
+        """按请求路径、方法和请求体查找录制的网址
+
+        Returns:
+            tuple: (网址, manifest条目)，未录制时条目为None
+        """
+        host, _, rest = path.lstrip("/").partition("/")
+        candidates = []
+        if host in self.hosts:
+            candidates += [f"https://{host}/{rest}", f"http://{host}/{rest}"]
+        else:
+            # 脚本拼出的以/开头的网址，按Referer所在host查找
+            referer_host = urlparse(referer or "").path.lstrip("/").partition("/")[0]
+            for known in ([referer_host] if referer_host in self.hosts else []) + self.hosts:
+                candidates += [f"https://{known}{path}", f"http://{known}{path}"]
+        for url in candidates:
+            for variant in (url, url.rstrip("/"), url + "/"):
+                key = request_key(variant, method, body)
+                if key in self.manifest:
+                    return variant, self.manifest[key]
+        return candidates[0] if candidates else path, None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.serve("GET")
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                self.serve("POST", self.rfile.read(length))
+
+            def serve(self, method: str, body: bytes = None):
+                url, entry = server.lookup(self.path, self.headers.get("Referer"), method, body)
+                if entry is None:
+                    with server._lock:
+                        server.stats["missed"] += 1
+                    logger.warning(f"Replay miss: {method} {url}")
+                    self.send_error(404)
+                    return
+                with open(os.path.join(server.bundle_dir, "bodies", entry["body"]), "rb") as f:
+                    body = f.read()
+                if any(t in entry["content_type"] for t in TEXT_TYPES):
+                    body = server.rewrite_body(body, urlparse(url).netloc)
+                self.send_response(entry["status"])
+                self.send_header("Content-Type", entry["content_type"])
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.stats["served"] += 1
+                    server.stats["bytes"] += len(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Replaying {self.bundle_dir} at {self.base_url}.")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# 进程内的录制器和回放服务
+_recorder = None
+_server = None
+
+
+def start_recording(bundle_dir: str) -> FixtureRecorder:
+    """开始录制，之后创建的爬虫访问的页面都会写入bundle_dir"""
+    global _recorder
+    _recorder = FixtureRecorder(bundle_dir)
+    return _recorder
+
+
+def stop_recording():
+    global _recorder
+    if _recorder is not None:
+        _recorder.save()
+    _recorder = None
+
+
+def get_recorder() -> FixtureRecorder:
+    return _recorder
+
+
+def start_replay(bundle_dir: str, port: int = 0) -> FixtureServer:
+    """启动回放服务，之后创建的爬虫改为访问本地服务"""
+    global _server
+    _server = FixtureServer(bundle_dir, port=port).start()
+    return _server
+
+
+def stop_replay():
+    global _server
+    if _server is not None:
+        _server.stop()
+    _server = None
+
+
+def get_replay_server() -> FixtureServer:
+    return _server
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   retry.py
+@Time    :   2024/11/15 15:12:37
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   临时性错误的指数退避重试，以及按host的熔断
+"""
+
+import asyncio
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from selenium.common.exceptions import (
+    InvalidSessionIdException,
+    SessionNotCreatedException,
+    TimeoutException,
+    WebDriverException,
+)
+
+from utils.logger import logger
+
+# 视为临时性错误的HTTP状态码
+RETRY_STATUS = (429, 500, 502, 503, 504)
+# 浏览器与驱动之间连接中断时WebDriverException消息中的关键字
+WEBDRIVER_CONNECTION_ERRORS = (
+    "disconnected",
+    "connection refused",
+    "connection reset",
+    "session deleted",
+    "chrome not reachable",
+    "net::err_",
+)
+
+
+def http_status(exc: Exception) -> int:
+    """取出requests/aiohttp/httpx异常中的HTTP状态码，没有时为None"""
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    if status is None:
+        # aiohttp.ClientResponseError
+        status = getattr(exc, "status", None)
+    return status if isinstance(status, int) else None
+
+
+def is_transient(exc: Exception) -> bool:
+    """超时、连接错误、传输中断、5xx/429以及浏览器超时和会话断开视为临时性错误，值得重试
+
+    元素找不到、驱动缺失等其他WebDriverException重试也不会成功，直接抛出.
+    """
+    status = http_status(exc)
+    if status is not None:
+        return status in RETRY_STATUS
+    if isinstance(
+        exc,
+        (
+            requests.Timeout,
+            requests.ConnectionError,
+            requests.exceptions.ChunkedEncodingError,
+            TimeoutException,
+            InvalidSessionIdException,
+            SessionNotCreatedException,
+        ),
+    ):
+        return True
+    if isinstance(exc, WebDriverException):
+        message = (exc.msg or "").lower()
+        return any(keyword in message for keyword in WEBDRIVER_CONNECTION_ERRORS)
+    if isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    # aiohttp.ClientConnectionError、httpx.TransportError等，按类名判断以免强依赖
+    return any(
+        cls.__name__ in ("ClientConnectionError", "ServerTimeoutError", "TransportError")
+        for cls in type(exc).__mro__
+    )
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """第attempt次重试前的等待秒数，full jitter的指数退避"""
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class CircuitBreaker(object):
+    """按host统计连续失败次数，达到阈值后暂停该host的请求cooldown秒
+
+    暂停结束后进入半开状态放行请求试探：成功则恢复并清零计数，
+    失败则立即重新暂停，不必再累计failure_threshold次.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._failures = {}
+        self._opened_at = {}
+        # host -> {"trips": 熔断次数, "paused": 累计暂停秒数}
+        self.stats = {}
+        self._lock = threading.Lock()
+
+    def _pause(self, url: str) -> float:
+        host = urlparse(url).netloc
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return 0.0
+            remaining = opened_at + self.cooldown - time.monotonic()
+            if remaining > 0:
+                self.stats[host]["paused"] += remaining
+            return max(0.0, remaining)
+
+    def wait(self, url: str) -> float:
+        """host处于熔断状态时阻塞到冷却结束，返回暂停的秒数"""
+        remaining = self._pause(url)
+        if remaining > 0:
+            time.sleep(remaining)
+        return remaining
+
+    async def wait_async(self, url: str) -> float:
+        remaining = self._pause(url)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        return remaining
+
+    def record_success(self, url: str):
+        host = urlparse(url).netloc
+        with self._lock:
+            self._failures[host] = 0
+            self._opened_at.pop(host, None)
+
+    def record_failure(self, url: str):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            opened_at = self._opened_at.get(host)
+            if opened_at is not None:
+                # 暂停期间已发出的请求失败不再计数；半开状态下试探失败则立即重新暂停
+                if now < opened_at + self.cooldown:
+                    return
+                self._trip(host, now)
+                return
+            self._failures[host] = self._failures.get(host, 0) + 1
+            if self._failures[host] >= self.failure_threshold:
+                self._trip(host, now)
+
+    def _trip(self, host: str, now: float):
+        """暂停host的请求，调用方需持有锁"""
+        self._opened_at[host] = now
+        self._failures[host] = 0
+        stats = self.stats.setdefault(host, {"trips": 0, "paused": 0.0})
+        stats["trips"] += 1
+        logger.warning(f"Circuit breaker opened for {host}, pause {self.cooldown:.0f}s.")
+
+
+# 进程内共享的熔断器
+_default_breaker = None
+
+
+def get_circuit_breaker() -> CircuitBreaker:
+    """获取进程内共享的CircuitBreaker"""
+    global _default_breaker
+    if _default_breaker is None:
+        _default_breaker = CircuitBreaker()
+    return _default_breaker
+
+
+def retry_call(
+    func, url: str, retries: int = 3, base: float = 1.0, breaker: CircuitBreaker = None
+):
+    """调用func()，临时性错误时按指数退避重试
+
+    Args:
+        func (callable): 无参函数，执行一次请求
+        url (str): 请求的网址，用于按host熔断
+        retries (int, optional): 最多重试次数. Defaults to 3.
+        base (float, optional): 退避的基准秒数. Defaults to 1.0.
+        breaker (CircuitBreaker, optional): 默认为进程内共享的熔断器. Defaults to None.
+
+    Returns:
+        func的返回值，重试耗尽或遇到非临时性错误时抛出最后一个异常
+    """
+    breaker = breaker or get_circuit_breaker()
+    for attempt in range(retries + 1):
+        breaker.wait(url)
+        try:
+            result = func()
+        except Exception as e:
+            if not is_transient(e):
+                raise
+            breaker.record_failure(url)
+            if attempt == retries:
+                raise
+            delay = backoff_delay(attempt, base)
+            logger.info(f"Retry {url} in {delay:.1f}s after {type(e).__name__}.")
+            time.sleep(delay)
+        else:
+            breaker.record_success(url)
+            return result
+
+
+async def retry_async(
+    func, url: str, retries: int = 3, base: float = 1.0, breaker: CircuitBreaker = None
+):
+    """retry_call的协程版本，func()返回一个awaitable"""
+    breaker = breaker or get_circuit_breaker()
+    for attempt in range(retries + 1):
+        await breaker.wait_async(url)
+        try:
+            result = await func()
+        except Exception as e:
+            if not is_transient(e):
+                raise
+            breaker.record_failure(url)
+            if attempt == retries:
+                raise
+            delay = backoff_delay(attempt, base)
+            logger.info(f"Retry {url} in {delay:.1f}s after {type(e).__name__}.")
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success(url)
+            return result
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   watermark.py
+@Time    :   2024/11/19 09:52:16
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   每家联储已保存演讲的水位线（最新日期及已抓取的网址），用于增量更新
+"""
+
+import os
+from datetime import datetime
+
+from utils.common import parse_datestring
+from utils.file_saver import json_dump, json_load
+
+DATE_FORMAT = "%Y-%m-%d"
+# 同一网址连续抓取失败的轮数达到该值后不再重试
+MAX_FAILED_RUNS = 3
+
+
+def speech_url(speech: dict) -> str:
+    """演讲的详情页网址，纽约联储使用url键，其余联储使用href键"""
+    return speech.get("href") or speech.get("url") or ""
+
+
+def speech_date(speech: dict):
+    """演讲日期，无法解析时为None"""
+    date = parse_datestring(speech.get("date") or "")
+    return date if isinstance(date, datetime) else None
+
+
+class Watermark(object):
+    """已保存演讲的最新日期、已成功抓取正文的网址及抓取失败的网址
+
+    正文为空的演讲不计入seen_urls，而是在failed_urls中累计失败的轮数，
+    下次增量更新时会重新抓取，连续失败max_failed_runs轮后视为已知，不再抓取.
+    """
+
+    def __init__(self, filepath: str, max_failed_runs: int = MAX_FAILED_RUNS):
+        self.filepath = filepath
+        self.max_failed_runs = max_failed_runs
+        self.latest_date = None
+        self.seen_urls = set()
+        # 网址 -> 连续失败的轮数
+        self.failed_urls = {}
+
+    @classmethod
+    def load(
+        cls, filepath: str, speeches_path: str = None, max_failed_runs: int = MAX_FAILED_RUNS
+    ) -> "Watermark":
+        """读取水位线文件，不存在时从已保存的演讲JSON重建
+
+        Args:
+            filepath (str): 水位线文件
+            speeches_path (str, optional): {fed}_speeches.json，用于首次重建. Defaults to None.
+            max_failed_runs (int, optional): 连续失败多少轮后不再重试. Defaults to MAX_FAILED_RUNS.
+        """
+        watermark = cls(filepath, max_failed_runs)
+        if os.path.exists(filepath):
+            obj = json_load(filepath) or {}
+            if obj.get("latest_date"):
+                watermark.latest_date = datetime.strptime(obj["latest_date"], DATE_FORMAT)
+            watermark.seen_urls = set(obj.get("seen_urls", []))
+            watermark.failed_urls = dict(obj.get("failed_urls", {}))
+        elif speeches_path and os.path.exists(speeches_path):
+            watermark.add(json_load(speeches_path) or {})
+        return watermark
+
+    @property
+    def empty(self) -> bool:
+        return self.latest_date is None and not self.seen_urls
+
+    def add(self, speeches):
+        """把抓取到正文的演讲计入水位线，正文为空的演讲累计一轮失败
+
+        Args:
+            speeches (dict | list): 按年份组织的演讲或演讲列表
+        """
+        if isinstance(speeches, dict):
+            speeches = [speech for v in speeches.values() for speech in v]
+        # 同一轮中重复出现的网址只计一次失败
+        failed = set()
+        for speech in speeches:
+            url = speech_url(speech)
+            if not speech.get("content"):
+                if url and url not in self.seen_urls and url not in failed:
+                    failed.add(url)
+                    self.failed_urls[url] = self.failed_urls.get(url, 0) + 1
+                continue
+            if url:
+                self.seen_urls.add(url)
+                self.failed_urls.pop(url, None)
+            date = speech_date(speech)
+            if date is not None and (self.latest_date is None or date > self.latest_date):
+                self.latest_date = date
+
+    def is_abandoned(self, url: str) -> bool:
+        """连续失败达到max_failed_runs轮的网址"""
+        return self.failed_urls.get(url, 0) >= self.max_failed_runs
+
+    def is_new(self, speech_info: dict) -> bool:
+        """晚于水位线或尚未保存正文、且未被放弃的演讲"""
+        url = speech_url(speech_info)
+        if url:
+            return url not in self.seen_urls and not self.is_abandoned(url)
+        date = speech_date(speech_info)
+        return self.latest_date is None or date is None or date > self.latest_date
+
+    def is_stored(self, speech_info: dict) -> bool:
+        """已保存或早于水位线的演讲，列表页翻到这里说明之后都是旧演讲"""
+        url = speech_url(speech_info)
+        if url and (url in self.seen_urls or self.is_abandoned(url)):
+            return True
+        date = speech_date(speech_info)
+        return date is not None and self.latest_date is not None and date < self.latest_date
+
+    def save(self):
+        json_dump(
+            {
+                "latest_date": self.latest_date.strftime(DATE_FORMAT)
+                if self.latest_date
+                else None,
+                "seen_urls": sorted(self.seen_urls),
+                "failed_urls": dict(sorted(self.failed_urls.items())),
+            },
+            self.filepath,
+        )
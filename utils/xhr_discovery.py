@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+@File    :   xhr_discovery.py
+@Time    :   2024/11/20 14:36:52
+@Author  :   wbzhang
+@Version :   1.0
+@Desc    :   从Chrome性能日志发现列表页背后的XHR/fetch接口，供爬虫直接请求JSON
+"""
+
+import json
+import os
+import re
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from utils.file_saver import json_dump, json_load
+from utils.logger import logger
+
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_ENDPOINTS_DIR = os.path.join(ROOT_PATH, "data", "xhr_endpoints")
+# 记录的请求类型
+XHR_TYPES = ("XHR", "Fetch")
+# 重放请求时沿用的请求头
+REPLAYED_HEADERS = ("accept", "content-type", "x-requested-with")
+
+
+class XhrLog(object):
+    """收集浏览器发出的XHR/fetch请求及其响应类型，保存为接口清单
+
+    清单中每个接口为一个字典: url, method, headers, post_data, status, mime_type.
+    与FixtureRecorder读取同一份性能日志，两者不要同时启用.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.endpoints = json_load(filepath) if os.path.exists(filepath) else []
+        self.endpoints = self.endpoints or []
+        # 已发出但尚未收到响应的请求, (driver, requestId) -> 接口
+        self._requests = {}
+        self._lock = threading.Lock()
+
+    def collect(self, driver):
+        """读取性能日志中的XHR/fetch请求，需要以performance_log=True构建的Chrome选项"""
+        driver = getattr(driver, "wrapped_driver", driver)
+        try:
+            entries = driver.get_log("performance")
+        except Exception as e:
+            logger.warning(f"Read performance log failed. {repr(e)}")
+            return
+        for entry in entries:
+            message = json.loads(entry["message"])["message"]
+            params = message.get("params", {})
+            key = (id(driver), params.get("requestId"))
+            if message.get("method") == "Network.requestWillBeSent":
+                if params.get("type") not in XHR_TYPES:
+                    continue
+                request = params["request"]
+                self._requests[key] = {
+                    "url": request["url"],
+                    "method": request.get("method", "GET"),
+                    "headers": request.get("headers", {}),
+                    "post_data": request.get("postData"),
+                }
+            elif message.get("method") == "Network.responseReceived":
+                endpoint = self._requests.pop(key, None)
+                if endpoint is None:
+                    continue
+                response = params["response"]
+                endpoint["status"] = response.get("status")
+                endpoint["mime_type"] = response.get("mimeType", "")
+                self.add(endpoint)
+
+    def add(self, endpoint: dict):
+        """添加接口，同一请求只保留最新的一次"""
+        with self._lock:
+            self.endpoints = [
+                e
+                for e in self.endpoints
+                if (e["method"], e["url"], e.get("post_data"))
+                != (endpoint["method"], endpoint["url"], endpoint.get("post_data"))
+            ]
+            self.endpoints.append(endpoint)
+
+    def find(self, pattern: str) -> dict:
+        """最近一次返回JSON且网址匹配pattern的接口，没有时为None"""
+        return find_endpoint(self.endpoints, pattern)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+        with self._lock:
+            json_dump(self.endpoints, self.filepath)
+        logger.info(f"{len(self.endpoints)} XHR endpoints saved into {self.filepath}.")
+
+
+def find_endpoint(endpoints: list[dict], pattern: str) -> dict:
+    """最近一次返回JSON且网址匹配pattern的接口，没有时为None"""
+    for endpoint in reversed(endpoints):
+        if "json" in (endpoint.get("mime_type") or "") and re.search(
+            pattern, endpoint["url"]
+        ):
+            return endpoint
+    return None
+
+
+def load_endpoint(fed_name: str, pattern: str, endpoints_dir: str = DEFAULT_ENDPOINTS_DIR) -> dict:
+    """从发现模式保存的清单中读取某联储匹配pattern的接口"""
+    filepath = os.path.join(endpoints_dir, f"{fed_name}.json")
+    if not pattern or not os.path.exists(filepath):
+        return None
+    return find_endpoint(json_load(filepath) or [], pattern)
+
+
+def _replace(obj, params: dict):
+    """递归替换字典中与params同名（不区分大小写）的键的值"""
+    if isinstance(obj, dict):
+        return {
+            k: params[k.lower()] if k.lower() in params else _replace(v, params)
+            for k, v in obj.items()
+        }
+    if isinstance(obj, list):
+        return [_replace(v, params) for v in obj]
+    return obj
+
+
+def build_request(endpoint: dict, params: dict = None) -> tuple:
+    """按参数改写接口的查询串及请求体
+
+    Args:
+        endpoint (dict): 发现模式记录的接口
+        params (dict, optional): 参数名(小写) -> 值，如{"page": 2}. Defaults to None.
+
+    Returns:
+        tuple: (url, body, headers)
+    """
+    params = {k.lower(): v for k, v in (params or {}).items()}
+    parts = urlsplit(endpoint["url"])
+    query = [
+        (k, str(params[k.lower()]) if k.lower() in params else v)
+        for k, v in parse_qsl(parts.query, keep_blank_values=True)
+    ]
+    url = urlunsplit(parts._replace(query=urlencode(query)))
+    body = endpoint.get("post_data")
+    if body:
+        try:
+            body = json.dumps(_replace(json.loads(body), params))
+        except ValueError:
+            body = urlencode(
+                [
+                    (k, str(params[k.lower()]) if k.lower() in params else v)
+                    for k, v in parse_qsl(body, keep_blank_values=True)
+                ]
+            )
+    headers = {
+        k: v for k, v in endpoint.get("headers", {}).items() if k.lower() in REPLAYED_HEADERS
+    }
+    return url, body, headers
+
+
+def records_from_json(obj) -> list[dict]:
+    """取出JSON中最长的字典列表，通常就是列表页的条目"""
+    best = []
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            records = [v for v in item if isinstance(v, dict)]
+            if len(records) > len(best):
+                best = records
+            stack.extend(item)
+    return best
+
+
+def pick(record: dict, candidates: tuple) -> str:
+    """按候选键名（不区分大小写）取出字段值，列表值拼接为字符串"""
+    fields = {k.lower(): v for k, v in record.items()}
+    for name in candidates:
+        value = fields.get(name.lower())
+        if isinstance(value, list):
+            value = ", ".join(
+                str(v.get("name") or v.get("title") or "") if isinstance(v, dict) else str(v)
+                for v in value
+            )
+        elif isinstance(value, dict):
+            value = value.get("name") or value.get("title") or value.get("url")
+        if value:
+            return str(value).strip()
+    return ""
+
+
+# 进程内的接口发现日志
+_xhr_log = None
+
+
+def start_discovery(filepath: str) -> XhrLog:
+    """开启发现模式，之后创建的爬虫会记录浏览器发出的XHR/fetch请求"""
+    global _xhr_log
+    _xhr_log = XhrLog(filepath)
+    return _xhr_log
+
+
+def stop_discovery():
+    global _xhr_log
+    if _xhr_log is not None:
+        _xhr_log.save()
+    _xhr_log = None
+
+
+def get_xhr_log() -> XhrLog:
+    return _xhr_log